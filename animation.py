@@ -0,0 +1,352 @@
+"""
+Animation export of playback: the main plot, the range dashboard or the spatial layout.
+
+Worker processes open the file through its cache, memory-mapped or chunked, and render
+chunks of frames headlessly with Agg, redrawing only the artists that change
+on top of a background drawn once. The frames are written as a PNG sequence
+and, for .gif and .mp4 outputs, encoded afterwards.
+
+Usage: python -m animation FILE OUTPUT [--view main|ranges|spatial] [--every N] [--fps FPS]
+                           [--workers N] [--range START END] ... [--points CSV] [--ymin Y] [--ymax Y]
+                           [--storage float64|float32|int32|int16] [--chunked] [--channel N]
+"""
+import argparse
+import concurrent.futures
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import matplotlib
+from PIL import Image
+import cache
+import dataview
+import geometry
+import readers
+import render
+import spatial
+import storage
+from decimation import DecimatedLines
+
+FRAME_PATTERN = "frame_%06d.png"
+DEFAULT_FPS = 25
+# Frames handed to a worker at a time; each chunk draws its background once
+FRAMES_PER_CHUNK = 50
+# Timestamps read at a time when scanning the frames for shared axis limits
+LIMIT_BLOCK_ROWS = 1000
+
+
+def output_kind(output):
+    """Returns 'mp4', 'gif' or 'png' (a directory of numbered frames) for an output path."""
+    extension = os.path.splitext(output)[1].lower()
+    return {".mp4": "mp4", ".gif": "gif"}.get(extension, "png")
+
+
+def value_limits(data, indices, columns=slice(None)):
+    """Returns the finite minimum and maximum over the frames, so all frames share one scale."""
+    low, high = np.inf, -np.inf
+    for start in range(0, len(indices), LIMIT_BLOCK_ROWS):
+        block = np.asarray(data[np.asarray(indices[start:start + LIMIT_BLOCK_ROWS])], dtype=np.float64)
+        block = block[:, columns]
+        finite = block[np.isfinite(block)]
+        if finite.size:
+            low, high = min(low, finite.min()), max(high, finite.max())
+    if low > high:
+        return -1.0, 1.0
+    if low == high:
+        return low - 1.0, high + 1.0
+    return low, high
+
+
+def build_main_view(data, timestamps, distances, spec):
+    """The main plot: the current line of the visible distance range with a shared Y axis."""
+    figure, canvas, ax = render.new_figure(spec["figsize"], spec["dpi"])
+    first = spec["indices"][0]
+    lines = DecimatedLines(ax)
+    in_range = (distances >= spec["range_start"]) & (distances <= spec["range_end"]) & ~np.isnan(distances)
+    line = lines.plot(distances[in_range], data[first][in_range], label="Current")
+    render.style_deformation_axes(ax, timestamps[first])
+    render.set_deformation_limits(ax, distances[in_range], data[first][in_range], *spec["ylim"])
+    ax.legend()
+
+    def set_frame(idx):
+        values = data[idx]
+        mask = render.valid_points(values, distances, spec["range_start"], spec["range_end"])
+        lines.set_data(line, distances[mask], values[mask])
+        ax.set_title(f"Deformation Plot for Timestamp: {timestamps[idx]}")
+
+    return figure, canvas, [line, ax.title], set_frame
+
+
+def build_ranges_view(data, timestamps, distances, spec):
+    """The range dashboard: one subplot per distance range and a shared timestamp title."""
+    figure, canvas, _ = render.new_figure(spec["figsize"], spec["dpi"])
+    figure.clear()
+    first = spec["indices"][0]
+    num_columns = math.ceil(math.sqrt(len(spec["ranges"])))
+    num_rows = math.ceil(len(spec["ranges"]) / num_columns)
+    currents = []
+
+    for number, (start, end) in enumerate(spec["ranges"], start=1):
+        ax = figure.add_subplot(num_rows, num_columns, number)
+        columns = dataview.range_columns((distances >= start) & (distances <= end))
+        lines = DecimatedLines(ax)
+        line = lines.plot(distances[columns], data[first, columns], label="Current")
+        ax.set_title(f"Range: {start:.2f}m to {end:.2f}m")
+        ax.set_xlabel("Distance (m)")
+        ax.set_ylabel("Deformation (microstrain)")
+        ax.grid(True)
+        ax.legend()
+        ax.set_ylim(*spec["ylim"])
+        currents.append((lines, line, columns))
+
+    title = figure.suptitle(f"Timestamp: {timestamps[first]}")
+    figure.tight_layout()
+
+    def set_frame(idx):
+        for lines, line, columns in currents:
+            lines.set_data(line, distances[columns], data[idx, columns])
+        title.set_text(f"Timestamp: {timestamps[idx]}")
+
+    return figure, canvas, [line for _, line, _ in currents] + [title], set_frame
+
+
+def build_spatial_view(data, timestamps, distances, spec):
+    """The spatial layout: the gauges along the XY polyline coloured by deformation on a shared scale."""
+    figure, canvas, ax = render.new_figure(spec["figsize"], spec["dpi"])
+    positions = geometry.gauge_positions(*spec["points"], distances, spec.get("segments"))
+    layout = spatial.GaugeLayout(ax, *positions)
+    layout.set_clim(*spec["ylim"])
+    first = spec["indices"][0]
+    layout.set_values(data[first])
+    figure.colorbar(layout.mappable, ax=ax)
+    ax.set_title(f"Deformation at Timestamp: {timestamps[first]}")
+    ax.set_xlabel("X Coordinate")
+    ax.set_ylabel("Y Coordinate")
+
+    def set_frame(idx):
+        layout.set_values(data[idx])
+        ax.set_title(f"Deformation at Timestamp: {timestamps[idx]}")
+
+    return figure, canvas, [layout.artist, ax.title], set_frame
+
+
+VIEWS = {"main": build_main_view, "ranges": build_ranges_view, "spatial": build_spatial_view}
+
+
+def open_data(spec):
+    """Opens the spec's file from its cache and applies the tare and zero offsets.
+
+    The cache must have been written before rendering starts: workers never
+    parse the file, or rebuild a cache another process may still be using.
+    """
+    parsed = cache.load_cache(
+        spec["filepath"], spec.get("storage", storage.DEFAULT_FORMAT), spec.get("chunked", False),
+        spec.get("channel", 0)
+    )
+    if parsed is None:
+        raise ValueError(
+            f"The cache of {os.path.basename(spec['filepath'])} is missing or out of date; open the file again."
+        )
+    return dataview.apply_offsets(parsed["data"], spec["offsets"]), parsed["timestamps"], parsed["distances"]
+
+
+def render_chunk(spec, frame_dir, chunk):
+    """Worker: renders (frame number, timestamp index) pairs to numbered PNG files; returns the frame count."""
+    data, timestamps, distances = open_data(spec)
+    figure, canvas, animated, set_frame = VIEWS[spec["view"]](data, timestamps, distances, spec)
+    for artist in animated:
+        artist.set_animated(True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(figure.bbox)
+
+    for number, idx in chunk:
+        set_frame(idx)
+        canvas.restore_region(background)
+        for artist in animated:
+            figure.draw_artist(artist)
+        Image.fromarray(np.asarray(canvas.buffer_rgba())).convert("RGB").save(
+            os.path.join(frame_dir, FRAME_PATTERN % number), compress_level=1
+        )
+    return len(chunk)
+
+
+def find_ffmpeg():
+    """Returns the ffmpeg executable matplotlib is configured with, raising when it is not installed."""
+    ffmpeg = shutil.which(matplotlib.rcParams["animation.ffmpeg_path"])
+    if ffmpeg is None:
+        raise RuntimeError("MP4 export needs ffmpeg on the PATH; export a GIF or PNG frames instead.")
+    return ffmpeg
+
+
+def encode(frame_dir, num_frames, output, fps):
+    """Encodes the numbered PNG frames as a GIF with Pillow or an MP4 with ffmpeg."""
+    frame_paths = [os.path.join(frame_dir, FRAME_PATTERN % number) for number in range(num_frames)]
+    if output_kind(output) == "gif":
+        first = Image.open(frame_paths[0])
+        first.save(
+            output, save_all=True, append_images=(Image.open(path) for path in frame_paths[1:]),
+            duration=max(20, round(1000 / fps)), loop=0
+        )
+        return
+
+    subprocess.run(
+        [
+            find_ffmpeg(), "-y", "-loglevel", "error", "-framerate", str(fps),
+            "-i", os.path.join(frame_dir, FRAME_PATTERN),
+            # H.264 needs even frame sizes
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", output,
+        ],
+        check=True,
+    )
+
+
+def export_animation(spec, output, fps=DEFAULT_FPS, workers=None, check_cancelled=None, report=None):
+    """Renders the frames of spec["indices"] across worker processes and writes them to output.
+
+    spec holds the view name, the file, the tare and zero offsets, the figure
+    size and the view's options; missing Y limits are taken from the frames.
+    Returns the frame count, render time and achieved frames per second.
+    """
+    indices = list(spec["indices"])
+    if not indices:
+        raise ValueError("There are no frames to export.")
+    kind = output_kind(output)
+    if kind == "mp4":
+        # Fail before rendering rather than after
+        find_ffmpeg()
+    if spec.get("ylim") is None or None in spec["ylim"]:
+        data, _, distances = open_data(spec)
+        columns = slice(None)
+        if spec["view"] == "main":
+            columns = (distances >= spec["range_start"]) & (distances <= spec["range_end"])
+        elif spec["view"] == "ranges":
+            columns = np.any([(distances >= start) & (distances <= end) for start, end in spec["ranges"]], axis=0)
+        low, high = value_limits(data, indices, columns)
+        ylim = spec.get("ylim") or (None, None)
+        spec = dict(spec, ylim=(low if ylim[0] is None else ylim[0], high if ylim[1] is None else ylim[1]))
+
+    if kind == "png":
+        frame_dir = os.path.splitext(output)[0] if output.lower().endswith(".png") else output
+        os.makedirs(frame_dir, exist_ok=True)
+    else:
+        frame_dir = tempfile.mkdtemp(prefix="luna_frames_")
+
+    numbered = list(enumerate(indices))
+    chunks = [numbered[start:start + FRAMES_PER_CHUNK] for start in range(0, len(numbered), FRAMES_PER_CHUNK)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+    start_time = time.perf_counter()
+    done = 0
+    try:
+        # Spawned workers do not inherit the UI's threads or Tk state
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = [pool.submit(render_chunk, spec, frame_dir, chunk) for chunk in chunks]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    done += future.result()
+                    if check_cancelled is not None:
+                        check_cancelled()
+                    if report is not None:
+                        report(95 * done // len(indices))
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        render_seconds = time.perf_counter() - start_time
+
+        if kind != "png":
+            encode(frame_dir, len(indices), output, fps)
+    finally:
+        if kind != "png":
+            shutil.rmtree(frame_dir, ignore_errors=True)
+
+    if report is not None:
+        report(100)
+    return {
+        "frames": len(indices),
+        "render_seconds": render_seconds,
+        "fps": len(indices) / max(render_seconds, 1e-9),
+        "output": frame_dir if kind == "png" else output,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m animation",
+        description="Render playback of a Luna TSV export to MP4, GIF or numbered PNG frames."
+    )
+    parser.add_argument("file", help="The .tsv file")
+    parser.add_argument("output", help="Output .mp4, .gif, or a directory for PNG frames")
+    parser.add_argument("--view", choices=sorted(VIEWS), default="main")
+    parser.add_argument("--every", type=int, default=1, metavar="N", help="Render every Nth timestamp")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="Frame rate of the GIF or MP4")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: one per core)")
+    parser.add_argument("--range", type=float, nargs=2, action="append", default=[], metavar=("START", "END"),
+                        help="Distance range; limits the main view, one subplot each in the ranges view")
+    parser.add_argument("--points", help="CSV with 'X Coordinate' and 'Y Coordinate' columns for the spatial view; "
+                        "a *_segments.csv next to it places fibre segments on the polyline")
+    parser.add_argument("--ymin", type=float, help="Fixed lower Y limit (colour scale in the spatial view)")
+    parser.add_argument("--ymax", type=float, help="Fixed upper Y limit (colour scale in the spatial view)")
+    parser.add_argument("--width", type=float, default=10, help="Figure width in inches")
+    parser.add_argument("--height", type=float, default=6, help="Figure height in inches")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--storage", choices=storage.FORMATS, default=storage.DEFAULT_FORMAT,
+                        help="Format the matrix is kept in (default: float64)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Cache the matrix as compressed chunks, for files larger than memory")
+    parser.add_argument("--channel", type=int, default=1, metavar="N",
+                        help="Channel to render in files that hold several (default: 1)")
+    args = parser.parse_args(argv)
+    if args.channel < 1:
+        parser.error("--channel counts from 1")
+
+    try:
+        parsed = cache.load_or_parse(args.file, args.storage, args.chunked, args.channel - 1)
+    except ValueError as e:
+        print(f"{args.file}: {e}", file=sys.stderr)
+        return 1
+    if parsed is None:
+        print(f"{args.file}: could not find the 'x-axis' row", file=sys.stderr)
+        return 1
+    spec = {
+        "view": args.view,
+        "filepath": args.file,
+        "storage": args.storage,
+        "chunked": args.chunked,
+        "channel": args.channel - 1,
+        "offsets": [],
+        "indices": range(0, len(parsed["data"]), max(1, args.every)),
+        "figsize": (args.width, args.height),
+        "dpi": args.dpi,
+        "ylim": (args.ymin, args.ymax),
+        "range_start": args.range[0][0] if args.range else float("-inf"),
+        "range_end": args.range[0][1] if args.range else float("inf"),
+        "ranges": [tuple(r) for r in args.range],
+    }
+    if args.view == "ranges" and not args.range:
+        parser.error("the ranges view needs at least one --range")
+    if args.view == "spatial":
+        if not args.points:
+            parser.error("the spatial view needs --points")
+        spec["points"] = readers.read_points_csv(args.points)
+        segments_path = geometry.segments_path(args.points)
+        spec["segments"] = readers.read_segments_csv(segments_path) if segments_path else None
+
+    result = export_animation(
+        spec, args.output, args.fps, args.workers,
+        report=lambda percent: print(f"\r{percent:3d}%", end="", flush=True)
+    )
+    print(
+        f"\n{result['frames']} frames rendered in {result['render_seconds']:.1f} s "
+        f"({result['fps']:.1f} frames/s); written to {result['output']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
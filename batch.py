@@ -0,0 +1,230 @@
+"""
+Headless batch processing of Luna TSV exports.
+
+Reduces every .tsv file of a directory to per-timestamp statistics, range
+exports and PNG snapshots, one file per worker process. Needs no display.
+
+Usage: python -m batch DIRECTORY [--output DIR] [--workers N] [--tare [N]] [--zero-at INDEX]
+                       [--range START END] ... [--format xlsx|csv|parquet]
+                       [--snapshot INDEX ...] [--ymin Y] [--ymax Y] [--no-cache]
+                       [--storage float64|float32|int32|int16] [--chunked] [--channel N]
+"""
+import argparse
+import concurrent.futures
+import glob
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import cache
+import dataview
+import export
+import formats
+import render
+import stats
+import storage
+
+
+def find_files(directory, pattern="*.tsv"):
+    """Returns the measurement files of a directory in name order."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def apply_zeroing(parsed, tare_option=None, zero_at=None):
+    """Returns the data with a tare row and a zero reference applied, like Toggle Zeroing and Zero from Timestamp.
+
+    tare_option is the 1-based tare row of the file, zero_at a timestamp index.
+    """
+    offsets = []
+    if tare_option is not None:
+        tare_values = parsed["tare_values"]
+        if tare_values is None:
+            raise ValueError("The file has no 'Tare' rows.")
+        if not 1 <= tare_option <= len(tare_values):
+            raise ValueError(f"Tare option {tare_option} does not exist, the file has {len(tare_values)}.")
+        offsets.append(tare_values[tare_option - 1])
+    data = dataview.apply_offsets(parsed["data"], offsets)
+
+    if zero_at is not None:
+        if not 0 <= zero_at < len(data):
+            raise ValueError(f"Timestamp index {zero_at} is outside the file's {len(data)} timestamps.")
+        offsets.append(-data[zero_at])
+        data = dataview.apply_offsets(parsed["data"], offsets)
+    return data
+
+
+def stats_frame(table, timestamps, distances):
+    """Returns the statistics table as a DataFrame with one row per timestamp."""
+    peak_index = table["peak_index"]
+    peak_distance = np.where(peak_index >= 0, distances[np.maximum(peak_index, 0)], np.nan)
+    return pd.DataFrame({
+        "Timestamp": np.asarray(timestamps),
+        "Peak": table["peak"],
+        "Peak Distance": peak_distance,
+        "Min": table["min"],
+        "Mean": table["mean"],
+        "Std": table["std"],
+    })
+
+
+def range_sections(distances, ranges):
+    """Returns the export sections of the (start, end) distance ranges that contain points."""
+    sections = []
+    for start, end in ranges:
+        valid_indices = (distances >= start) & (distances <= end)
+        if valid_indices.any():
+            columns = dataview.range_columns(valid_indices)
+            sections.append((f"{start:.2f}-{end:.2f}m", columns, distances[columns]))
+    return sections
+
+
+def process_file(filepath, options):
+    """Writes the statistics, range exports and snapshots of one file and returns its summary row."""
+    start_time = time.perf_counter()
+    if options["cache"]:
+        parsed = cache.load_or_parse(filepath, options["storage"], options["chunked"], options["channel"])
+    else:
+        parsed = formats.parse_file(filepath, options["storage"], options["channel"])
+    if parsed is None:
+        raise ValueError("Could not find the 'x-axis' row.")
+    if len(parsed["data"]) == 0:
+        raise ValueError("The file has no data rows.")
+
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    if options["channel"]:
+        name = f"{name}_ch{options['channel'] + 1}"
+    output_dir = os.path.join(options["output"], name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    data = apply_zeroing(parsed, options["tare"], options["zero_at"])
+    timestamps = parsed["timestamps"]
+    distances = parsed["distances"]
+
+    table = stats.compute_stats_table(data)
+    stats_frame(table, timestamps, distances).to_csv(os.path.join(output_dir, "stats.csv"), index=False)
+
+    sections = range_sections(distances, options["ranges"])
+    if sections:
+        export.export_sections(
+            os.path.join(output_dir, "ranges." + options["format"]), data, timestamps, sections
+        )
+
+    peaks = np.where(np.isnan(table["peak"]), -np.inf, table["peak"])
+    peak_idx = int(np.argmax(peaks))
+    # Default snapshots: first and last timestamp and the one with the highest peak
+    snapshots = options["snapshots"] if options["snapshots"] else [0, peak_idx, len(data) - 1]
+    for idx in sorted({idx % len(data) for idx in snapshots}):
+        render.save_deformation_snapshot(
+            os.path.join(output_dir, f"snapshot_{idx:06d}.png"), distances, data[idx], timestamps[idx],
+            options["ymin"], options["ymax"]
+        )
+
+    return {
+        "File": filepath,
+        "Timestamps": len(data),
+        "Gauges": data.shape[1],
+        "Max Peak": table["peak"][peak_idx],
+        "Max Peak Timestamp": timestamps[peak_idx],
+        "Ranges Exported": len(sections),
+        "Seconds": time.perf_counter() - start_time,
+    }
+
+
+def run(files, options, workers):
+    """Processes files across a process pool, yielding (file, summary row or exception) as each finishes."""
+    if workers == 1:
+        for filepath in files:
+            try:
+                yield filepath, process_file(filepath, options)
+            except Exception as e:  # One bad file must not stop the campaign
+                yield filepath, e
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, filepath, options): filepath for filepath in files}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:  # One bad file must not stop the campaign
+                yield futures[future], e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m batch",
+        description="Reduce a directory of Luna TSV exports to statistics, range exports and snapshots."
+    )
+    parser.add_argument("directory", help="Directory containing the .tsv files")
+    parser.add_argument("--output", help="Output directory (default: DIRECTORY/batch_output)")
+    parser.add_argument("--pattern", default="*.tsv", help="File name pattern (default: *.tsv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: one per core)")
+    parser.add_argument("--tare", type=int, nargs="?", const=1, metavar="N",
+                        help="Apply the Nth tare row of each file (default N: 1)")
+    parser.add_argument("--zero-at", type=int, metavar="INDEX", help="Zero the data at this timestamp index")
+    parser.add_argument("--range", type=float, nargs=2, action="append", default=[], metavar=("START", "END"),
+                        help="Export this distance range in meters; may be repeated")
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet"], default="csv", help="Range export format")
+    parser.add_argument("--snapshot", type=int, nargs="+", default=[], metavar="INDEX",
+                        help="Timestamp indices to save as PNG (default: first, highest peak, last)")
+    parser.add_argument("--ymin", type=float, help="Fixed lower Y limit of the snapshots")
+    parser.add_argument("--ymax", type=float, help="Fixed upper Y limit of the snapshots")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write .lunacache sidecars")
+    parser.add_argument("--storage", choices=storage.FORMATS, default=storage.DEFAULT_FORMAT,
+                        help="Format the matrix is kept in (default: float64)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Cache the matrix as compressed chunks, for files larger than memory")
+    parser.add_argument("--channel", type=int, default=1, metavar="N",
+                        help="Channel to process in files that hold several (default: 1)")
+    args = parser.parse_args(argv)
+    if args.channel < 1:
+        parser.error("--channel counts from 1")
+    if args.chunked and args.no_cache:
+        parser.error("--chunked keeps the matrix in the .lunacache sidecar and cannot be used with --no-cache")
+
+    files = find_files(args.directory, args.pattern)
+    if not files:
+        print(f"No files matching {args.pattern} in {args.directory}", file=sys.stderr)
+        return 1
+
+    output = args.output or os.path.join(args.directory, "batch_output")
+    os.makedirs(output, exist_ok=True)
+    options = {
+        "output": output,
+        "cache": not args.no_cache,
+        "storage": args.storage,
+        "chunked": args.chunked,
+        "channel": args.channel - 1,
+        "tare": args.tare,
+        "zero_at": args.zero_at,
+        "ranges": [tuple(r) for r in args.range],
+        "format": args.format,
+        "snapshots": args.snapshot,
+        "ymin": args.ymin,
+        "ymax": args.ymax,
+    }
+
+    start_time = time.perf_counter()
+    rows = []
+    failures = 0
+    workers = max(1, min(args.workers or 1, len(files)))
+    for number, (filepath, result) in enumerate(run(files, options, workers), start=1):
+        name = os.path.basename(filepath)
+        if isinstance(result, Exception):
+            failures += 1
+            print(f"[{number}/{len(files)}] {name}: failed: {result}", file=sys.stderr)
+            continue
+        rows.append(result)
+        print(f"[{number}/{len(files)}] {name}: {result['Timestamps']} timestamps in {result['Seconds']:.1f} s")
+
+    if rows:
+        pd.DataFrame(rows).sort_values("File").to_csv(os.path.join(output, "summary.csv"), index=False)
+    print(
+        f"Processed {len(rows)} of {len(files)} files with {workers} workers "
+        f"in {time.perf_counter() - start_time:.1f} s; results in {output}"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Parse benchmark of every registered reader on synthetic files it writes itself.
+
+Usage: python benchmark.py [--rows 10000 100000 1000000] [--gauges 100] [--reader NAME] [--legacy]
+"""
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+import formats
+import readers
+import storage
+
+
+def legacy_parse(filepath):
+    """The original loader path: python engine, string cast and per-column to_numeric."""
+    df = pd.read_csv(filepath, sep='\t', header=None, skiprows=readers.HEADER_SKIP_ROWS, engine='python')
+    df = df.astype(str)
+    x_axis_cell = df.apply(lambda row: row.str.contains('x-axis', case=False, na=False)).stack()
+    x_axis_row, _ = x_axis_cell.idxmax()
+    return df.iloc[x_axis_row + 1:, 3:].apply(pd.to_numeric, errors='coerce').values
+
+
+def time_call(func, *args):
+    """Returns the result and the wall time in seconds of a single call."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the file readers on synthetic files.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--gauges", type=int, default=100)
+    parser.add_argument("--reader", help="Only time the reader with this name")
+    parser.add_argument("--legacy", action="store_true", help="Also time the original parser")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for reader in formats.READERS:
+            if args.reader and reader["name"] != args.reader:
+                continue
+            if reader["write_sample"] is None:
+                print(f"{reader['name']}: skipped, the reader writes no sample files")
+                continue
+            for rows in args.rows:
+                filepath = os.path.join(tmp_dir, f"synthetic_{rows}{reader['extensions'][0]}")
+                reader["write_sample"](filepath, rows, args.gauges)
+                size_mb = os.path.getsize(filepath) / 1e6
+                label = f"{reader['name']} rows={rows:>8} gauges={args.gauges} size={size_mb:8.1f} MB"
+
+                for storage_format in storage.FORMATS:
+                    try:
+                        parsed, elapsed = time_call(formats.parse_file, filepath, storage_format, 0, reader)
+                    except ValueError as e:
+                        print(f"{label} [{storage_format}]: skipped, {e}")
+                        continue
+                    print(
+                        f"{label} [{storage_format}]: {elapsed:7.2f} s "
+                        f"({size_mb / elapsed:6.1f} MB/s, {storage.raw(parsed['data']).nbytes / 1e6:.1f} MB in RAM)"
+                    )
+
+                if args.legacy:
+                    data, elapsed = time_call(legacy_parse, filepath)
+                    print(f"{label} [legacy]: {elapsed:7.2f} s ({size_mb / elapsed:6.1f} MB/s)")
+                    del data
+                os.remove(filepath)
+
+
+if __name__ == "__main__":
+    main()
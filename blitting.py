@@ -0,0 +1,47 @@
+class BlitManager:
+    """Keeps a cached canvas background and redraws only the animated artists on top of it.
+
+    Artists added here are excluded from normal draws; after every full draw
+    the background is captured again, so resizes, zooms and pans stay correct.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        self.draw_cid = canvas.mpl_connect("draw_event", self.on_draw)
+
+    def add_artist(self, artist):
+        """Registers an artist that changes between frames."""
+        artist.set_animated(True)
+        self.artists.append(artist)
+        return artist
+
+    def clear(self):
+        """Forgets all artists and the background, e.g. before the axes are rebuilt."""
+        self.artists = []
+        self.background = None
+
+    def on_draw(self, event):
+        """Captures the static background after a full draw and paints the animated artists."""
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            if artist.figure is figure:
+                figure.draw_artist(artist)
+
+    def update(self):
+        """Restores the background, redraws the animated artists and blits the result."""
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def disconnect(self):
+        self.canvas.mpl_disconnect(self.draw_cid)
+        self.clear()
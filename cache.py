@@ -0,0 +1,214 @@
+import json
+import os
+import shutil
+import numpy as np
+import chunkstore
+import formats
+import readers
+import stats
+import storage
+
+# Bump when the layout of the cache directory changes so old caches are rebuilt
+CACHE_VERSION = 4
+CACHE_SUFFIX = ".lunacache"
+META_FILE = "meta.json"
+# Per-timestamp statistics of the unzeroed matrix, so a cached open does not have to recompute them
+STATS_FILE = "stats.npz"
+# Layouts of the data matrix in the cache: one memory-mapped .npy file, or compressed chunks
+ARRAY_LAYOUT = "array"
+CHUNKED_LAYOUT = "chunked"
+
+
+def cache_dir_for(filepath, channel=0):
+    """Returns the sidecar cache directory for a channel of a measurement file."""
+    if channel:
+        return f"{os.path.abspath(filepath)}.ch{channel + 1}{CACHE_SUFFIX}"
+    return os.path.abspath(filepath) + CACHE_SUFFIX
+
+
+def source_key(filepath):
+    """Returns the path, size and modification time that identify a measurement file."""
+    stat = os.stat(filepath)
+    return {
+        "source": os.path.abspath(filepath),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def load_cache(filepath, storage_format=storage.DEFAULT_FORMAT, chunked=False, channel=0):
+    """Loads a parsed file from its sidecar cache, memory-mapping the data matrix or opening its chunks.
+
+    Returns None when there is no cache, it is stale or corrupt, or it holds
+    another storage format or layout. The statistics table is None when the
+    cache was written without one.
+    """
+    dtype = storage.format_name(storage_format)
+    layout = CHUNKED_LAYOUT if chunked else ARRAY_LAYOUT
+    cache_dir = cache_dir_for(filepath, channel)
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        if (
+            meta.get("version") != CACHE_VERSION or
+            meta.get("dtype") != dtype or
+            meta.get("layout", ARRAY_LAYOUT) != layout or
+            meta.get("scale", storage.SCALE) != storage.SCALE or
+            {key: meta.get(key) for key in ("source", "size", "mtime_ns")} != source_key(filepath)
+        ):
+            return None
+
+        if chunked:
+            data = chunkstore.open_store(cache_dir, meta["shape"], dtype, meta["chunk_shape"]).array
+        else:
+            data = np.load(os.path.join(cache_dir, "original_data.npy"), mmap_mode="r")
+        distances = np.load(os.path.join(cache_dir, "distances.npy"))
+        timestamps = np.load(os.path.join(cache_dir, "timestamps.npy"))
+        tare_values = None
+        if meta["tare_options"]:
+            tare_values = np.load(os.path.join(cache_dir, "tare_values.npy"))
+        stats_table = None
+        if meta.get("stats"):
+            with np.load(os.path.join(cache_dir, STATS_FILE)) as columns:
+                if any(columns[key].shape != (meta["shape"][0],) for key in stats.StatsTable.KEYS):
+                    return None
+                stats_table = stats.table_from_columns(columns)
+
+        if (
+            list(data.shape) != meta["shape"] or
+            data.dtype != np.dtype(dtype) or
+            len(distances) != data.shape[1] or
+            len(timestamps) != data.shape[0] or
+            (tare_values is not None and tare_values.shape != (len(meta["tare_options"]), data.shape[1]))
+        ):
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    return {
+        "timestamps": timestamps,
+        "distances": distances,
+        "data": storage.decoded(data, dtype),
+        "tare_options": [tuple(option) for option in meta["tare_options"]],
+        "tare_values": tare_values,
+        "header_lines": meta["header_lines"],
+        "channel": channel,
+        "channels": meta["channels"],
+        "data_end": meta["data_end"],
+        "stats_table": stats_table,
+    }
+
+
+def write_cache_files(cache_dir, filepath, parsed, data_meta):
+    """Writes everything of a parsed file but the data matrix, with data_meta describing it."""
+    np.save(os.path.join(cache_dir, "distances.npy"), parsed["distances"])
+    np.save(os.path.join(cache_dir, "timestamps.npy"), np.asarray(parsed["timestamps"], dtype=str))
+    if parsed["tare_values"] is not None:
+        np.save(os.path.join(cache_dir, "tare_values.npy"), parsed["tare_values"])
+    stats_table = parsed.get("stats_table")
+    if stats_table is not None:
+        np.savez(os.path.join(cache_dir, STATS_FILE), **{key: stats_table[key] for key in stats.StatsTable.KEYS})
+
+    meta = source_key(filepath) | data_meta | {
+        "version": CACHE_VERSION,
+        "scale": storage.SCALE,
+        "tare_options": [list(option) for option in parsed["tare_options"]],
+        "header_lines": parsed["header_lines"],
+        "channels": parsed["channels"],
+        "data_end": parsed["data_end"],
+        "stats": stats_table is not None,
+    }
+    # The metadata is written last so a partially written cache is never valid
+    with open(os.path.join(cache_dir, META_FILE), "w", encoding="utf-8") as file:
+        json.dump(meta, file)
+
+
+def create_store(filepath, num_columns, storage_format=storage.DEFAULT_FORMAT, channel=0):
+    """Starts a chunked cache for a channel and returns the store its rows are appended to while parsing."""
+    cache_dir = cache_dir_for(filepath, channel)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    return chunkstore.ChunkStore(cache_dir, num_columns, storage.format_name(storage_format))
+
+
+def save_cache(filepath, parsed):
+    """Writes a parsed channel to its sidecar cache; failures only mean the next open parses again."""
+    cache_dir = cache_dir_for(filepath, parsed["channel"])
+    data = storage.raw(parsed["data"])
+    if isinstance(data, chunkstore.ChunkedArray):
+        # The chunks were written into the cache directory while the file was parsed
+        try:
+            data.store.finish()
+            write_cache_files(cache_dir, filepath, parsed, {
+                "layout": CHUNKED_LAYOUT,
+                "dtype": data.dtype.name,
+                "shape": list(data.shape),
+                "chunk_shape": list(data.store.chunk_shape),
+            })
+            return True
+        except OSError:
+            return False
+
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    try:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "original_data.npy"), data)
+        write_cache_files(tmp_dir, filepath, parsed, {
+            "layout": ARRAY_LAYOUT,
+            "dtype": data.dtype.name,
+            "shape": list(data.shape),
+        })
+
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.replace(tmp_dir, cache_dir)
+        return True
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return False
+
+
+def parse_to_store(filepath, storage_format=storage.DEFAULT_FORMAT, channel=0):
+    """Parses a channel straight into a chunked cache, so the matrix never has to fit in memory.
+
+    Returns the parsed channel reading from the chunks, or None when no 'x-axis' row is found.
+    """
+    reader = formats.detect_reader(filepath)
+    header = reader["read_header"](filepath, channel)
+    if header is None:
+        return None
+
+    timestamps = readers.GrowableArray(dtype=object)
+    data = create_store(filepath, header["num_columns"] - readers.DATA_COLUMN_OFFSET, storage_format, channel)
+    data_end = header["data_start"]
+    for timestamp_chunk, data_chunk, data_end in reader["iter_data_chunks"](filepath, header, storage_format):
+        timestamps.append(timestamp_chunk)
+        data.append(data_chunk)
+
+    parsed = formats.parsed_file(header, timestamps.trim(), storage.decoded(data.trim(), storage_format), data_end)
+    save_cache(filepath, parsed)
+    return parsed
+
+
+def load_or_parse(filepath, storage_format=storage.DEFAULT_FORMAT, chunked=False, channel=0):
+    """Returns a parsed channel from its cache, parsing and caching it when the cache is missing or stale."""
+    parsed = load_cache(filepath, storage_format, chunked, channel)
+    if parsed is not None:
+        return parsed
+
+    shutil.rmtree(cache_dir_for(filepath, channel), ignore_errors=True)
+    if chunked:
+        return parse_to_store(filepath, storage_format, channel)
+    parsed = formats.parse_file(filepath, storage_format, channel)
+    if parsed is None:
+        return None
+    if save_cache(filepath, parsed):
+        # Reopen through the cache so the matrix is memory-mapped like on later opens
+        cached = load_cache(filepath, storage_format, channel=channel)
+        if cached is not None:
+            return cached
+    return parsed
@@ -0,0 +1,265 @@
+import collections
+import os
+import threading
+import zlib
+import numpy as np
+
+# Uncompressed size of one chunk; a chunk spans CHUNK_COLUMNS gauges and as many timestamps as fit
+CHUNK_BYTES = 256 * 1024
+CHUNK_COLUMNS = 1024
+# zlib level 1 compresses shuffled measurement data nearly as well as 9 at several times the speed
+COMPRESSION_LEVEL = 1
+# Decompressed chunks one store keeps in memory, in bytes
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+DATA_FILE = "chunks.bin"
+INDEX_FILE = "chunk_index.npy"
+
+
+def default_chunk_shape(num_columns, dtype):
+    """Returns the timestamps and gauges of one chunk for a matrix of this width and type."""
+    columns = max(1, min(num_columns, CHUNK_COLUMNS))
+    return max(1, CHUNK_BYTES // (np.dtype(dtype).itemsize * columns)), columns
+
+
+def compress(block):
+    """Compresses a block with its bytes shuffled, so the similar high bytes of neighbouring values line up."""
+    block = np.ascontiguousarray(block)
+    shuffled = block.view(np.uint8).reshape(-1, block.dtype.itemsize).T
+    return zlib.compress(shuffled.tobytes(), COMPRESSION_LEVEL)
+
+
+def decompress(blob, shape, dtype):
+    """Inverse of compress()."""
+    dtype = np.dtype(dtype)
+    shuffled = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(shuffled.T).view(dtype).reshape(shape)
+
+
+def block_groups(key, length, block_size):
+    """Splits an index along one axis by the blocks it falls in.
+
+    Returns (block, positions in the result, indices within the block) per
+    block; positions and indices are slices for a slice with step 1 and
+    arrays otherwise. An integer key selects a single index.
+    """
+    if isinstance(key, (int, np.integer)):
+        index = key + length if key < 0 else key
+        if not 0 <= index < length:
+            raise IndexError(f"index {key} is out of bounds for axis with size {length}")
+        key = slice(index, index + 1)
+    if isinstance(key, slice) and key.indices(length)[2] == 1:
+        start, stop, _ = key.indices(length)
+        groups = []
+        for block in range(start // block_size, -(-stop // block_size)):
+            low, high = max(start, block * block_size), min(stop, (block + 1) * block_size)
+            groups.append((block, slice(low - start, high - start),
+                           slice(low - block * block_size, high - block * block_size)))
+        return groups, max(0, stop - start)
+
+    indices = np.arange(length)[key]
+    blocks = indices // block_size
+    order = np.argsort(blocks, kind="stable")
+    starts = np.flatnonzero(np.diff(blocks[order])) + 1
+    groups = []
+    for positions in np.split(order, starts):
+        if len(positions):
+            block = int(blocks[positions[0]])
+            groups.append((block, positions, indices[positions] - block * block_size))
+    return groups, len(indices)
+
+
+def cross(rows, columns):
+    """Returns the index that selects rows x columns, whichever mix of slices and arrays they are."""
+    if isinstance(rows, slice) or isinstance(columns, slice):
+        return rows, columns
+    return np.ix_(rows, columns)
+
+
+class ChunkStore:
+    """Data matrix kept on disk as compressed blocks of timestamps x gauges.
+
+    Reading a cell decompresses the whole chunk it is in, and recently used
+    chunks stay in an LRU cache, so playing, scrubbing nearby timestamps and
+    reading a range only decompress what they touch. Rows are appended while
+    a file is parsed and can be read straight away: the last, incomplete
+    block of rows is served from memory until it is full. Appending and
+    reading may happen on different threads.
+    """
+
+    def __init__(self, directory, num_columns, dtype, chunk_shape=None, index=None, num_rows=0,
+                 cache_bytes=DEFAULT_CACHE_BYTES):
+        self.path = os.path.join(directory, DATA_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.dtype = np.dtype(dtype)
+        self.num_columns = num_columns
+        self.chunk_shape = tuple(chunk_shape) if chunk_shape else default_chunk_shape(num_columns, self.dtype)
+        self.num_blocks = -(-num_columns // self.chunk_shape[1])
+        # (offset, length) in the data file of every chunk, one array of num_blocks pairs per block of rows
+        self.index = [] if index is None else list(index)
+        self.size = num_rows
+        self.pending = np.empty((self.chunk_shape[0], num_columns), dtype=self.dtype)
+        self.writer = None
+        self.reader = None
+        self.chunks = collections.OrderedDict()
+        self.nbytes = 0
+        self.cache_bytes = cache_bytes
+        self.lock = threading.Lock()
+
+    @property
+    def array(self):
+        """Returns a read-only array of the rows appended so far."""
+        return ChunkedArray(self, self.size)
+
+    def reserve(self, capacity):
+        """Does nothing; kept so the store can stand in for a GrowableArray while parsing."""
+
+    def append(self, rows):
+        """Appends a block of rows, compressing and writing every block of rows as it fills up."""
+        chunk_rows = self.chunk_shape[0]
+        done = 0
+        while done < len(rows):
+            filled = self.size - len(self.index) * chunk_rows
+            count = min(chunk_rows - filled, len(rows) - done)
+            with self.lock:
+                self.pending[filled:filled + count] = rows[done:done + count]
+                self.size += count
+            done += count
+            if filled + count == chunk_rows:
+                self.write_block(self.pending)
+
+    def write_block(self, block):
+        """Compresses a block of rows chunk by chunk and appends it to the data file."""
+        if self.writer is None:
+            self.writer = open(self.path, "ab")
+        entries = np.empty((self.num_blocks, 2), dtype=np.int64)
+        columns = self.chunk_shape[1]
+        for k in range(self.num_blocks):
+            blob = compress(block[:, k * columns:(k + 1) * columns])
+            entries[k] = (self.writer.tell(), len(blob))
+            self.writer.write(blob)
+        self.writer.flush()
+        with self.lock:
+            self.index.append(entries)
+            # Readers may still hold the full buffer, so the next rows go into a new one
+            self.pending = np.empty_like(self.pending)
+
+    def finish(self):
+        """Writes the last, incomplete block of rows and the chunk index; nothing is appended after this."""
+        filled = self.size - len(self.index) * self.chunk_shape[0]
+        if filled > 0:
+            self.write_block(self.pending[:filled])
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        index = np.array(self.index, dtype=np.int64).reshape(len(self.index), self.num_blocks, 2)
+        np.save(self.index_path, index)
+
+    def reopen(self):
+        """Takes the last, incomplete block of rows back into memory so rows can be appended after finish()."""
+        chunk_rows = self.chunk_shape[0]
+        filled = self.size % chunk_rows
+        if not self.index or filled == 0:
+            return
+        block = self.read(slice(self.size - filled, self.size), slice(None), self.size)
+        with self.lock:
+            self.pending = np.empty_like(self.pending)
+            self.pending[:filled] = block
+            # The old chunks of the block stay in the data file, unreferenced
+            self.index.pop()
+            for key in [key for key in self.chunks if key[0] == len(self.index)]:
+                self.nbytes -= self.chunks.pop(key).nbytes
+
+    def trim(self):
+        """Finishes the store and returns the array of all its rows, like GrowableArray.trim()."""
+        self.finish()
+        return self.array
+
+    def chunk(self, row_block, column_block):
+        """Returns one decompressed chunk; the incomplete last block of rows comes from memory."""
+        key = (row_block, column_block)
+        columns = self.chunk_shape[1]
+        with self.lock:
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                self.chunks.move_to_end(key)
+                return chunk
+            if row_block >= len(self.index):
+                filled = self.size - len(self.index) * self.chunk_shape[0]
+                return self.pending[:filled, column_block * columns:(column_block + 1) * columns].copy()
+            offset, length = self.index[row_block][column_block]
+            if self.reader is None:
+                self.reader = open(self.path, "rb")
+            self.reader.seek(offset)
+            blob = self.reader.read(length)
+
+        width = min(columns, self.num_columns - column_block * columns)
+        first_row = row_block * self.chunk_shape[0]
+        height = min(self.chunk_shape[0], self.size - first_row) if row_block == len(self.index) - 1 \
+            else self.chunk_shape[0]
+        chunk = decompress(blob, (height, width), self.dtype)
+        chunk.flags.writeable = False
+
+        with self.lock:
+            self.chunks[key] = chunk
+            self.nbytes += chunk.nbytes
+            while self.nbytes > self.cache_bytes and len(self.chunks) > 1:
+                _, old = self.chunks.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return chunk
+
+    def read(self, row_key, column_key, num_rows):
+        """Returns data[row_key, column_key] of the first num_rows rows, decompressing only the chunks involved."""
+        row_groups, height = block_groups(row_key, num_rows, self.chunk_shape[0])
+        column_groups, width = block_groups(column_key, self.num_columns, self.chunk_shape[1])
+        values = np.empty((height, width), dtype=self.dtype)
+        for row_block, row_positions, chunk_rows in row_groups:
+            for column_block, column_positions, chunk_columns in column_groups:
+                chunk = self.chunk(row_block, column_block)
+                values[cross(row_positions, column_positions)] = chunk[cross(chunk_rows, chunk_columns)]
+        return values
+
+
+class ChunkedArray:
+    """Read-only array-like view of the first rows of a ChunkStore.
+
+    Supports the indexing the viewers use, data[i], data[a:b] and
+    data[rows, cols] with at most one index array, and returns plain arrays.
+    """
+
+    def __init__(self, store, num_rows):
+        self.store = store
+        self.shape = (num_rows, store.num_columns)
+        self.ndim = 2
+        self.dtype = store.dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            row_key, column_key = key
+        else:
+            row_key, column_key = key, slice(None)
+        if all(not isinstance(k, (slice, int, np.integer)) for k in (row_key, column_key)):
+            raise IndexError("Only one of the row and column keys may be an index array.")
+        values = self.store.read(row_key, column_key, self.shape[0])
+        # Integer keys drop their axis, as they do on an ndarray
+        if isinstance(column_key, (int, np.integer)):
+            values = values[:, 0]
+        if isinstance(row_key, (int, np.integer)):
+            values = values[0]
+        return values
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+
+def open_store(directory, shape, dtype, chunk_shape):
+    """Opens a finished store; raises ValueError when its index does not match the shape."""
+    index = np.load(os.path.join(directory, INDEX_FILE))
+    num_rows, num_columns = shape
+    store = ChunkStore(directory, num_columns, dtype, chunk_shape, index, num_rows)
+    if index.shape != (-(-num_rows // store.chunk_shape[0]), store.num_blocks, 2):
+        raise ValueError("The chunk index does not match the matrix.")
+    return store
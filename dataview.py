@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class OffsetView:
+    """Read-only view of a data matrix with per-distance offsets added on access.
+
+    The base matrix is never copied or modified: indexing returns only the
+    selected rows and columns with every offset vector added in order, so
+    the result matches adding the offsets to the whole matrix one by one.
+    Supports the indexing the viewers use: data[i], data[a:b] and data[rows, cols].
+    """
+
+    def __init__(self, base, offsets):
+        self.base = base
+        self.offsets = [np.asarray(offset, dtype=np.float64) for offset in offsets]
+        self.shape = base.shape
+        self.ndim = 2
+        self.dtype = np.dtype(np.float64)
+
+    def __len__(self):
+        return len(self.base)
+
+    def extend(self, base):
+        """Points the view at a longer matrix that starts with the rows of its base, e.g. of a followed file."""
+        self.base = base
+        self.shape = base.shape
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            row_key, column_key = key
+        else:
+            row_key, column_key = key, slice(None)
+        values = np.array(self.base[row_key, column_key], dtype=np.float64)
+        for offset in self.offsets:
+            values += offset[column_key]
+        return values
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+
+class ScaledView:
+    """Read-only view of an integer matrix that stores values with a fixed number of decimals.
+
+    Indexing returns float64 values, with NaN wherever the matrix holds the
+    invalid marker; values is the compact integer matrix itself.
+    """
+
+    def __init__(self, values, decimals, invalid):
+        self.values = values
+        # Dividing by the power of ten undoes the encoding exactly; multiplying by 0.001 is off by a bit for some values
+        self.divisor = 10.0 ** decimals
+        self.invalid = invalid
+        self.shape = values.shape
+        self.ndim = values.ndim
+        self.dtype = np.dtype(np.float64)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, key):
+        raw = np.asarray(self.values[key])
+        values = np.asarray(raw / self.divisor, dtype=np.float64)
+        values[raw == self.invalid] = np.nan
+        return values if values.ndim else values[()]
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+
+def view_offsets(data):
+    """Returns the offsets a data matrix shows on top of its base, in order; none for a plain matrix."""
+    return list(data.offsets) if isinstance(data, OffsetView) else []
+
+
+def apply_offsets(base, offsets):
+    """Returns the base matrix itself when there is nothing to add, else a lazy OffsetView."""
+    offsets = [offset for offset in offsets if offset is not None]
+    if not offsets:
+        return base
+    return OffsetView(base, offsets)
+
+
+def range_columns(valid_indices):
+    """Returns the columns of a distance range as a slice when they are contiguous, else as an index array.
+
+    A slice selects a view of each row, so a range is never masked per frame.
+    """
+    columns = np.flatnonzero(valid_indices)
+    if columns[-1] - columns[0] + 1 == len(columns):
+        return slice(int(columns[0]), int(columns[-1]) + 1)
+    return columns
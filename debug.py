@@ -0,0 +1,81 @@
+"""
+Opt-in frame timing for the plotting hot path.
+
+Disabled by default; set LUNA_DEBUG=1 or tick "Debug Timings" in the UI.
+While disabled a timed function costs one flag check.
+"""
+import collections
+import functools
+import logging
+import os
+import time
+
+logger = logging.getLogger("luna")
+
+# Number of recent timings kept per function
+HISTORY = 500
+
+enabled = os.environ.get("LUNA_DEBUG", "").strip() not in ("", "0")
+timings = collections.defaultdict(lambda: collections.deque(maxlen=HISTORY))
+
+
+def configure_logging():
+    """Sends the debug records to stderr if nothing else handles them yet."""
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+
+
+def set_enabled(flag):
+    """Turns timing on or off at runtime; turning it off logs a summary."""
+    global enabled
+    if flag:
+        configure_logging()
+        timings.clear()
+    elif enabled:
+        for line in summary():
+            logger.debug(line)
+    enabled = flag
+
+
+def record(name, seconds):
+    """Stores one timing and logs it."""
+    timings[name].append(seconds)
+    logger.debug("frame %s %.2f ms", name, seconds * 1000)
+
+
+def timed(func):
+    """Decorator recording the wall time of every call while timing is enabled."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def summary():
+    """Returns one line per timed function with call count, mean, 95th percentile and max in ms."""
+    lines = []
+    for name, values in sorted(timings.items()):
+        ordered = sorted(values)
+        mean = sum(ordered) / len(ordered)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        lines.append(
+            f"{name}: n={len(ordered)} mean={mean * 1000:.2f} ms "
+            f"p95={p95 * 1000:.2f} ms max={ordered[-1] * 1000:.2f} ms"
+        )
+    return lines
+
+
+if enabled:
+    configure_logging()
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+def minmax_decimate(x, y, num_bins):
+    """Reduces a line to the minimum and maximum point of each of num_bins index bins.
+
+    Peaks survive because every bin keeps its extremes; points stay in x order.
+    """
+    n = len(y)
+    if n <= 2 * num_bins or num_bins < 1:
+        return x, y
+
+    bin_size = -(-n // num_bins)
+    num_blocks = -(-n // bin_size)
+    # Pad the last bin with its final value so every bin has the same length
+    padded = np.empty(num_blocks * bin_size, dtype=y.dtype)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    blocks = padded.reshape(num_blocks, bin_size)
+
+    offsets = np.arange(num_blocks) * bin_size
+    lows = blocks.argmin(axis=1) + offsets
+    highs = blocks.argmax(axis=1) + offsets
+    indices = np.concatenate(([0], np.minimum(lows, n - 1), np.minimum(highs, n - 1), [n - 1]))
+    indices = np.unique(indices)
+    return x[indices], y[indices]
+
+
+def visible_slice(x, xlim):
+    """Returns the slice of a sorted x array inside xlim, plus one point on each side."""
+    if len(x) < 2 or not x[0] <= x[-1]:
+        return slice(None)
+    start = max(0, np.searchsorted(x, min(xlim), side="left") - 1)
+    stop = min(len(x), np.searchsorted(x, max(xlim), side="right") + 1)
+    return slice(start, stop)
+
+
+class DecimatedLines:
+    """Draws lines on an axes at screen resolution and redecimates them on zoom and pan.
+
+    The full data of every line is kept here; the Line2D only ever holds about
+    two points per horizontal pixel of the part that is in view.
+    """
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.lines = {}
+        # Axes.clear() replaces the callback registry, so connect per instance
+        self.cid = ax.callbacks.connect("xlim_changed", self.on_xlim_changed)
+
+    def decimate(self, x, y):
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if not self.ax.get_autoscalex_on():
+            view = visible_slice(x, self.ax.get_xlim())
+            x, y = x[view], y[view]
+        return minmax_decimate(x, y, max(1, int(self.ax.bbox.width)))
+
+    def plot(self, x, y, **kwargs):
+        """Plots a line like Axes.plot and remembers its full data."""
+        line, = self.ax.plot(*self.decimate(x, y), **kwargs)
+        self.lines[line] = (x, y)
+        return line
+
+    def set_data(self, line, x, y):
+        """Replaces the full data of a line plotted through this object."""
+        self.lines[line] = (x, y)
+        line.set_data(*self.decimate(x, y))
+
+    def on_xlim_changed(self, ax):
+        # The toolbar redraws after zoom and pan, so only the data needs updating
+        for line, (x, y) in self.lines.items():
+            line.set_data(*self.decimate(x, y))
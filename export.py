@@ -0,0 +1,164 @@
+import csv
+import os
+import numpy as np
+import pandas as pd
+
+# Excel limits per sheet; the first column holds the distances
+EXCEL_MAX_COLUMNS = 16384
+EXCEL_MAX_ROWS = 1048576
+# Characters Excel does not allow in sheet names, and the name length limit
+EXCEL_SHEET_NAME_FORBIDDEN = '[]:*?/\\'
+EXCEL_SHEET_NAME_LENGTH = 31
+# Number of cells read from the data and written per chunk
+CHUNK_CELLS = 1_000_000
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".xlsx": "excel"}
+
+
+def export_format(filepath):
+    """Returns the export format for a file name, from its extension."""
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported export format '{extension}', use .xlsx, .csv or .parquet.")
+    return FORMATS[extension]
+
+
+def section_path(filepath, name):
+    """Returns the file a section is written to when every section gets its own CSV or Parquet file."""
+    stem, extension = os.path.splitext(filepath)
+    return f"{stem}_{name}{extension}"
+
+
+def column_names(distances):
+    """Returns the header of each distance column, exact so nearby distances stay distinct."""
+    return [str(float(distance)) for distance in distances]
+
+
+def write_csv(filepath, data, timestamps, columns, distances, progress):
+    """Writes one row per timestamp with a column per distance, a block of rows at a time."""
+    rows_per_chunk = max(1, CHUNK_CELLS // max(1, len(distances)))
+    with open(filepath, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["Timestamp"] + column_names(distances))
+        for start in range(0, len(data), rows_per_chunk):
+            stop = min(len(data), start + rows_per_chunk)
+            chunk = pd.DataFrame(data[start:stop, columns])
+            chunk.insert(0, "Timestamp", np.asarray(timestamps[start:stop]))
+            chunk.to_csv(f, header=False, index=False, lineterminator="\n")
+            progress((stop - start) * len(distances))
+
+
+def write_parquet(filepath, data, timestamps, columns, distances, progress):
+    """Writes one row per timestamp with a column per distance, a row group per block of rows."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow).") from e
+
+    names = ["Timestamp"] + column_names(distances)
+    schema = pa.schema([pa.field("Timestamp", pa.string())] + [pa.field(name, pa.float64()) for name in names[1:]])
+    rows_per_chunk = max(1, CHUNK_CELLS // max(1, len(distances)))
+    with pq.ParquetWriter(filepath, schema) as writer:
+        for start in range(0, len(data), rows_per_chunk):
+            stop = min(len(data), start + rows_per_chunk)
+            block = np.asarray(data[start:stop, columns], dtype=np.float64)
+            arrays = [pa.array(np.asarray(timestamps[start:stop]).astype(str))]
+            arrays += [pa.array(block[:, i]) for i in range(block.shape[1])]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            progress((stop - start) * len(distances))
+
+
+def sheet_names(name, count):
+    """Returns valid, distinct Excel sheet names for the parts of a section."""
+    name = "".join("_" if char in EXCEL_SHEET_NAME_FORBIDDEN else char for char in name) or "Data"
+    if count == 1:
+        return [name[:EXCEL_SHEET_NAME_LENGTH]]
+    names = []
+    for part in range(1, count + 1):
+        suffix = f" ({part})"
+        names.append(name[:EXCEL_SHEET_NAME_LENGTH - len(suffix)] + suffix)
+    return names
+
+
+def unique_names(names):
+    """Numbers repeated section names, so sheets and files never overwrite each other."""
+    seen = {}
+    result = []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        result.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return result
+
+
+def write_excel_sheets(workbook, name, data, timestamps, columns, distances, progress):
+    """Appends a section in the Luna layout, a row per distance and a column per timestamp.
+
+    Sections wider or taller than a sheet are split over several sheets.
+    Rows are streamed, so only one block of the data is in memory at a time.
+    """
+    column_indices = np.arange(data.shape[1])[columns]
+    timestamps_per_sheet = EXCEL_MAX_COLUMNS - 1
+    distances_per_sheet = EXCEL_MAX_ROWS - 1
+    parts = [
+        (t0, min(len(data), t0 + timestamps_per_sheet), d0, min(len(distances), d0 + distances_per_sheet))
+        for t0 in range(0, max(1, len(data)), timestamps_per_sheet)
+        for d0 in range(0, max(1, len(distances)), distances_per_sheet)
+    ]
+
+    for (t0, t1, d0, d1), title in zip(parts, sheet_names(name, len(parts))):
+        sheet = workbook.create_sheet(title)
+        sheet.append(["Distance"] + [str(timestamp) for timestamp in timestamps[t0:t1]])
+        # Read a block of distances at a time and write it transposed
+        distances_per_block = max(1, CHUNK_CELLS // max(1, t1 - t0))
+        for b0 in range(d0, d1, distances_per_block):
+            b1 = min(d1, b0 + distances_per_block)
+            block = np.asarray(data[t0:t1, column_indices[b0:b1]], dtype=np.float64).T
+            cells = np.where(np.isfinite(block), block, None)
+            for distance, values in zip(distances[b0:b1], cells.tolist()):
+                sheet.append([float(distance)] + values)
+            progress((t1 - t0) * (b1 - b0))
+
+
+def export_sections(filepath, data, timestamps, sections, check_cancelled=None, report=None):
+    """Writes sections of the data, given as (name, columns, distances), to .xlsx, .csv or .parquet.
+
+    Excel gets one or more sheets per section in a single workbook, written in
+    constant-memory mode; CSV and Parquet get one file per section when there
+    are several. Returns the paths written.
+    """
+    fmt = export_format(filepath)
+    sections = [(name, columns, distances) for name, (_, columns, distances) in zip(
+        unique_names([name for name, _, _ in sections]), sections
+    )]
+    total_cells = max(1, len(data) * sum(len(distances) for _, _, distances in sections))
+    written = 0
+
+    def progress(cells):
+        nonlocal written
+        written += cells
+        if check_cancelled is not None:
+            check_cancelled()
+        if report is not None:
+            report(min(99, 100 * written // total_cells))
+
+    if fmt == "excel":
+        try:
+            from openpyxl import Workbook
+        except ImportError as e:
+            raise ImportError("Excel export needs openpyxl (pip install openpyxl).") from e
+        workbook = Workbook(write_only=True)
+        for name, columns, distances in sections:
+            write_excel_sheets(workbook, name, data, timestamps, columns, distances, progress)
+        workbook.save(filepath)
+        paths = [filepath]
+    else:
+        writer = write_csv if fmt == "csv" else write_parquet
+        paths = []
+        for name, columns, distances in sections:
+            path = filepath if len(sections) == 1 else section_path(filepath, name)
+            writer(path, data, timestamps, columns, distances, progress)
+            paths.append(path)
+
+    if report is not None:
+        report(100)
+    return paths
@@ -0,0 +1,234 @@
+"""
+Live tail of a measurement file the interrogator is still writing.
+
+The byte offset after the last parsed row is remembered and the file is
+polled for growth; only the rows written since are parsed on a worker
+thread and appended to the matrix, the statistics table and the sliders,
+so an update costs as much as the new rows, whatever the size of the file.
+"""
+import os
+import numpy as np
+from tkinter import messagebox
+import plotter as plot
+import processing as util
+import chunkstore
+import dataview
+import formats
+import readers
+import storage
+import tasks
+import window
+
+# How often a followed file is checked for new rows, in milliseconds
+POLL_INTERVAL_MS = 1000
+
+
+def attach(app, filepath, name, parsed):
+    """Remembers where the rows of a loaded channel end, and starts polling when Follow file is ticked.
+
+    parsed["buffers"], when set, are the timestamp and data buffers the file
+    was read into; otherwise the loaded arrays are copied into new ones on
+    the worker once the first rows arrive.
+    """
+    detach(app)
+    app.tail = {
+        "filepath": filepath,
+        "name": name,
+        "channel": parsed["channel"],
+        # Only the last channel can grow: the others end where the next one's header starts
+        "followable": parsed["channel"] == parsed["channels"] - 1,
+        # Reader of the file and header of the channel, found once on the worker after a cache hit
+        "reader": None,
+        "header": parsed.get("header"),
+        "data_end": parsed["data_end"],
+        "buffers": parsed.get("buffers"),
+    }
+    if app.follow_var.get():
+        start(app)
+
+
+def detach(app):
+    """Stops following the loaded file, e.g. before another one is opened."""
+    stop(app)
+    app.tail = None
+
+
+def start(app):
+    """Starts polling the loaded file for new rows."""
+    tail = app.tail
+    if tail is None:
+        return
+    if not tail["followable"]:
+        app.follow_var.set(False)
+        messagebox.showinfo("Info", "Only the last channel of a file can grow; load it to follow the file.")
+        return
+    if app.follow_after_id is None:
+        app.follow_after_id = app.master.after(POLL_INTERVAL_MS, lambda: poll(app))
+    show_status(app)
+
+
+def stop(app):
+    """Stops polling; rows already appended stay."""
+    if app.follow_after_id is not None:
+        app.master.after_cancel(app.follow_after_id)
+        app.follow_after_id = None
+    if app.follow_task is not None:
+        app.follow_task.cancel()
+        app.follow_task = None
+
+
+def toggle_follow(app):
+    """Starts or stops following the loaded file; with no file loaded the next one opened is followed."""
+    if app.follow_var.get():
+        start(app)
+    else:
+        stop(app)
+        if app.tail is not None:
+            show_status(app)
+
+
+def show_status(app):
+    """Shows the number of timestamps in the file label, and whether the file is followed."""
+    if app.data is None or app.tail is None:
+        return
+    following = ", following" if app.follow_after_id is not None else ""
+    app.file_label.config(text=f"{app.tail['name']} ({len(app.data)} timestamps{following})", fg="black")
+
+
+def poll(app):
+    """Checks the size of the followed file and reads the rows written since the last check."""
+    app.follow_after_id = None
+    tail = app.tail
+    if tail is None:
+        return
+
+    if app.follow_task is None:
+        try:
+            size = os.path.getsize(tail["filepath"])
+        except OSError:
+            size = None
+        if size is None or size < tail["data_end"]:
+            # Truncated, replaced or removed: the remembered offset means nothing any more
+            app.follow_var.set(False)
+            show_status(app)
+            messagebox.showinfo("Info", f"{tail['name']} was truncated or removed; stopped following it.")
+            return
+        if size > tail["data_end"]:
+            storage_format = app.storage_format
+            # The arrays the first rows are appended to, copied into growable buffers on the worker
+            loaded = (app.timestamps, app.original_data) if tail["buffers"] is None else None
+
+            def on_done(result):
+                app.follow_task = None
+                if app.tail is tail:
+                    append_rows(app, tail, result)
+
+            def on_error(error):
+                app.follow_task = None
+                if app.tail is tail:
+                    stop(app)
+                    app.follow_var.set(False)
+                    show_status(app)
+                    messagebox.showerror("Error", f"Failed to read new rows: {error}")
+
+            def on_cancel():
+                app.follow_task = None
+
+            app.follow_task = tasks.BackgroundTask(
+                app, None, lambda task: read_new_rows(task, tail, storage_format, loaded),
+                on_done=on_done, on_error=on_error, on_cancel=on_cancel
+            ).start()
+
+    app.follow_after_id = app.master.after(POLL_INTERVAL_MS, lambda: poll(app))
+
+
+def read_new_rows(task, tail, storage_format, loaded=None):
+    """Worker: parses the complete rows written after tail["data_end"].
+
+    Returns (timestamps, data, data_end, buffers) with the data in the
+    storage format, or None when no complete row was added yet. buffers are
+    the growable copies of the loaded arrays when they were passed in, else None.
+    """
+    if tail["reader"] is None:
+        tail["reader"] = formats.detect_reader(tail["filepath"])
+    if tail["header"] is None:
+        header = tail["reader"]["read_header"](tail["filepath"], tail["channel"])
+        if header is None:
+            raise ValueError("No 'x-axis' cell found in the file any more.")
+        tail["header"] = header
+
+    # The half-written last line is left for the next poll
+    header = dict(tail["header"], data_start=tail["data_end"], data_stop=None, growing=True)
+    timestamp_chunks = []
+    data_chunks = []
+    data_end = tail["data_end"]
+    for timestamp_chunk, data_chunk, data_end in tail["reader"]["iter_data_chunks"](
+        tail["filepath"], header, storage_format
+    ):
+        task.check_cancelled()
+        timestamp_chunks.append(timestamp_chunk)
+        data_chunks.append(data_chunk)
+    if not data_chunks:
+        return None
+    buffers = growable_buffers(*loaded) if loaded is not None else None
+    return np.concatenate(timestamp_chunks), np.concatenate(data_chunks), data_end, buffers
+
+
+def growable_buffers(timestamps, data):
+    """Worker: copies the loaded timestamps and matrix into buffers that rows can be appended to."""
+    timestamp_buffer = readers.GrowableArray(dtype=object, capacity=len(timestamps) * 3 // 2 + 1)
+    timestamp_buffer.append(timestamps)
+    data = storage.raw(data)
+    if isinstance(data, chunkstore.ChunkedArray):
+        # Rows are appended to the chunks of the cache; it is rebuilt on the next open as the file changed
+        data.store.reopen()
+        return timestamp_buffer, data.store
+    data_buffer = readers.GrowableArray(data.shape[1:], data.dtype, capacity=len(data) * 3 // 2 + 1)
+    data_buffer.append(data)
+    return timestamp_buffer, data_buffer
+
+
+def append_rows(app, tail, result):
+    """Appends newly read rows to the matrix, the statistics and the sliders, and follows them if asked."""
+    if result is None:
+        return
+    timestamp_chunk, data_chunk, data_end, buffers = result
+    tail["data_end"] = data_end
+    if tail["buffers"] is None:
+        tail["buffers"] = buffers
+    timestamp_buffer, data_buffer = tail["buffers"]
+    previous_data = app.data
+    previous_rows = len(app.data)
+    timestamp_buffer.append(timestamp_chunk)
+    data_buffer.append(data_chunk)
+    app.original_stats_table.append(storage.decoded(data_chunk, app.storage_format))
+
+    # Same tare and zero references on top of the longer matrix; the waterfall keeps the rows it was opened with
+    app.timestamps = timestamp_buffer.array
+    app.original_data = storage.decoded(data_buffer.array, app.storage_format)
+    if isinstance(app.data, dataview.OffsetView):
+        # The view stays the same object, so what was derived from it, like rendered frames, stays valid
+        app.data.extend(app.original_data)
+    else:
+        app.data = app.original_data
+    window.extend_frame_renderer(app, previous_data)
+    if app.data is app.original_data:
+        app.stats_table = app.original_stats_table
+    elif app.stats_task is not None or app.stats_table is None:
+        # A recomputation of the old matrix would be discarded, so restart it on the new one
+        util.refresh_stats(app)
+    else:
+        app.stats_table.append(app.data[previous_rows:])
+
+    last = len(app.data) - 1
+    app.slider.config(to=last)
+    if app.range_slider is not None and app.range_window is not None:
+        app.range_slider.config(to=last)
+    if app.spatial_slider is not None and app.spatial_window is not None:
+        app.spatial_slider.config(to=last)
+    plot.extend_stats_plot(app)
+
+    if app.stick_var.get():
+        app.slider.set(last)
+        util.update_timestamp(app, last)
+    show_status(app)
@@ -0,0 +1,87 @@
+import os
+import readers
+import storage
+
+# Registered readers, tried in order on every file that is opened
+READERS = []
+
+
+def register_reader(name, extensions, sniff, read_header, iter_data_chunks, write_sample=None):
+    """Adds a reader for a file format; a file is read by the first reader that recognises it.
+
+    sniff(head, filepath) gets the first readers.SNIFF_BYTES bytes of a file
+    and says whether the reader can read it. read_header(filepath, channel)
+    and iter_data_chunks(filepath, header, storage_format) work like those
+    of readers.py. write_sample(filepath, rows, gauges), when given, writes
+    a synthetic file so benchmark.py can time the reader.
+    """
+    READERS.append({
+        "name": name,
+        "extensions": tuple(extensions),
+        "sniff": sniff,
+        "read_header": read_header,
+        "iter_data_chunks": iter_data_chunks,
+        "write_sample": write_sample,
+    })
+
+
+def detect_reader(filepath):
+    """Returns the reader that recognises a file from its first bytes; raises ValueError when none does."""
+    head = readers.read_head(filepath)
+    for reader in READERS:
+        if reader["sniff"](head, filepath):
+            return reader
+    raise ValueError(f"{os.path.basename(filepath)} is not in a format any reader recognises.")
+
+
+def file_types():
+    """Returns the file dialog filters: every registered format together, then each on its own."""
+    patterns = [" ".join(f"*{extension}" for extension in reader["extensions"]) for reader in READERS]
+    return (
+        [("Measurement files", " ".join(patterns))] +
+        [(reader["name"], pattern) for reader, pattern in zip(READERS, patterns)] +
+        [("All files", "*.*")]
+    )
+
+
+def parsed_file(header, timestamps, data, data_end):
+    """Returns the parsed file of a channel from its header and the rows read up to the byte offset data_end."""
+    return {
+        "timestamps": timestamps,
+        "distances": header["distances"],
+        "data": data,
+        "tare_options": header["tare_options"],
+        "tare_values": header["tare_values"],
+        "header_lines": header["header_lines"],
+        "channel": header["channel"],
+        "channels": header["channels"],
+        "data_end": data_end,
+    }
+
+
+def parse_file(filepath, storage_format=storage.DEFAULT_FORMAT, channel=0, reader=None):
+    """Parses one channel of a measurement file with the given reader or the one that recognises it.
+
+    The data is kept in the storage format and returned decoded, see storage.decoded().
+    Returns None when no 'x-axis' row is found.
+    """
+    if reader is None:
+        reader = detect_reader(filepath)
+    header = reader["read_header"](filepath, channel)
+    if header is None:
+        return None
+
+    timestamps = readers.GrowableArray(dtype=object)
+    data = readers.GrowableArray((header["num_columns"] - readers.DATA_COLUMN_OFFSET,), storage.format_name(storage_format))
+    data_end = header["data_start"]
+    for timestamp_chunk, data_chunk, data_end in reader["iter_data_chunks"](filepath, header, storage_format):
+        timestamps.append(timestamp_chunk)
+        data.append(data_chunk)
+    return parsed_file(header, timestamps.trim(), storage.decoded(data.trim(), storage_format), data_end)
+
+
+register_reader(
+    "Luna text export", (".tsv", ".txt", ".csv"),
+    lambda head, filepath: readers.sniff_delimiter(head) is not None,
+    readers.read_header, readers.iter_data_chunks, readers.write_sample
+)
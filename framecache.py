@@ -0,0 +1,126 @@
+import collections
+import threading
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import tasks
+
+# Memory the pre-rendered frames of one view may use, in bytes
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+# How long an idle renderer waits before looking at its target again, in seconds
+IDLE_WAIT_S = 0.1
+
+
+class FrameCache:
+    """LRU cache of rendered RGBA frames keyed by timestamp index, bounded by a memory budget.
+
+    Every invalidate() starts a new generation; frames rendered for an older
+    generation are dropped when they arrive. Shared by the UI and renderer threads.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.frames = collections.OrderedDict()
+        self.nbytes = 0
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, idx):
+        return idx in self.frames
+
+    def get(self, idx):
+        """Returns the frame of a timestamp, or None, and marks it as recently used."""
+        with self.lock:
+            frame = self.frames.get(idx)
+            if frame is not None:
+                self.frames.move_to_end(idx)
+            return frame
+
+    def put(self, idx, frame, generation):
+        """Stores a frame rendered for a generation, evicting the least recently used ones over budget."""
+        with self.lock:
+            if generation != self.generation:
+                return False
+            old = self.frames.pop(idx, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self.frames[idx] = frame
+            self.nbytes += frame.nbytes
+            while self.nbytes > self.budget_bytes and len(self.frames) > 1:
+                _, evicted = self.frames.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+            return True
+
+    def invalidate(self):
+        """Drops every frame and starts a new generation."""
+        with self.lock:
+            self.frames.clear()
+            self.nbytes = 0
+            self.generation += 1
+            return self.generation
+
+
+class FrameRenderer:
+    """Renders the frames around a moving target index into a FrameCache on a worker thread.
+
+    figure is an offscreen copy of the view that only this renderer touches;
+    set_frame(idx) points its animated artists at a timestamp. Only those
+    artists are redrawn per frame, on top of a background drawn once.
+    """
+
+    def __init__(self, app, cache, figure, animated, set_frame, num_frames, radius):
+        self.cache = cache
+        self.generation = cache.generation
+        self.figure = figure
+        self.animated = animated
+        self.set_frame = set_frame
+        self.num_frames = num_frames
+        self.radius = radius
+        # Index to render around, stride between frames and playback direction
+        self.target = (0, 1, 1)
+        self.wake = threading.Event()
+        self.task = tasks.BackgroundTask(app, None, self.run)
+
+    def start(self):
+        self.task.start()
+        return self
+
+    def move_to(self, idx, step=1, direction=1):
+        """Re-centres rendering on a timestamp, preferring frames in the direction of travel."""
+        self.target = (idx, max(1, step), 1 if direction >= 0 else -1)
+        self.wake.set()
+
+    def stop(self):
+        self.task.cancel()
+        self.wake.set()
+
+    def next_index(self):
+        """Returns the nearest frame around the target that is not cached yet, or None."""
+        center, step, direction = self.target
+        candidates = [center]
+        for k in range(1, self.radius + 1):
+            candidates += [center + direction * k * step, center - direction * k * step]
+        for idx in candidates:
+            if 0 <= idx < self.num_frames and idx not in self.cache:
+                return idx
+        return None
+
+    def run(self, task):
+        canvas = FigureCanvasAgg(self.figure)
+        for artist in self.animated:
+            artist.set_animated(True)
+        canvas.draw()
+        background = canvas.copy_from_bbox(self.figure.bbox)
+
+        while True:
+            task.check_cancelled()
+            idx = self.next_index()
+            if idx is None:
+                self.wake.wait(IDLE_WAIT_S)
+                self.wake.clear()
+                continue
+            self.set_frame(idx)
+            canvas.restore_region(background)
+            for artist in self.animated:
+                self.figure.draw_artist(artist)
+            if not self.cache.put(idx, np.asarray(canvas.buffer_rgba()).copy(), self.generation):
+                return
@@ -0,0 +1,123 @@
+import collections
+import os
+import numpy as np
+import cache
+
+# Gauge positions of this many point/measurement file pairs are kept in memory
+POSITION_CACHE_SIZE = 8
+# Suffix of the optional file placing fibre segments on the polyline, next to the points CSV
+SEGMENTS_SUFFIX = "_segments.csv"
+
+_position_cache = collections.OrderedDict()
+
+
+def arc_length(x_coords, y_coords):
+    """Returns the cumulative length along a polyline at each of its points, starting at 0."""
+    steps = np.hypot(np.diff(x_coords), np.diff(y_coords))
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+class Polyline:
+    """The CAD polyline the fibre follows, with the cumulative length at every point.
+
+    The points need not be evenly spaced; positions between them are
+    interpolated linearly along each straight piece.
+    """
+
+    def __init__(self, x_coords, y_coords):
+        self.x = np.asarray(x_coords, dtype=np.float64)
+        self.y = np.asarray(y_coords, dtype=np.float64)
+        self.lengths = arc_length(self.x, self.y)
+
+    @property
+    def length(self):
+        return self.lengths[-1]
+
+    def points_at(self, lengths):
+        """Returns the X and Y coordinates at lengths along the polyline; NaN off its ends."""
+        lengths = np.asarray(lengths, dtype=np.float64)
+        outside = ~((lengths >= 0) & (lengths <= self.length))
+        x = np.interp(lengths, self.lengths, self.x)
+        y = np.interp(lengths, self.lengths, self.y)
+        x[outside] = np.nan
+        y[outside] = np.nan
+        return x, y
+
+
+def whole_fibre(distances, polyline):
+    """Returns the default segment: the first to the last gauge spread over the whole polyline."""
+    finite = np.asarray(distances, dtype=np.float64)
+    finite = finite[np.isfinite(finite)]
+    if len(finite) == 0:
+        return []
+    return [(finite.min(), finite.max(), 0.0, polyline.length)]
+
+
+def polyline_lengths(distances, segments):
+    """Maps fibre distances to lengths along the polyline, segment by segment.
+
+    Each segment is (fibre start, fibre end, polyline start, polyline end):
+    the gauges between the two fibre distances are placed linearly between
+    the two polyline lengths, so the segment may run either way along the
+    polyline and its gauge pitch may differ from the CAD point interval.
+    Gauges outside every segment, e.g. lead-in fibre, get NaN. Where
+    segments overlap the first one wins.
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    lengths = np.full(distances.shape, np.nan)
+    for fibre_start, fibre_end, line_start, line_end in segments:
+        low, high = min(fibre_start, fibre_end), max(fibre_start, fibre_end)
+        inside = np.isnan(lengths) & (distances >= low) & (distances <= high)
+        scale = (line_end - line_start) / (fibre_end - fibre_start) if fibre_end != fibre_start else 0.0
+        lengths[inside] = line_start + (distances[inside] - fibre_start) * scale
+    return lengths
+
+
+def gauge_positions(x_coords, y_coords, distances, segments=None):
+    """Returns the XY position of every gauge along the polyline.
+
+    Without segments the first and last gauge sit on the ends of the polyline
+    and every gauge in between at the same fraction of its length. Gauges
+    without a distance or outside every segment get NaN coordinates.
+    """
+    polyline = Polyline(x_coords, y_coords)
+    if not segments:
+        segments = whole_fibre(distances, polyline)
+    return polyline.points_at(polyline_lengths(distances, segments))
+
+
+def segments_path(points_path):
+    """Returns the segments file that belongs to a points CSV, or None when there is none."""
+    path = os.path.splitext(points_path)[0] + SEGMENTS_SUFFIX
+    return path if os.path.exists(path) else None
+
+
+def pair_key(points_path, data_path, channel=0):
+    """Returns what identifies the gauge positions of a points CSV and a channel of a measurement file."""
+    seg_path = segments_path(points_path)
+    return tuple(
+        tuple(sorted(cache.source_key(path).items())) if path else None
+        for path in (points_path, seg_path, data_path)
+    ) + (channel,)
+
+
+def cached_gauge_positions(points_path, data_path, x_coords, y_coords, distances, segments=None, channel=0):
+    """Returns gauge_positions() for a pair of files, reusing it while neither file changes.
+
+    Without file paths, e.g. while a file is still loading, nothing is cached.
+    """
+    if not points_path or not data_path:
+        return gauge_positions(x_coords, y_coords, distances, segments)
+    try:
+        key = pair_key(points_path, data_path, channel)
+    except OSError:
+        return gauge_positions(x_coords, y_coords, distances, segments)
+
+    positions = _position_cache.get(key)
+    if positions is None:
+        positions = gauge_positions(x_coords, y_coords, distances, segments)
+        _position_cache[key] = positions
+        while len(_position_cache) > POSITION_CACHE_SIZE:
+            _position_cache.popitem(last=False)
+    _position_cache.move_to_end(key)
+    return positions
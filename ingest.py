@@ -0,0 +1,344 @@
+"""
+Network ingest of strain frames pushed by an acquisition PC, and a replay client that streams a file.
+
+A connection sends either text or binary frames:
+
+- Text: the 'x-axis' row of a Luna export, then data rows, tab or comma
+  separated and newline terminated, exactly as they appear in the file.
+- Binary: frames of FRAME_HEADER (magic, kind, timestamp in seconds since
+  the epoch, number of values) followed by the values, little-endian:
+  float64 gauge distances for a DISTANCES frame, float32 strains for a
+  DATA frame. The first frame must hold the distances.
+
+The server runs an asyncio loop on its own thread and hands parsed rows to
+the UI through a bounded queue. When the queue is full it stops reading,
+so TCP pushes back on the sender, or with drop_when_full it drops the rows
+and counts them.
+
+Usage: python -m ingest FILE [--host HOST] [--port PORT] [--unix PATH] [--rate ROWS_PER_SECOND]
+                             [--binary] [--loop] [--channel N]
+"""
+import argparse
+import asyncio
+import datetime
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+import numpy as np
+import formats
+import readers
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5025
+# Batches of rows queued for the UI before the server stops reading or drops rows
+MAX_QUEUED_BATCHES = 1024
+# Bytes read from a connection at a time; every complete row or frame in them is parsed as one batch
+READ_BYTES = 256 * 1024
+# How long the server waits before retrying a full queue, in seconds
+THROTTLE_SECONDS = 0.005
+# Binary frames: magic, kind, timestamp and number of values, then the values
+FRAME_MAGIC = b"LUNA"
+FRAME_HEADER = struct.Struct("<4sBdI")
+DISTANCES_FRAME = 0
+DATA_FRAME = 1
+# Timestamps of the text exports, to milliseconds
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# Replay: rows sent per second by default, and how often the client sends the rows that are due
+REPLAY_RATE = 100.0
+REPLAY_TICK_SECONDS = 0.01
+
+
+def format_timestamp(seconds):
+    """Formats a binary frame's timestamp like the timestamps of the text exports."""
+    return datetime.datetime.fromtimestamp(seconds).strftime(TIMESTAMP_FORMAT)[:-3]
+
+
+def timestamp_seconds(timestamp):
+    """Returns the seconds since the epoch of a timestamp formatted like the text exports, or None."""
+    try:
+        return datetime.datetime.strptime(str(timestamp), TIMESTAMP_FORMAT).timestamp()
+    except ValueError:
+        return None
+
+
+def distances_frame(distances):
+    """Returns a binary DISTANCES frame."""
+    distances = np.asarray(distances, dtype="<f8")
+    return FRAME_HEADER.pack(FRAME_MAGIC, DISTANCES_FRAME, 0.0, len(distances)) + distances.tobytes()
+
+
+def data_frame(seconds, values):
+    """Returns a binary DATA frame of one timestamp."""
+    values = np.asarray(values, dtype="<f4")
+    return FRAME_HEADER.pack(FRAME_MAGIC, DATA_FRAME, seconds, len(values)) + values.tobytes()
+
+
+class IngestServer:
+    """TCP or Unix socket server turning incoming frames into batches of rows for the UI.
+
+    frames holds ("distances", distances) and ("rows", timestamps, data)
+    items in arrival order. received, dropped and throttled count the rows
+    parsed, the rows dropped (malformed, before the distances, or on a full
+    queue with drop_when_full) and the times reading paused for a full queue.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, max_queued=MAX_QUEUED_BATCHES,
+                 drop_when_full=False):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.drop_when_full = drop_when_full
+        self.frames = queue.Queue(maxsize=max_queued)
+        self.received = 0
+        self.dropped = 0
+        self.throttled = 0
+        self.address = None
+        self.error = None
+        self.loop = None
+        self.stopped = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    def start(self):
+        """Starts listening; raises OSError when the address cannot be bound."""
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stop(self):
+        """Closes the server and every connection."""
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stopped.set)
+            self.thread.join(timeout=1)
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        try:
+            if self.path is not None:
+                server = await asyncio.start_unix_server(self._handle, path=self.path)
+            else:
+                server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.address = server.sockets[0].getsockname()
+        self.ready.set()
+        async with server:
+            await self.stopped.wait()
+        # Leaving asyncio.run() cancels the connection handlers still running
+
+    async def _handle(self, reader, writer):
+        try:
+            # The first bytes tell binary frames from text rows
+            buffer = b""
+            while len(buffer) < len(FRAME_MAGIC) and FRAME_MAGIC.startswith(buffer):
+                chunk = await reader.read(READ_BYTES)
+                if not chunk:
+                    return
+                buffer += chunk
+            if buffer.startswith(FRAME_MAGIC):
+                await self._read_binary(reader, buffer)
+            else:
+                await self._read_text(reader, buffer)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Cancelled when the server stops; the connection simply ends
+            pass
+        finally:
+            writer.close()
+
+    async def _put(self, item, rows=0):
+        """Queues an item; on a full queue waits, pushing back on the sender, or drops the rows."""
+        if self.drop_when_full and rows:
+            try:
+                self.frames.put_nowait(item)
+            except queue.Full:
+                self.dropped += rows
+            return
+        throttled = False
+        while True:
+            try:
+                self.frames.put_nowait(item)
+                return
+            except queue.Full:
+                if not throttled:
+                    self.throttled += 1
+                    throttled = True
+                await asyncio.sleep(THROTTLE_SECONDS)
+
+    async def _read_text(self, reader, buffer):
+        delimiter = None
+        num_columns = None
+        while buffer:
+            complete, _, buffer = buffer.rpartition(b"\n")
+            lines = [line.decode("utf-8", errors="replace") + "\n" for line in complete.split(b"\n") if line.strip()]
+            if delimiter is None and lines:
+                delimiter = readers.sniff_delimiter(complete) or "\t"
+            data_lines = []
+            for line in lines:
+                if readers.is_x_axis_row(line, delimiter):
+                    await self._put_rows(data_lines, num_columns, delimiter)
+                    data_lines = []
+                    cells = line.rstrip("\r\n").split(delimiter)
+                    num_columns = len(cells)
+                    await self._put(("distances", readers.cells_to_numeric(cells, num_columns - readers.DATA_COLUMN_OFFSET)))
+                else:
+                    data_lines.append(line)
+            await self._put_rows(data_lines, num_columns, delimiter)
+            chunk = await reader.read(READ_BYTES)
+            if not chunk:
+                break
+            buffer += chunk
+
+    async def _put_rows(self, lines, num_columns, delimiter):
+        if not lines:
+            return
+        if num_columns is None:
+            # Rows before the 'x-axis' row have no distances to be drawn against
+            self.dropped += len(lines)
+            return
+        try:
+            timestamps, data = readers.parse_lines(lines, num_columns, np.float64, delimiter)
+        except ValueError:
+            self.dropped += len(lines)
+            return
+        self.received += len(lines)
+        await self._put(("rows", timestamps, data), len(lines))
+
+    async def _read_binary(self, reader, buffer):
+        width = None
+        while True:
+            timestamps = []
+            values = []
+            position = 0
+            while len(buffer) - position >= FRAME_HEADER.size:
+                magic, kind, seconds, count = FRAME_HEADER.unpack_from(buffer, position)
+                if magic != FRAME_MAGIC:
+                    raise ConnectionError("Lost the frame boundaries.")
+                size = FRAME_HEADER.size + count * (8 if kind == DISTANCES_FRAME else 4)
+                if len(buffer) - position < size:
+                    break
+                payload = buffer[position + FRAME_HEADER.size:position + size]
+                position += size
+                if kind == DISTANCES_FRAME:
+                    await self._put_frames(timestamps, values)
+                    timestamps, values = [], []
+                    width = count
+                    await self._put(("distances", np.frombuffer(payload, dtype="<f8").astype(np.float64)))
+                elif kind == DATA_FRAME and count == width:
+                    timestamps.append(format_timestamp(seconds))
+                    values.append(np.frombuffer(payload, dtype="<f4"))
+                else:
+                    self.dropped += 1
+            await self._put_frames(timestamps, values)
+            chunk = await reader.read(READ_BYTES)
+            if not chunk:
+                break
+            buffer = buffer[position:] + chunk
+
+    async def _put_frames(self, timestamps, values):
+        if not timestamps:
+            return
+        self.received += len(timestamps)
+        await self._put(("rows", np.array(timestamps, dtype=object), np.vstack(values).astype(np.float64)), len(timestamps))
+
+
+async def replay(filepath, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, rate=REPLAY_RATE, binary=False,
+                 loop=False, channel=0):
+    """Streams a channel of a measurement file to an ingest server at rate rows per second; returns the rows sent."""
+    reader = formats.detect_reader(filepath)
+    header = reader["read_header"](filepath, channel)
+    if header is None:
+        raise ValueError("No 'x-axis' cell found in the file.")
+    if path is not None:
+        _, writer = await asyncio.open_unix_connection(path)
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+
+    delimiter = header["delimiter"]
+    if binary:
+        writer.write(distances_frame(header["distances"]))
+    else:
+        labels = [readers.X_AXIS_LABEL] + [""] * (readers.DATA_COLUMN_OFFSET - 1)
+        writer.write((delimiter.join(labels + [repr(float(d)) for d in header["distances"]]) + "\n").encode())
+
+    sent = 0
+    start_time = time.perf_counter()
+    try:
+        while True:
+            for timestamps, data, _ in reader["iter_data_chunks"](filepath, header):
+                done = 0
+                while done < len(data):
+                    # Rows due by now at the requested rate; drain() waits while the server pushes back
+                    due = int((time.perf_counter() - start_time) * rate) - sent
+                    if due <= 0:
+                        await asyncio.sleep(REPLAY_TICK_SECONDS)
+                        continue
+                    rows = slice(done, done + due)
+                    if binary:
+                        # The file's own timestamps; rows without a readable one are spaced at the rate
+                        now = time.time()
+                        writer.write(b"".join(
+                            data_frame(seconds if seconds is not None else now + i / rate, row)
+                            for i, (seconds, row) in enumerate(zip(map(timestamp_seconds, timestamps[rows]), data[rows]))
+                        ))
+                    else:
+                        writer.write("".join(
+                            delimiter.join([str(timestamp)] + [""] * (readers.DATA_COLUMN_OFFSET - 1) +
+                                           [repr(float(v)) for v in row]) + "\n"
+                            for timestamp, row in zip(timestamps[rows], data[rows])
+                        ).encode())
+                    await writer.drain()
+                    count = len(data[rows])
+                    done += count
+                    sent += count
+            if not loop:
+                break
+    finally:
+        writer.close()
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ingest",
+        description="Stream a measurement file to the viewer's ingest server, as a stand-in for the acquisition PC."
+    )
+    parser.add_argument("file", help="Measurement file to replay")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Server address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Server port (default: {DEFAULT_PORT})")
+    parser.add_argument("--unix", metavar="PATH", help="Connect to a Unix socket instead of TCP")
+    parser.add_argument("--rate", type=float, default=REPLAY_RATE,
+                        help=f"Rows sent per second (default: {REPLAY_RATE:g})")
+    parser.add_argument("--binary", action="store_true", help="Send binary frames instead of text rows")
+    parser.add_argument("--loop", action="store_true", help="Start over at the end of the file until interrupted")
+    parser.add_argument("--channel", type=int, default=1, metavar="N",
+                        help="Channel to replay in files that hold several (default: 1)")
+    args = parser.parse_args(argv)
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.unix and not hasattr(socket, "AF_UNIX"):
+        parser.error("Unix sockets are not available on this system")
+
+    start_time = time.perf_counter()
+    try:
+        sent = asyncio.run(replay(
+            args.file, args.host, args.port, args.unix, args.rate, args.binary, args.loop, args.channel - 1
+        ))
+    except (OSError, ValueError) as e:
+        print(f"Replay failed: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    print(f"Sent {sent} rows in {time.perf_counter() - start_time:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,88 +1,216 @@
+import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import pandas as pd
 import plotter as plot
 import processing as util
+import cache
+import follow
+import formats
+import geometry
+import readers
+import stats
+import storage
+import stream
+import tasks
+import window
+
+
 def load_file(app):
-    """Load file and show loading window."""
-    master = app.master
-    loading_window = tk.Toplevel(master)
-    loading_window.title("Loading")
-    loading_window.geometry("300x100")
-    filepath = filedialog.askopenfilename(filetypes=[("TSV files", "*.tsv")])
+    """Asks for a measurement file and loads its first channel."""
+    if app.loading:
+        messagebox.showinfo("Info", "A file is still loading.")
+        return
+
+    filepath = filedialog.askopenfilename(filetypes=formats.file_types())
     if not filepath:
-        loading_window.destroy()
         return
+    start_loading(app, filepath)
+
+
+def load_channel(app, channel):
+    """Loads another channel of the current file; each channel is parsed and cached on its own."""
+    if app.loading:
+        messagebox.showinfo("Info", "Wait for the file to finish loading.")
+        return
+    if app.filepath is None or channel == app.channel:
+        return
+    start_loading(app, app.filepath, channel)
+
+
+def start_loading(app, filepath, channel=0):
+    """Loads a channel of a file on a worker thread, showing rows as they arrive while the UI stays live."""
+    name = os.path.basename(filepath)
+    if channel:
+        name = f"{name} (channel {channel + 1})"
+    storage_format = app.storage_var.get()
+    chunked = app.chunked_var.get()
+    following = app.follow_var.get()
+    follow.detach(app)
+    stream.stop_stream(app)
+    app.loading = True
+    app.filepath = None
+    app.file_label.config(text=f"{name} (loading...)", fg="gray")
+
+    def on_progress(payload):
+        if "header" in payload:
+            apply_header(app, payload["header"])
+            app.data = None
+        else:
+            timestamps, data, stats_table = payload["rows"]
+            show_rows(app, timestamps, data, stats_table, first=app.data is None)
+            app.file_label.config(text=f"{name} (loading, {len(timestamps)} timestamps)", fg="gray")
 
-    try:
-        df = pd.read_csv(filepath, sep='\t', header=None, skiprows=31, engine='python')
-        df = df.astype(str)
-        x_axis_row = util.find_x_axis_row(df)
-        if x_axis_row is None:
+    def on_done(parsed):
+        app.loading = False
+        if parsed is None:
+            app.file_label.config(text="No file loaded", fg="gray")
             messagebox.showerror(
                 "Error",
                 "No 'x-axis' cell found in the file."
             )
-            loading_window.destroy()
             return
+        if len(parsed["timestamps"]) == 0 or parsed["data"].shape[1] == 0:
+            app.file_label.config(text="No file loaded", fg="gray")
+            messagebox.showerror(
+                "Error",
+                "Data does not have enough rows or columns to plot."
+            )
+            return
+        show_rows(app, parsed["timestamps"], parsed["data"], parsed["stats_table"], first=app.data is None)
+        app.filepath = filepath
+        app.storage_format = storage_format
+        app.chunked = chunked
+        app.channel = channel
+        plot.update_stats_plot(app)
+        app.file_label.config(text=f"{name} ({len(app.data)} timestamps)", fg="black")
+        follow.attach(app, filepath, name, parsed)
 
-    except (pd.errors.ParserError, FileNotFoundError, OSError, ValueError) as e:
+    def on_error(error):
+        app.loading = False
+        app.file_label.config(text="No file loaded", fg="gray")
         messagebox.showerror(
             "Error",
-            f"Failed to load file: {e}"
+            f"Failed to load file: {error}"
         )
-        loading_window.destroy()
-        return
-    finally:
-        loading_window.destroy()
 
-    if df.shape[0] < 2 or df.shape[1] < 2:
-        messagebox.showerror(
-            "Error",
-            "Data does not have enough rows or columns to plot."
+    def on_cancel():
+        app.loading = False
+        loaded = len(app.data) if app.data is not None else 0
+        app.file_label.config(text=f"{name} (cancelled, {loaded} timestamps)", fg="gray")
+
+    tasks.BackgroundTask(
+        app, f"Loading {name}...", lambda task: read_file(task, filepath, storage_format, chunked, channel, following),
+        on_done=on_done, on_progress=on_progress, on_error=on_error, on_cancel=on_cancel
+    ).start()
+
+
+def read_file(task, filepath, storage_format=storage.DEFAULT_FORMAT, chunked=False, channel=0, following=False):
+    """Worker: returns the cached channel, or parses it in batches and reports the rows read so far.
+
+    The file is read by the registered reader that recognises it, see formats.py.
+    The matrix is kept in the storage format and handed out decoded, see storage.decoded().
+    A chunked file is written straight to compressed chunks on disk as it is parsed.
+    A followed file is still being written: it is not cached, and its buffers
+    are returned so follow.py can append the rows that arrive later.
+    """
+    parsed = cache.load_cache(filepath, storage_format, chunked, channel)
+    if parsed is not None:
+        task.report(0, {"header": parsed})
+        if parsed["stats_table"] is None:
+            # Show the rows straight away; the stats panel computes the current row until the table is ready
+            task.report(0, {"rows": (parsed["timestamps"], parsed["data"], stats.StatsTable())})
+            parsed["stats_table"] = stats.compute_stats_table(parsed["data"], task.check_cancelled, task.report)
+        return parsed
+
+    reader = formats.detect_reader(filepath)
+    header = reader["read_header"](filepath, channel)
+    if header is None:
+        return None
+    # A followed file may end in a half-written line
+    header["growing"] = following
+    task.report(0, {"header": header})
+
+    width = header["num_columns"] - readers.DATA_COLUMN_OFFSET
+    timestamps = readers.GrowableArray(dtype=object)
+    if chunked:
+        data = cache.create_store(filepath, width, storage_format, channel)
+    else:
+        data = readers.GrowableArray((width,), storage.format_name(storage_format))
+    stats_table = stats.StatsTable()
+    # Bytes of this channel's data block, for the progress and the first size estimate
+    data_start = data_end = header["data_start"]
+    data_size = max(1, (header["data_stop"] or os.path.getsize(filepath)) - data_start)
+
+    for timestamp_chunk, data_chunk, data_end in reader["iter_data_chunks"](filepath, header, storage_format):
+        task.check_cancelled()
+        if timestamps.size == 0:
+            # Size the buffers from the first batch so they rarely need to grow
+            estimated_rows = int(len(data_chunk) * data_size / max(1, data_end - data_start) * 1.05)
+            timestamps.reserve(estimated_rows)
+            data.reserve(estimated_rows)
+        timestamps.append(timestamp_chunk)
+        data.append(data_chunk)
+        stats_table.append(storage.decoded(data_chunk, storage_format))
+        task.report(
+            min(99, 100 * (data_end - data_start) // data_size),
+            {"rows": (timestamps.array, storage.decoded(data.array, storage_format), stats_table)}
         )
-        return
 
-    df = df.astype(str)
-    tare_cells = df.iloc[:x_axis_row, :].apply(
-        lambda row: row.str.contains('Tare', case=False, na=False)
-    ).stack()
-    tare_options = [
-        (idx[0] + 1, idx[1] + 1)
-        for idx, value in tare_cells.items() if value
-    ]
+    parsed = formats.parsed_file(header, timestamps.array, storage.decoded(data.array, storage_format), data_end)
+    parsed["header"] = header
+    parsed["stats_table"] = stats_table
+    if following:
+        parsed["buffers"] = (timestamps, data)
+        return parsed
+    if timestamps.size and cache.save_cache(filepath, parsed):
+        cached = cache.load_cache(filepath, storage_format, chunked, channel)
+        if cached is not None:
+            cached["stats_table"] = stats_table
+            return cached
+    parsed["timestamps"] = timestamps.trim()
+    parsed["data"] = storage.decoded(data.trim(), storage_format)
+    return parsed
+
 
-    tare_values = None
+def apply_header(app, header):
+    """Sets up distances, tare options, the channel choice and the file preview from the parsed header."""
+    tare_options = header["tare_options"]
+    tare_values = header["tare_values"]
     tare_dropdown = None
 
+    if app.channel_dropdown is not None:
+        app.channel_dropdown.destroy()
+        app.channel_dropdown = None
+    if header["channels"] > 1:
+        channel_labels = [f"Channel {number}" for number in range(1, header["channels"] + 1)]
+        channel_var = tk.StringVar(value=channel_labels[header["channel"]])
+        app.channel_dropdown = tk.OptionMenu(app.load_frame, channel_var, *channel_labels)
+        app.channel_dropdown.pack(side=tk.LEFT, padx=5)
+        channel_var.trace("w", lambda *args: load_channel(app, channel_labels.index(channel_var.get())))
+
+    if hasattr(app, "tare_dropdown") and app.tare_dropdown is not None:
+        app.tare_dropdown.destroy()
+        app.tare_dropdown = None
+
     if tare_options:
-        tare_values = df.iloc[
-            [row - 1 for row, _ in tare_options], 3:
-        ].apply(
-            pd.to_numeric, errors='coerce'
-        ).values
-
-        if hasattr(app, "tare_dropdown") and app.tare_dropdown is not None:
-            app.tare_dropdown.destroy()
-            app.tare_dropdown = None
-
-        tare_var = tk.StringVar(
-            value=f"Row {tare_options[0][0]}, Column {tare_options[0][1]}"
-        )
+        tare_labels = [f"Row {row}, Column {col}" for row, col in tare_options]
+        tare_var = tk.StringVar(value=tare_labels[0])
         tare_dropdown = tk.OptionMenu(
             app.zeroing_frame,
             tare_var,
-            *[f"Row {row}, Column {col}" for row, col in tare_options]
+            *tare_labels
         )
         tare_dropdown.pack(side=tk.LEFT, padx=5)
         app.tare_dropdown = tare_dropdown
 
         def confirm_tare_selection(*args):
             selected_option = tare_var.get()
-            selected_row = int(
-                selected_option.split()[1].strip(',')
-            )
-            app.tare = tare_values[selected_row - 1]
+            app.tare = tare_values[tare_labels.index(selected_option)]
+            if app.zeroing_enabled and not app.loading:
+                # Swapping the tare only swaps an offset vector
+                util.update_data_view(app)
+                util.refresh_stats(app)
+                plot.plot_deformation(app)
 
         tare_var.trace("w", confirm_tare_selection)
         app.tare = tare_values[0]
@@ -92,34 +220,49 @@ def load_file(app):
         app.tare_values = None
         app.tare = None
 
-    app.timestamps = df.iloc[x_axis_row + 1:, 0].values
-    app.distances = pd.to_numeric(
-        df.iloc[x_axis_row, 3:].values,
-        errors='coerce'
-    )
-    app.original_data = df.iloc[
-        x_axis_row + 1:,
-        3:
-    ].apply(pd.to_numeric, errors='coerce').values
-    app.data = app.original_data.copy()
-    app.current_timestamp_idx = 0
+    app.distances = header["distances"]
 
+    app.data_text.config(state=tk.NORMAL)
+    app.data_text.delete(1.0, tk.END)
+    app.data_text.insert(tk.END, "\n".join(header["header_lines"]) + "\n")
+    app.data_text.config(state=tk.DISABLED)
+
+
+def show_rows(app, timestamps, data, stats_table, first):
+    """Hands the rows loaded so far and their statistics to the app and extends the slider over them."""
+    app.timestamps = timestamps
+    if first:
+        # Tare and zero references of the previous file do not apply to this one
+        app.zeroing_enabled = False
+        app.zero_offsets = []
+        # Ranges refer to columns of the previous file
+        if app.range_window is not None:
+            window.close_range_window(app)
+        # Gauge positions and colour scale refer to the previous file
+        plot.close_spatial_window(app)
+        plot.close_waterfall_window(app)
+    # The matrix is never modified in place, so views and memory maps can be shared
+    app.original_data = data
+    app.data = app.original_data
+    app.original_stats_table = stats_table
+    app.stats_table = stats_table
     app.slider.config(from_=0, to=len(app.data) - 1)
-    app.slider.set(0)
-
-    app.update_stats()
-    app.plot_deformation = plot.plot_deformation
-    app.plot_deformation(app)
-
-    try:
-        with open(filepath, "r", encoding="utf-8") as file:
-            lines = file.readlines()[:30]
-            app.data_text.config(state=tk.NORMAL)
-            app.data_text.delete(1.0, tk.END)
-            app.data_text.insert(tk.END, "".join(lines))
-            app.data_text.config(state=tk.DISABLED)
-    except (OSError, IOError) as e:
-        messagebox.showerror("Error", f"Failed to read file: {e}")
+
+    if first:
+        app.current_timestamp_idx = 0
+        app.slider.set(0)
+        app.update_stats()
+        app.plot_deformation = plot.plot_deformation
+        app.plot_deformation(app)
+
+
+def read_layout(csv_file_path):
+    """Reads the polyline points and, when a segments file sits next to them, the fibre segments."""
+    segments_path = geometry.segments_path(csv_file_path)
+    segments = readers.read_segments_csv(segments_path) if segments_path else None
+    return readers.read_points_csv(csv_file_path), segments
+
+
 def load_csv_file(app):
     """Load CSV with point coordinates and plot them."""
     csv_file_path = filedialog.askopenfilename(
@@ -131,5 +274,19 @@ def load_csv_file(app):
             "No CSV file selected."
         )
         return
+    if app.loading:
+        messagebox.showinfo("Info", "Wait for the file to finish loading.")
+        return
     app.csv_file_path = csv_file_path
-    plot.plot_spatial_layout(app)
+
+    def on_done(layout):
+        app.layout_points, app.layout_segments = layout
+        plot.plot_spatial_layout(app)
+
+    def on_error(error):
+        messagebox.showerror("Error", f"Failed to read CSV file: {error}")
+
+    tasks.BackgroundTask(
+        app, "Reading XY coordinates...", lambda task: read_layout(csv_file_path),
+        on_done=on_done, on_error=on_error, cancellable=False
+    ).start()
@@ -11,7 +11,12 @@ import processing as util
 import plotter as plot
 import window
 import player
+import follow
+import stream
 import autoupdate
+import debug
+import stats
+import storage
 import os
 
 repo_url = "https://github.com/Veitners/Luna-reader"
@@ -61,12 +66,38 @@ class DeformationApp:
             command=lambda: [load.load_csv_file(self)]
         )
         self.load_csv_button.pack(side=tk.LEFT, padx=5)
+
+        # Button to receive frames from the acquisition PC instead of a file
+        self.stream_button = tk.Button(
+            self.load_frame, text="Listen for Frames",
+            command=lambda: stream.toggle_stream(self)
+        )
+        self.stream_button.pack(side=tk.LEFT, padx=5)
         # Label to display the loaded file name
         self.file_label = tk.Label(
             self.load_frame, text="No file loaded", fg="gray"
         )
         self.file_label.pack(side=tk.LEFT, padx=5)
 
+        # How the next file's matrix is kept in memory and in its cache
+        self.storage_var = tk.StringVar(value=storage.DEFAULT_FORMAT)
+        self.storage_menu = tk.OptionMenu(self.load_frame, self.storage_var, *storage.FORMATS)
+        self.storage_menu.pack(side=tk.RIGHT, padx=5)
+        tk.Label(self.load_frame, text="Storage (next file):").pack(side=tk.RIGHT)
+        # Compressed chunks on disk instead of one array, for files larger than memory
+        self.chunked_var = tk.BooleanVar(value=False)
+        self.chunked_check = tk.Checkbutton(
+            self.load_frame, text="Compressed chunks", variable=self.chunked_var
+        )
+        self.chunked_check.pack(side=tk.RIGHT, padx=5)
+        # Poll the loaded file for rows the interrogator is still writing
+        self.follow_var = tk.BooleanVar(value=False)
+        self.follow_check = tk.Checkbutton(
+            self.load_frame, text="Follow file", variable=self.follow_var,
+            command=lambda: follow.toggle_follow(self)
+        )
+        self.follow_check.pack(side=tk.RIGHT, padx=5)
+
         # Frame to group zeroing-related buttons
         self.zeroing_frame = tk.LabelFrame(
             app_root, text="Zeroing Options", padx=10, pady=10
@@ -88,6 +119,13 @@ class DeformationApp:
         )
         self.zero_from_timestamp_button.pack(side=tk.LEFT, padx=5)
 
+        # Button to remove the most recent zero reference
+        self.undo_zero_button = tk.Button(
+            self.zeroing_frame, text="Undo Zero",
+            command=lambda: util.undo_zero(self)
+        )
+        self.undo_zero_button.pack(side=tk.LEFT, padx=5)
+
         # Button to add a new range
         self.add_range_button = tk.Button(
             self.zeroing_frame, text="Add Range",
@@ -97,6 +135,8 @@ class DeformationApp:
 
         # Zeroing state
         self.zeroing_enabled = False
+        # Offsets subtracting the zero reference rows, applied lazily on top of original_data
+        self.zero_offsets = []
 
         # Frame to hold playback controls (moved above the slider)
         self.playback_frame = tk.Frame(app_root)
@@ -121,6 +161,27 @@ class DeformationApp:
         )
         self.lock_button.pack(side=tk.RIGHT, padx=5)
 
+        # Button to plot peak and mean deformation over time
+        self.stats_plot_button = tk.Button(
+            self.button_frame, text="Stats Over Time",
+            command=lambda: plot.plot_stats_over_time(self)
+        )
+        self.stats_plot_button.pack(side=tk.RIGHT, padx=5)
+
+        # Button to show every timestamp and gauge at once
+        self.waterfall_button = tk.Button(
+            self.button_frame, text="Waterfall",
+            command=lambda: plot.plot_waterfall(self)
+        )
+        self.waterfall_button.pack(side=tk.RIGHT, padx=5)
+
+        # Button to render playback to a video or image sequence
+        self.export_animation_button = tk.Button(
+            self.button_frame, text="Export Animation",
+            command=lambda: player.export_animation(self, "main")
+        )
+        self.export_animation_button.pack(side=tk.RIGHT, padx=5)
+
         # Play/Pause toggle button
         self.play_pause_button = tk.Button(
             self.button_frame, text="⏯",
@@ -142,6 +203,27 @@ class DeformationApp:
         )
         self.reverse_button.pack(side=tk.LEFT, padx=5)
 
+        # Playback speed, plus stride and measured frame rate while playing
+        self.playback_label = tk.Label(
+            self.button_frame, text=player.speed_text(player.PLAYBACK_RATE)
+        )
+        self.playback_label.pack(side=tk.LEFT, padx=5)
+
+        # Redraw only the current line during playback and slider drags
+        self.fast_redraw_var = tk.BooleanVar(value=True)
+        self.fast_redraw_check = tk.Checkbutton(
+            self.button_frame, text="Fast Redraw", variable=self.fast_redraw_var,
+            command=lambda: plot.plot_deformation(self)
+        )
+        self.fast_redraw_check.pack(side=tk.LEFT, padx=5)
+
+        # Jump to the newest timestamp whenever a followed file grows
+        self.stick_var = tk.BooleanVar(value=False)
+        self.stick_check = tk.Checkbutton(
+            self.button_frame, text="Stick to Latest", variable=self.stick_var
+        )
+        self.stick_check.pack(side=tk.LEFT, padx=5)
+
         # Frame to hold the slider and its label
         self.slider_frame = tk.Frame(app_root)
         self.slider_frame.grid(row=4, column=0, sticky="ew", padx=10, pady=5)
@@ -219,11 +301,16 @@ class DeformationApp:
         self.position_label.pack(side=tk.LEFT, padx=5)
 
         # Playback state
-        self.playback_speed = 1  # 1 for normal, >1 for fast forward, <0 for reverse
+        # Timestamps per second, negative for reverse
+        self.playback_speed = player.PLAYBACK_RATE
         self.playback_running = False
 
-        # Maximum playback speed
-        self.max_playback_speed = 8
+        # Maximum playback speed in timestamps per second
+        self.max_playback_speed = player.PLAYBACK_RATE * player.MAX_SPEED_MULTIPLIER
+        # Fraction of a timestamp carried over between playback frames
+        self.playback_remainder = 0.0
+        # Single timer driving playback in the main window and the range dashboard
+        self.playback_clock = player.PlaybackClock(app_root)
 
         # Data holders
         self.data = None
@@ -231,23 +318,82 @@ class DeformationApp:
         self.distances = None
         self.current_timestamp_idx = 0
         self.original_data = None  # Initialize original_data to avoid pylint error
+        # True while a file is being read in batches
+        self.loading = False
+        # Per-timestamp statistics of data and original_data, and the task recomputing them
+        self.stats_table = None
+        self.original_stats_table = None
+        self.stats_task = None
+        # Statistics over time window
+        self.stats_window = None
+        self.stats_ax = None
+        self.stats_canvas = None
+        self.stats_blit = None
+        self.stats_cursor = None
+        # Lines of the statistics plot and the table they show, so appended rows only extend them
+        self.stats_lines = None
+        # Waterfall window: min/max pyramid of the data, the image of the part in view and its render task
+        self.waterfall_window = None
+        self.waterfall_ax = None
+        self.waterfall_canvas = None
+        self.waterfall_label = None
+        self.waterfall_image = None
+        self.waterfall_blit = None
+        self.waterfall_cursor = None
+        self.waterfall_pyramid = None
+        self.waterfall_task = None
+        self.waterfall_pending = False
+        # Colour limits fixed by the first render of the current data
+        self.waterfall_clim = None
 
         # Enable interactive mode for tooltips
-        # self.figure.canvas.mpl_connect("motion_notify_event", plot.on_hover)
+        self.figure.canvas.mpl_connect("motion_notify_event", lambda event: plot.on_hover(self, event))
 
         # Initialize tare attribute
         self.tare = None
         # Initialize tare_values attribute
         self.tare_values = None
 
+        # Range dashboard: one window and figure shared by every range added with Add Range
+        self.range_window = None
+        self.range_figure = None
+        self.range_canvas = None
+        self.range_blit = None
+        self.range_slider = None
+        self.range_slider_label = None
+        self.range_title = None
+        self.range_ymin_var = None
+        self.range_ymax_var = None
+        self.range_playback_running = False
+        self.range_playback_speed = player.PLAYBACK_RATE
+        self.range_playback_remainder = 0.0
+        self.range_playback_label = None
+        # Optional pre-rendered frames of the dashboard and the thread rendering them
+        self.range_frame_cache_var = None
+        self.range_frame_cache = None
+        self.range_renderer = None
+        self.range_cache_data = None
+        self.range_timestamp_idx = None
+        self.ranges = []
+
         # Initialize plot_window attribute to avoid attribute errors
         self.plot_window = None
         # Initialize colorbar attribute to avoid attribute errors
         self.colorbar = None
         # Initialize current_plot_data attribute to avoid attribute errors
-        self.current_plot_data = []
+        self.current_plot_data = None
+        # Reusable hover tooltip of the main plot
+        self.hover_annotation = None
+        # Blitting state of the main plot: persistent current line and cached background
+        self.blit_manager = None
+        self.current_line = None
+        self.plot_key = None
+        # Full-resolution data behind the decimated lines of the main plot
+        self.plot_lines = None
         # Initialize tare_dropdown to avoid attribute errors
         self.tare_dropdown = None
+        # Channel choice, shown for files that hold several channels
+        self.channel_dropdown = None
 
         # Initialize range_start and range_end attributes
         self.range_start = None
@@ -286,6 +432,14 @@ class DeformationApp:
         )
         self.reset_yaxis_button.pack(side=tk.LEFT, padx=5)
 
+        # Per-frame timings logged to the console (also enabled by LUNA_DEBUG=1)
+        self.debug_var = tk.BooleanVar(value=debug.enabled)
+        self.debug_check = tk.Checkbutton(
+            self.yaxis_frame, text="Debug Timings", variable=self.debug_var,
+            command=lambda: debug.set_enabled(self.debug_var.get())
+        )
+        self.debug_check.pack(side=tk.RIGHT, padx=5)
+
         # Add a button to check for updates
         self.update_button = tk.Button(
             self.load_frame, text="Check for Updates",
@@ -293,14 +447,42 @@ class DeformationApp:
         )
         self.update_button.pack(side=tk.LEFT, padx=5)
 
+        # Path, channel, storage format and cache layout of the loaded file, for exports that reopen it from its cache
+        self.filepath = None
+        self.channel = 0
+        self.storage_format = storage.DEFAULT_FORMAT
+        self.chunked = False
+        # Followed file: end offset of its parsed rows and its buffers, the poll timer and the task reading new rows
+        self.tail = None
+        self.follow_after_id = None
+        self.follow_task = None
+        # Frames received over the network: ingest server, ring buffers and counters, and the refresh timer
+        self.stream = None
+        self.stream_after_id = None
         # Initialize csv_file_path attribute to avoid attribute errors
         self.csv_file_path = None
-
-    def show_loading_window(self, message):
-        """Displays a loading window with a progress bar."""
+        # X and Y coordinates read from the CSV file
+        self.layout_points = None
+        # Fibre segments placed on the polyline, from the optional *_segments.csv next to it
+        self.layout_segments = None
+        # Spatial layout window: gauge XY positions along the polyline, figure, gauges and blitting
+        self.spatial_window = None
+        self.spatial_positions = None
+        self.spatial_figure = None
+        self.spatial_ax = None
+        self.spatial_canvas = None
+        self.spatial_blit = None
+        self.spatial_layout = None
+        self.spatial_title = None
+        self.spatial_slider = None
+        # Timestamp shown in the spatial layout, to skip redundant redraws
+        self.spatial_timestamp_idx = None
+
+    def show_loading_window(self, message, on_cancel=None):
+        """Displays a loading window with a progress bar and an optional Cancel button."""
         loading_window = tk.Toplevel(self.master)
         loading_window.title("Loading")
-        loading_window.geometry("300x100")
+        loading_window.geometry("300x130" if on_cancel else "300x100")
         loading_window.resizable(False, False)
 
         # Center the loading window
@@ -315,6 +497,10 @@ class DeformationApp:
         )
         progress_bar.pack(pady=10)
 
+        if on_cancel is not None:
+            tk.Button(loading_window, text="Cancel", command=on_cancel).pack()
+            loading_window.protocol("WM_DELETE_WINDOW", on_cancel)
+
         return loading_window, progress_var
 
     def add_range(self):
@@ -322,6 +508,9 @@ class DeformationApp:
         if self.data is None or self.distances is None:
             messagebox.showerror("Error", "No data loaded to add a range.")
             return
+        if self.loading:
+            messagebox.showinfo("Info", "Wait for the file to finish loading.")
+            return
 
         # Create a new window for range selection
         range_window = tk.Toplevel(self.master)
@@ -358,7 +547,7 @@ class DeformationApp:
                 if not valid_indices.any():
                     raise ValueError("No data points found in the specified range.")
 
-                # Create a new plot window
+                # Add the range to the dashboard
                 window.create_plot_window(self, start, end, valid_indices)
                 range_window.destroy()
             except ValueError as e:
@@ -384,8 +573,9 @@ class DeformationApp:
 
         dialog_window.geometry(f"+{new_x}+{new_y}")
 
+    @debug.timed
     def update_stats(self):
-        """Updates the statistics displayed in the stats_frame."""
+        """Updates the statistics displayed in the stats_frame from the statistics table."""
         if (
             self.data is None or not hasattr(self.data, '__len__') or len(self.data) == 0 or
             self.current_timestamp_idx >= (len(self.data) if hasattr(self.data, '__len__') else 0)
@@ -395,19 +585,13 @@ class DeformationApp:
             self.timestamp_label.config(text="Timestamp: N/A")
             self.position_label.config(text="Slider Position: 0")
         else:
-            # Ensure self.data is a numpy array for subscripting
-            if not isinstance(self.data, (np.ndarray, list)):
-                self.data = np.array(self.data)
-            current_data = self.data[self.current_timestamp_idx]
-            valid_data = current_data[~np.isnan(current_data)]
-            if len(valid_data) > 0:
-                peak_deformation = np.max(valid_data)
-                avg_deformation = np.mean(valid_data)
+            row = stats.row_stats(self, self.current_timestamp_idx)
+            if not np.isnan(row["peak"]):
                 self.peak_label.config(
-                    text=f"Peak Deformation: {peak_deformation:.2f}"
+                    text=f"Peak Deformation: {row['peak']:.2f} at {row['peak_distance']:.2f}"
                 )
                 self.avg_label.config(
-                    text=f"Average Deformation: {avg_deformation:.2f}"
+                    text=f"Average Deformation: {row['mean']:.2f} (std {row['std']:.2f})"
                 )
             else:
                 self.peak_label.config(text="Peak Deformation: N/A")
@@ -418,6 +602,8 @@ class DeformationApp:
             self.position_label.config(
                 text=f"Slider Position: {self.current_timestamp_idx}"
             )
+            plot.update_stats_cursor(self)
+            plot.update_waterfall_cursor(self)
 
     def run_playback(self):
         """Delegates playback functionality to player.py."""
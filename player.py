@@ -1,10 +1,124 @@
+import collections
+import os
+import time
+from tkinter import filedialog, messagebox, simpledialog
+import animation
+import dataview
 import plotter as plot
+import debug
+import render
+import tasks
+
+# Interval between playback ticks in milliseconds, the frame budget of every view
+TICK_MS = 40
+# Time left to the event loop after a tick that overran its budget, in milliseconds
+MIN_IDLE_MS = 10
+# Normal (1x) playback speed in timestamps per second
+PLAYBACK_RATE = 5
+# Highest playback speed as a multiple of the normal speed
+MAX_SPEED_MULTIPLIER = 1000
+
+class PlaybackClock:
+    """One after() timer that drives playback in every window.
+
+    Views subscribe a callback that is called once per tick with the seconds
+    elapsed since the previous tick. A view whose callback raises is
+    unsubscribed and its on_error called; the other views keep playing. When rendering takes longer than the
+    tick interval fewer frames are drawn and each one advances further (a
+    larger stride), so playback keeps its speed.
+    """
+
+    def __init__(self, master, tick_ms=TICK_MS):
+        self.master = master
+        self.tick_ms = tick_ms
+        self.views = {}
+        self.after_id = None
+        self.last_tick = None
+        # Times of the ticks of the last second, for the measured frame rate
+        self.tick_times = collections.deque()
+        self.skipped_frames = 0
+
+    def subscribe(self, key, callback, on_error=None):
+        """Registers a view's frame callback, starting the clock if it was idle."""
+        self.views[key] = (callback, on_error)
+        if self.after_id is None:
+            self.last_tick = time.perf_counter()
+            self.after_id = self.master.after(self.tick_ms, self.tick)
+
+    def unsubscribe(self, key):
+        """Removes a view, stopping the clock when no view is left."""
+        self.views.pop(key, None)
+        if not self.views and self.after_id is not None:
+            self.master.after_cancel(self.after_id)
+            self.after_id = None
+            self.tick_times.clear()
+
+    @property
+    def fps(self):
+        """Frames dispatched per second, measured over the last second."""
+        if len(self.tick_times) < 2:
+            return 0.0
+        return (len(self.tick_times) - 1) / (self.tick_times[-1] - self.tick_times[0])
+
+    def tick(self):
+        """Dispatches one frame to every view and schedules the next tick."""
+        self.after_id = None
+        now = time.perf_counter()
+        elapsed = now - self.last_tick
+        self.skipped_frames += max(0, round(elapsed * 1000 / self.tick_ms) - 1)
+        self.last_tick = now
+        self.tick_times.append(now)
+        while now - self.tick_times[0] > 1.0:
+            self.tick_times.popleft()
+
+        try:
+            # Views may unsubscribe while being dispatched
+            for key, (callback, on_error) in list(self.views.items()):
+                try:
+                    callback(elapsed)
+                except Exception as e:
+                    self.unsubscribe(key)
+                    if on_error is not None:
+                        on_error(e)
+        finally:
+            if self.views and self.after_id is None:
+                # Rendering time counts against the interval, so the ticks do not drift;
+                # an overrun still leaves the event loop time for input
+                render_ms = (time.perf_counter() - now) * 1000
+                self.after_id = self.master.after(max(MIN_IDLE_MS, int(self.tick_ms - render_ms)), self.tick)
+
+def take_steps(remainder, speed, elapsed):
+    """Returns the whole timestamps to advance at speed timestamps per second over elapsed seconds and the fraction left over."""
+    position = remainder + speed * elapsed
+    steps = int(position)
+    return steps, position - steps
+
+def faster(speed, max_speed):
+    """Doubles a forward speed, or switches a reverse speed to normal forward speed."""
+    if speed > 0:
+        return min(speed * 2, max_speed)
+    return PLAYBACK_RATE
+
+def slower(speed, max_speed):
+    """Doubles a reverse speed, or switches a forward speed to normal reverse speed."""
+    if speed < 0:
+        return max(speed * 2, -max_speed)
+    return -PLAYBACK_RATE
+
+def speed_text(speed, stride=None):
+    """Describes a playback speed, and the stride of the last frame if given."""
+    text = f"{speed:g} ts/s ({speed / PLAYBACK_RATE:g}x)"
+    if stride is not None:
+        text += f", stride {stride}"
+    return text
 
 def toggle_playback(self):
     """Toggles playback mode to run through timestamps automatically."""
     if self.playback_running:
         self.playback_running = False
         self.play_pause_button.config(text="⏵")
+        self.playback_clock.unsubscribe("main")
+        self.playback_label.config(text=speed_text(self.playback_speed))
     else:
         self.playback_running = True
         self.play_pause_button.config(text="⏸")
@@ -12,32 +126,123 @@ def toggle_playback(self):
 
 def fast_forward(self):
     """Increases the playback speed for fast-forwarding through timestamps."""
-    if self.playback_speed > 0:
-        self.playback_speed = min(self.playback_speed * 2, self.max_playback_speed)
-    else:
-        self.playback_speed = 1  # Reset to normal forward speed
+    self.playback_speed = faster(self.playback_speed, self.max_playback_speed)
+    self.playback_label.config(text=speed_text(self.playback_speed))
 
 def reverse(self):
     """Reverses the playback speed for going backward through timestamps."""
-    if self.playback_speed < 0:
-        self.playback_speed = max(self.playback_speed * 2, -self.max_playback_speed)
-    else:
-        self.playback_speed = -1  # Reset to normal reverse speed
+    self.playback_speed = slower(self.playback_speed, self.max_playback_speed)
+    self.playback_label.config(text=speed_text(self.playback_speed))
 
 def run_playback(self):
-    """Runs the playback by updating the timestamp index and refreshing the plot."""
+    """Subscribes the main window to the playback clock."""
+    self.playback_remainder = 0.0
+    self.playback_clock.subscribe(
+        "main", lambda elapsed: playback_frame(self, elapsed), lambda error: playback_failed(self, error)
+    )
+
+def playback_failed(self, error):
+    """Shows the main window's playback as stopped after a frame failed to draw."""
+    self.playback_running = False
+    self.play_pause_button.config(text="⏵")
+    self.playback_label.config(text=speed_text(self.playback_speed))
+    messagebox.showerror("Error", f"Playback stopped: {error}")
+
+@debug.timed
+def playback_frame(self, elapsed):
+    """Advances the main window by the timestamps due for the elapsed seconds and refreshes the plot.
+
+    The stride, the number of timestamps advanced per drawn frame, grows by
+    itself when drawing a frame takes longer than the tick interval.
+    """
     if not self.playback_running or self.data is None:
+        self.playback_clock.unsubscribe("main")
         return
 
-    new_idx = self.current_timestamp_idx + self.playback_speed
-    if 0 <= new_idx < len(self.data):
+    steps, self.playback_remainder = take_steps(
+        self.playback_remainder, self.playback_speed, elapsed
+    )
+    new_idx = min(max(self.current_timestamp_idx + steps, 0), len(self.data) - 1)
+    if new_idx != self.current_timestamp_idx:
+        stride = abs(new_idx - self.current_timestamp_idx)
         self.current_timestamp_idx = new_idx
         self.slider.set(self.current_timestamp_idx)
         self.update_stats()
         plot.plot_deformation(self)
+        self.playback_label.config(
+            text=f"{speed_text(self.playback_speed, stride)}, {self.playback_clock.fps:.0f} fps"
+        )
+
+def export_animation(self, view):
+    """Renders every Nth timestamp of the main plot, the range dashboard or the spatial layout to a video or frames."""
+    if self.data is None or self.filepath is None:
+        messagebox.showerror("Error", "No data loaded to animate.")
+        return
+    if self.loading:
+        messagebox.showinfo("Info", "Wait for the file to finish loading.")
+        return
+    if self.follow_after_id is not None or (self.tail is not None and self.tail["buffers"] is not None):
+        # Workers read the cache, which a growing file does not have
+        messagebox.showinfo("Info", "Stop following the file and open it again to export an animation.")
+        return
 
-    # Schedule the next playback step
-    self.master.after(
-        200 // abs(self.playback_speed),
-        self.run_playback
+    output = filedialog.asksaveasfilename(
+        defaultextension=".mp4",
+        filetypes=[("MP4 video", "*.mp4"), ("GIF animation", "*.gif"), ("PNG frames", "*.png")]
     )
+    if not output:
+        return
+    every = simpledialog.askinteger(
+        "Export Animation", "Render every Nth timestamp:",
+        initialvalue=max(1, len(self.data) // 1000), minvalue=1, parent=self.master
+    )
+    if every is None:
+        return
+
+    # Workers reopen the file from its cache and apply the same tare and zero offsets
+    spec = {
+        "view": view,
+        "filepath": self.filepath,
+        "storage": self.storage_format,
+        "chunked": self.chunked,
+        "channel": self.channel,
+        "offsets": dataview.view_offsets(self.data),
+        "indices": range(0, len(self.data), every),
+        "dpi": 100,
+    }
+    if view == "main":
+        spec.update(
+            figsize=tuple(self.figure.get_size_inches()),
+            ylim=(render.user_limit(self.ymin_var.get()), render.user_limit(self.ymax_var.get())),
+            range_start=self.range_start, range_end=self.range_end,
+        )
+    elif view == "ranges":
+        spec.update(
+            figsize=tuple(self.range_figure.get_size_inches()),
+            ylim=(render.user_limit(self.range_ymin_var.get()), render.user_limit(self.range_ymax_var.get())),
+            ranges=[(rng["start"], rng["end"]) for rng in self.ranges],
+        )
+    else:
+        spec.update(
+            figsize=tuple(self.spatial_figure.get_size_inches()),
+            ylim=self.spatial_layout.get_clim(),
+            points=self.layout_points, segments=self.layout_segments,
+        )
+
+    def on_done(result):
+        messagebox.showinfo(
+            "Info",
+            f"{result['frames']} frames rendered at {result['fps']:.1f} frames/s, "
+            f"saved to {result['output']}"
+        )
+
+    def on_error(e):
+        messagebox.showerror("Error", f"Failed to export animation: {e}")
+
+    tasks.BackgroundTask(
+        self, f"Exporting {os.path.basename(output)}...",
+        lambda task: animation.export_animation(
+            spec, output, check_cancelled=task.check_cancelled, report=task.report
+        ),
+        on_done=on_done, on_error=on_error
+    ).start()
@@ -4,18 +4,53 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-
-
+from blitting import BlitManager
+from decimation import DecimatedLines
+import debug
+import geometry
+import player
+import processing as util
+import pyramid
+import render
+import spatial
+import tasks
+
+# Hover tooltips snap to points within this many pixels of the cursor
+HOVER_RADIUS_PX = 10
+# Upper bound on the points compared per mouse move when zoomed far out
+HOVER_MAX_CANDIDATES = 2000
+
+
+@debug.timed
 def plot_deformation(self):
     """Plots the deformation values against distances for the current timestamp."""
     if self.data is None:
         return
 
+    deformation_values = self.data[self.current_timestamp_idx]
+    valid_indices = render.valid_points(deformation_values, self.distances, self.range_start, self.range_end)
+
+    deformation_values = deformation_values[valid_indices]
+    distances = self.distances[valid_indices]
+
+    # Store the current line's data, sorted by distance, for hover tooltips
+    self.current_plot_data = build_hover_index(distances, deformation_values)
+
+    if fast_redraw(self, distances, deformation_values):
+        return
+
     self.ax.clear()
+    if self.blit_manager is None or self.blit_manager.canvas is not self.canvas:
+        if self.blit_manager is not None:
+            self.blit_manager.disconnect()
+        self.blit_manager = BlitManager(self.canvas)
+    self.blit_manager.clear()
+    # Lines are drawn at screen resolution and redecimated on zoom and pan
+    self.plot_lines = DecimatedLines(self.ax)
 
     # Plot locked lines
     for line_data in self.locked_lines:
-        self.ax.plot(
+        self.plot_lines.plot(
             line_data["distances"],
             line_data["deformation_values"],
             label=line_data["label"],
@@ -23,47 +58,32 @@ def plot_deformation(self):
             color=line_data["color"]
         )
 
-    deformation_values = self.data[self.current_timestamp_idx]
-    valid_indices = (~pd.isna(deformation_values)) & (~pd.isna(self.distances)) & \
-                    (self.distances >= self.range_start) & (self.distances <= self.range_end)
-
-    deformation_values = deformation_values[valid_indices]
-    distances = self.distances[valid_indices]
+    self.current_line = self.plot_lines.plot(
+        distances, deformation_values, label=f"Current: {self.timestamps[self.current_timestamp_idx]}"
+    )
+    render.style_deformation_axes(self.ax, self.timestamps[self.current_timestamp_idx])
+    # Limit the plot area to the range of the plotted values, or the Y limits from the UI
+    render.set_deformation_limits(
+        self.ax, distances, deformation_values,
+        render.user_limit(self.ymin_var.get()), render.user_limit(self.ymax_var.get())
+    )
 
-    # Store the current line's data for hover tooltips
-    self.current_plot_data = list(zip(distances, deformation_values))
+    legend = self.ax.legend()  # Add legend to distinguish lines
 
-    # Print deformation values to the console
-    print(
-        f"Plotting deformation values: {deformation_values} against distances: {distances}"
-    )
-    self.ax.plot(distances, deformation_values, label=f"Current: {self.timestamps[self.current_timestamp_idx]}")
-    self.ax.set_title(
-        f"Deformation Plot for Timestamp: {self.timestamps[self.current_timestamp_idx]}"
+    # One reusable tooltip, moved around by on_hover
+    self.hover_annotation = self.ax.annotate(
+        "", xy=(0, 0), xytext=(10, 10), textcoords="offset points",
+        bbox=dict(boxstyle="round", fc="w"), arrowprops=dict(arrowstyle="->"),
+        visible=False
     )
-    self.ax.set_xlabel("Distance")
-    self.ax.set_ylabel("Deformation")
-    self.ax.grid(True)
 
-    # Limit the plot area to the range of the plotted values
-    if len(distances) > 0 and len(deformation_values) > 0:
-        self.ax.set_xlim([distances.min(), distances.max()])
-        # --- Use y-axis min/max from UI if set ---
-        try:
-            ymin = float(self.ymin_var.get())
-        except ValueError:
-            ymin = deformation_values.min()
-        try:
-            ymax = float(self.ymax_var.get())
-        except ValueError:
-            ymax = deformation_values.max()
-        self.ax.set_ylim([ymin, ymax])
-
-    # Set 10 equally spaced ticks for x-axis and y-axis
-    self.ax.set_xticks(self.ax.get_xticks()[::max(1, len(self.ax.get_xticks()) // 10)])
-    self.ax.set_yticks(self.ax.get_yticks()[::max(1, len(self.ax.get_yticks()) // 10)])
-
-    self.ax.legend()  # Add legend to distinguish lines
+    # The current line, title and legend change every frame; everything else is cached
+    if self.fast_redraw_var.get():
+        self.blit_manager.add_artist(self.current_line)
+        self.blit_manager.add_artist(self.ax.title)
+        self.blit_manager.add_artist(legend)
+        self.blit_manager.add_artist(self.hover_annotation)
+    self.plot_key = static_plot_key(self)
     try:
         self.canvas.draw()
     except tk.TclError as e:
@@ -71,6 +91,53 @@ def plot_deformation(self):
             "Canvas Update Error",
             f"Failed to update the canvas due to a Tkinter error: {str(e)}. This might occur if the window is closed or the canvas is not properly initialized."
         )
+
+
+def static_plot_key(self):
+    """Returns what the cached background of the main plot depends on."""
+    return (
+        id(self.data), id(self.canvas), len(self.locked_lines), self.fast_redraw_var.get(),
+        self.ymin_var.get(), self.ymax_var.get(), self.range_start, self.range_end
+    )
+
+
+def fast_redraw(self, distances, deformation_values):
+    """Updates only the current line, title and legend when the static background is still valid.
+
+    Without user Y limits the axis grows to fit new values instead of being
+    recomputed every frame. Returns False when a full redraw is needed.
+    """
+    if (
+        not self.fast_redraw_var.get() or self.blit_manager is None or
+        self.blit_manager.background is None or self.plot_key != static_plot_key(self) or
+        len(distances) == 0
+    ):
+        return False
+
+    timestamp = self.timestamps[self.current_timestamp_idx]
+    self.hover_annotation.set_visible(False)
+    self.plot_lines.set_data(self.current_line, distances, deformation_values)
+    self.current_line.set_label(f"Current: {timestamp}")
+    self.ax.set_title(f"Deformation Plot for Timestamp: {timestamp}")
+    legend = self.ax.get_legend()
+    if legend is not None:
+        legend.get_texts()[-1].set_text(f"Current: {timestamp}")
+
+    try:
+        ymin, ymax = self.ax.get_ylim()
+        low, high = np.min(deformation_values), np.max(deformation_values)
+        if not self.ymin_var.get().strip() and not self.ymax_var.get().strip() and (low < ymin or high > ymax):
+            # Grow with some headroom so playback does not redraw on every new extreme
+            margin = 0.1 * (max(high, ymax) - min(low, ymin)) or 1.0
+            self.ax.set_ylim(min(low, ymin) - margin, max(high, ymax) + margin)
+            self.canvas.draw()
+        else:
+            self.blit_manager.update()
+    except tk.TclError:
+        return False
+    return True
+
+
 def lock_line(self):
     """Locks the current line of deformation values and distances for later reference."""
     if self.data is None:
@@ -99,126 +166,434 @@ def lock_line(self):
 def reset_graph(self):
     """Resets the graph to its original state, clearing locked lines and zeroing."""
     self.locked_lines.clear()
-    self.zeroing_enabled = False
-    self.data = self.original_data.copy()
+    util.clear_zeroing(self)
     self.plot_deformation(self)
+def build_hover_index(distances, deformation_values):
+    """Returns the plotted points sorted by distance, for searchsorted lookups while hovering."""
+    if len(distances) > 1 and not np.all(distances[1:] >= distances[:-1]):
+        order = np.argsort(distances, kind="stable")
+        return distances[order], deformation_values[order]
+    return distances, deformation_values
+
+
 def on_hover(self, event):
-    """Handles mouse hover events to show tooltips for the closest point on the plot."""	
-    if event.inaxes != self.ax or not hasattr(self, "current_plot_data"):
-        return
-
-    # Clear previous annotations
-    for annotation in self.ax.texts:
-        annotation.remove()
-
-    # Find the closest point to the cursor
-    closest_point = None
-    min_distance = float("inf")
-    for distance, deformation in self.current_plot_data:
-        if event.xdata is None or event.ydata is None:
-            continue
-        cursor_distance = np.sqrt((event.xdata - distance) ** 2 + (event.ydata - deformation) ** 2)
-        if cursor_distance < min_distance:
-            min_distance = cursor_distance
-            closest_point = (distance, deformation)
-
-    if closest_point and min_distance < 0.1:  # Adjust sensitivity as needed
-        tooltip_text = f"({closest_point[0]:.2f}, {closest_point[1]:.2f})"
-        self.ax.annotate(
-            tooltip_text,
-            xy=closest_point,
-            xytext=(10, 10),
-            textcoords="offset points",
-            bbox=dict(boxstyle="round", fc="w"),
-            arrowprops=dict(arrowstyle="->")
-        )
+    """Handles mouse hover events to show tooltips for the closest point on the plot."""
+    annotation = self.hover_annotation
+    if annotation is None or annotation.axes is not self.ax:
+        return
+    if event.inaxes != self.ax or event.xdata is None or self.current_plot_data is None:
+        if annotation.get_visible():
+            annotation.set_visible(False)
+            redraw_hover(self)
+        return
+
+    distances, deformation_values = self.current_plot_data
+    point = nearest_point(self.ax, distances, deformation_values, event.x, event.y)
+    if point is None:
+        if annotation.get_visible():
+            annotation.set_visible(False)
+            redraw_hover(self)
+        return
+
+    annotation.xy = point
+    annotation.set_text(f"({point[0]:.2f}, {point[1]:.2f})")
+    annotation.set_visible(True)
+    redraw_hover(self)
+
+
+def nearest_point(ax, distances, deformation_values, x_pixel, y_pixel):
+    """Finds the plotted point closest to a display position within HOVER_RADIUS_PX pixels.
+
+    Only the points whose distance lies within the radius are looked at, found
+    with searchsorted on the distance-sorted data.
+    """
+    if len(distances) == 0:
+        return None
+    to_data = ax.transData.inverted()
+    x_low = to_data.transform((x_pixel - HOVER_RADIUS_PX, y_pixel))[0]
+    x_high = to_data.transform((x_pixel + HOVER_RADIUS_PX, y_pixel))[0]
+    start = np.searchsorted(distances, min(x_low, x_high), side="left")
+    stop = np.searchsorted(distances, max(x_low, x_high), side="right")
+    if stop - start > HOVER_MAX_CANDIDATES:
+        # Zoomed far out: only look at the points closest in distance
+        center = np.searchsorted(distances, to_data.transform((x_pixel, y_pixel))[0])
+        start = max(start, center - HOVER_MAX_CANDIDATES // 2)
+        stop = min(stop, start + HOVER_MAX_CANDIDATES)
+    if stop <= start:
+        return None
+
+    candidates = np.column_stack((distances[start:stop], deformation_values[start:stop]))
+    offsets = ax.transData.transform(candidates) - (x_pixel, y_pixel)
+    pixel_distances = np.hypot(offsets[:, 0], offsets[:, 1])
+    best = np.argmin(pixel_distances)
+    if pixel_distances[best] > HOVER_RADIUS_PX:
+        return None
+    return tuple(candidates[best])
+
+
+def redraw_hover(self):
+    """Shows the hover annotation, by blitting when the fast redraw path is active."""
+    if self.fast_redraw_var.get() and self.blit_manager is not None and self.blit_manager.background is not None:
+        self.blit_manager.update()
+    else:
         self.canvas.draw_idle()
+
+
+def plot_stats_over_time(self):
+    """Opens a window plotting peak, mean and minimum deformation against the timestamp index."""
+    if self.data is None:
+        messagebox.showerror("Error", "No data loaded to plot statistics.")
+        return
+
+    if self.stats_window is None or not self.stats_window.winfo_exists():
+        self.stats_window = tk.Toplevel(self.master)
+        self.stats_window.title("Statistics over Time")
+        self.center_window(self.stats_window)
+
+        figure = plt.Figure(figsize=(8, 4))
+        self.stats_ax = figure.add_subplot(111)
+        self.stats_canvas = FigureCanvasTkAgg(figure, master=self.stats_window)
+        self.stats_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        toolbar_frame = tk.Frame(self.stats_window)
+        toolbar_frame.pack(fill=tk.X, pady=5)
+        self.stats_window.toolbar = NavigationToolbar2Tk(self.stats_canvas, toolbar_frame)
+        self.stats_window.toolbar.update()
+
+        # Clicking the plot jumps the main slider to that timestamp
+        self.stats_canvas.mpl_connect("button_press_event", lambda event: on_stats_click(self, event))
+        self.stats_blit = BlitManager(self.stats_canvas)
+
+    update_stats_plot(self)
+
+
+def update_stats_plot(self):
+    """Redraws the statistics over time from the current statistics table."""
+    if self.stats_window is None or not self.stats_window.winfo_exists() or self.stats_table is None:
+        return
+
+    table = self.stats_table
+    timestamp_indices = np.arange(len(table))
+    ax = self.stats_ax
+    ax.clear()
+    self.stats_blit.clear()
+    lines = DecimatedLines(ax)
+    self.stats_lines = {
+        "table": table,
+        "decimated": lines,
+        "peak": lines.plot(timestamp_indices, table["peak"], label="Peak"),
+        "mean": lines.plot(timestamp_indices, table["mean"], label="Mean"),
+        "min": lines.plot(timestamp_indices, table["min"], label="Min", linestyle="--"),
+    }
+    self.stats_cursor = self.stats_blit.add_artist(
+        ax.axvline(self.current_timestamp_idx, color="red", linewidth=1)
+    )
+    ax.set_title("Deformation Statistics over Time")
+    ax.set_xlabel("Timestamp Index")
+    ax.set_ylabel("Deformation")
+    ax.grid(True)
+    ax.legend()
+    self.stats_canvas.draw()
+
+
+def extend_stats_plot(self):
+    """Extends the statistics over time with rows appended to the table, without rebuilding the plot."""
+    if self.stats_window is None or not self.stats_window.winfo_exists() or self.stats_table is None:
+        return
+    if self.stats_lines is None or self.stats_lines["table"] is not self.stats_table:
+        update_stats_plot(self)
+        return
+
+    table = self.stats_table
+    timestamp_indices = np.arange(len(table))
+    for key in ("peak", "mean", "min"):
+        self.stats_lines["decimated"].set_data(self.stats_lines[key], timestamp_indices, table[key])
+    self.stats_ax.relim()
+    self.stats_ax.autoscale_view()
+    self.stats_canvas.draw_idle()
+
+
+def plot_waterfall(self):
+    """Opens a window showing every timestamp and gauge at once as one distance x time image."""
+    if self.data is None:
+        messagebox.showerror("Error", "No data loaded to plot.")
+        return
+
+    if self.waterfall_window is None:
+        self.waterfall_window = tk.Toplevel(self.master)
+        self.waterfall_window.title("Waterfall")
+        self.waterfall_window.protocol("WM_DELETE_WINDOW", lambda: close_waterfall_window(self))
+        self.center_window(self.waterfall_window)
+
+        figure = plt.Figure(figsize=(10, 7))
+        self.waterfall_ax = figure.add_subplot(111)
+        self.waterfall_canvas = FigureCanvasTkAgg(figure, master=self.waterfall_window)
+        self.waterfall_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        toolbar_frame = tk.Frame(self.waterfall_window)
+        toolbar_frame.pack(fill=tk.X, pady=5)
+        self.waterfall_window.toolbar = NavigationToolbar2Tk(self.waterfall_canvas, toolbar_frame)
+        self.waterfall_window.toolbar.update()
+        self.waterfall_label = tk.Label(toolbar_frame, text="")
+        self.waterfall_label.pack(side=tk.RIGHT, padx=5)
+
+        ax = self.waterfall_ax
+        self.waterfall_image = ax.imshow(
+            np.full((1, 1), np.nan), cmap="viridis", aspect="auto", interpolation="nearest"
+        )
+        figure.colorbar(self.waterfall_image, ax=ax, label="Deformation")
+        ax.set_title("Deformation over Time")
+        ax.set_xlabel("Distance")
+        ax.set_ylabel("Timestamp Index")
+        self.waterfall_blit = BlitManager(self.waterfall_canvas)
+        self.waterfall_cursor = self.waterfall_blit.add_artist(
+            ax.axhline(self.current_timestamp_idx, color="red", linewidth=1)
+        )
+
+        # Zoom, pan and resize render the part in view again at screen resolution
+        ax.callbacks.connect("xlim_changed", lambda ax: schedule_waterfall(self))
+        ax.callbacks.connect("ylim_changed", lambda ax: schedule_waterfall(self))
+        self.waterfall_canvas.mpl_connect("resize_event", lambda event: schedule_waterfall(self))
+        # Clicking the image jumps the main slider to that timestamp
+        self.waterfall_canvas.mpl_connect("button_press_event", lambda event: on_waterfall_click(self, event))
+
+    # Show the whole file
+    first, last = waterfall_distance(self, 0), waterfall_distance(self, self.data.shape[1] - 1)
+    self.waterfall_ax.set_xlim(first, last)
+    self.waterfall_ax.set_ylim(len(self.data) - 0.5, -0.5)
+    schedule_waterfall(self)
+
+
+def waterfall_distance(self, column):
+    """Returns the distance of a gauge column; the waterfall spaces gauges evenly between the ends."""
+    count = self.data.shape[1]
+    first, last = self.distances[0], self.distances[count - 1]
+    pitch = (last - first) / (count - 1) if count > 1 and last != first else 1.0
+    return first + column * pitch
+
+
+def waterfall_column(self, distance):
+    """Returns the gauge column at a distance of the waterfall's X axis, inverse of waterfall_distance()."""
+    origin = waterfall_distance(self, 0)
+    pitch = waterfall_distance(self, 1) - origin
+    return (distance - origin) / pitch
+
+
+def schedule_waterfall(self):
+    """Renders the waterfall once the UI is idle, so one zoom triggers one render."""
+    if self.waterfall_window is None or self.waterfall_pending:
+        return
+    self.waterfall_pending = True
+    self.waterfall_window.after_idle(lambda: update_waterfall(self))
+
+
+def update_waterfall(self):
+    """Renders the part of the matrix in view at screen resolution on a worker thread."""
+    self.waterfall_pending = False
+    if self.waterfall_window is None or self.data is None:
+        return
+    if self.waterfall_pyramid is None or self.waterfall_pyramid.data is not self.data:
+        # New data or new tare and zero references: start a new pyramid and colour scale
+        self.waterfall_pyramid = pyramid.TilePyramid(self.data)
+        self.waterfall_clim = None
+    if self.waterfall_task is not None:
+        self.waterfall_task.cancel()
+
+    ax = self.waterfall_ax
+    x0, x1 = sorted(ax.get_xlim())
+    y0, y1 = sorted(ax.get_ylim())
+    col_start = int(np.floor(waterfall_column(self, x0) + 0.5))
+    col_stop = int(np.ceil(waterfall_column(self, x1) + 0.5))
+    row_start, row_stop = int(np.floor(y0 + 0.5)), int(np.ceil(y1 + 0.5))
+    if row_stop <= max(0, row_start) or col_stop <= max(0, col_start):
+        return
+    height, width = ax.bbox.height, ax.bbox.width
+    grid = self.waterfall_pyramid
+
+    def render(task):
+        return grid.render(
+            row_start, row_stop, col_start, col_stop, height, width,
+            task.check_cancelled, lambda percent: task.report(percent, percent)
+        )
+
+    def on_progress(percent):
+        self.waterfall_label.config(text=f"Rendering... {percent}%")
+
+    def on_done(result):
+        self.waterfall_task = None
+        if self.waterfall_window is None or grid is not self.waterfall_pyramid:
+            return
+        image, (row_first, row_end), (col_first, col_end) = result
+        if self.waterfall_clim is None and np.isfinite(image).any():
+            # The first, whole-file render fixes the colour scale so zooming keeps it
+            self.waterfall_clim = (np.nanmin(image), np.nanmax(image))
+            self.waterfall_image.set_clim(*self.waterfall_clim)
+        self.waterfall_image.set_data(image)
+        self.waterfall_image.set_extent((
+            waterfall_distance(self, col_first - 0.5), waterfall_distance(self, col_end - 0.5),
+            row_end - 0.5, row_first - 0.5
+        ))
+        rows_per_cell = (row_end - row_first) // max(1, image.shape[0])
+        cols_per_cell = (col_end - col_first) // max(1, image.shape[1])
+        self.waterfall_label.config(
+            text=f"{rows_per_cell} timestamp(s) x {cols_per_cell} gauge(s) per cell, extreme value shown"
+        )
+        self.waterfall_canvas.draw_idle()
+
+    def on_error(e):
+        self.waterfall_task = None
+        messagebox.showerror("Error", f"Failed to render the waterfall: {e}")
+
+    self.waterfall_label.config(text="Rendering...")
+    self.waterfall_task = tasks.BackgroundTask(
+        self, None, render, on_done=on_done, on_progress=on_progress, on_error=on_error
+    ).start()
+
+
+def update_waterfall_cursor(self):
+    """Moves the current-timestamp marker of the waterfall."""
+    if self.waterfall_cursor is None or self.waterfall_window is None:
+        return
+    self.waterfall_cursor.set_ydata([self.current_timestamp_idx, self.current_timestamp_idx])
+    self.waterfall_blit.update()
+
+
+def on_waterfall_click(self, event):
+    """Jumps to the timestamp clicked in the waterfall."""
+    if event.inaxes is not self.waterfall_ax or event.ydata is None or self.waterfall_window.toolbar.mode:
+        return
+    self.slider.set(int(np.clip(round(event.ydata), 0, len(self.data) - 1)))
+
+
+def close_waterfall_window(self):
+    """Stops rendering and closes the waterfall window."""
+    if self.waterfall_task is not None:
+        self.waterfall_task.cancel()
+        self.waterfall_task = None
+    self.waterfall_pyramid = None
+    self.waterfall_cursor = None
+    if self.waterfall_blit is not None:
+        self.waterfall_blit.disconnect()
+        self.waterfall_blit = None
+    if self.waterfall_window is not None:
+        self.waterfall_window.destroy()
+        self.waterfall_window = None
+
+
+def update_stats_cursor(self):
+    """Moves the current-timestamp marker of the statistics plot."""
+    if self.stats_cursor is None or self.stats_window is None or not self.stats_window.winfo_exists():
+        return
+    self.stats_cursor.set_xdata([self.current_timestamp_idx, self.current_timestamp_idx])
+    self.stats_blit.update()
+
+
+def on_stats_click(self, event):
+    """Jumps to the timestamp clicked in the statistics plot."""
+    if event.inaxes is not self.stats_ax or event.xdata is None or self.stats_window.toolbar.mode:
+        return
+    self.slider.set(int(np.clip(round(event.xdata), 0, len(self.data) - 1)))
+
+
 def reset_yaxis_limits(self):
     """Reset y-axis min/max entry fields and replot."""
     self.ymin_var.set("")
     self.ymax_var.set("")
     self.plot_deformation(self)
 def plot_spatial_layout(self):
-    """Plots the spatial layout of points with deformation values as colors."""
+    """Plots the gauges at their positions along the XY polyline, coloured by deformation."""
     if self.data is None or self.distances is None:
         messagebox.showerror("Error", "No deformation data or coordinates loaded.")
         return
 
     try:
-        # Load the real-world coordinates from the CSV file
-        points_df = pd.read_csv(self.csv_file_path, skiprows=1)
-        x_coords = points_df["X Coordinate"].values
-        y_coords = points_df["Y Coordinate"].values
-
-        num_points = len(x_coords)
-        num_deformations = self.data.shape[1]
-
-        if num_deformations > num_points:
-            # Truncate deformation data to match number of points
-            self.data = self.data[:, :num_points]
-        elif num_points > num_deformations:
-            # Pad deformation data with zeros to match number of points
-            pad_width = num_points - num_deformations
-            self.data = np.pad(self.data, ((0, 0), (0, pad_width)), mode='constant', constant_values=0)
-
-        # Create a new window for the plot
-        if not hasattr(self, "plot_window") or self.plot_window is None or not self.plot_window.winfo_exists():
-            self.plot_window = tk.Toplevel(self.master)
-            self.plot_window.title("Spatial Layout of Deformation")
-            self.center_window(self.plot_window)
-
-            self.figure = plt.Figure(figsize=(10, 6))
-            self.ax = self.figure.add_subplot(111)
-            self.canvas = FigureCanvasTkAgg(self.figure, master=self.plot_window)
-            self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-            toolbar_frame = tk.Frame(self.plot_window)
-            toolbar_frame.pack(fill=tk.X, pady=5)
-            toolbar = NavigationToolbar2Tk(self.canvas, toolbar_frame)
-            toolbar.update()
-
-        # Plot the initial scatterplot
-        deformation_values = self.data[self.current_timestamp_idx]
-        sorted_indices = np.argsort(deformation_values)
-        x_coords = x_coords[sorted_indices]
-        y_coords = y_coords[sorted_indices]
-        deformation_values = deformation_values[sorted_indices]
-
-        # Increase point size for better visibility
-        scatter = self.ax.scatter(
-            x_coords, y_coords, c=deformation_values, cmap="viridis", s=50
+        # Real-world coordinates read from the CSV file by the loader, mapped once per gauge
+        x_coords, y_coords = self.layout_points
+        self.spatial_positions = geometry.cached_gauge_positions(
+            self.csv_file_path, self.filepath, x_coords, y_coords, self.distances, self.layout_segments,
+            self.channel
         )
-        self.colorbar = self.figure.colorbar(scatter, ax=self.ax)
-        self.ax.set_title(f"Deformation at Timestamp: {self.timestamps[self.current_timestamp_idx]}")
-        self.ax.set_xlabel("X Coordinate")
-        self.ax.set_ylabel("Y Coordinate")
-
-        # Update the plot dynamically with the slider
-        def update_plot(timestamp_idx):
-            timestamp_idx = int(timestamp_idx)
-            self.current_timestamp_idx = timestamp_idx
-            deformation_values = self.data[timestamp_idx]
-
-            # Adjust deformation values and coordinates for mismatches
-            num_points = len(x_coords)
-            num_deformations = len(deformation_values)
-
-            if num_points > num_deformations:
-                deformation_values = np.pad(deformation_values, (0, num_points - num_deformations), constant_values=0)
-            elif num_deformations > num_points:
-                deformation_values = deformation_values[:num_points]
-
-            scatter.set_array(deformation_values)
-            self.ax.set_title(f"Deformation at Timestamp: {self.timestamps[timestamp_idx]}")
-            self.canvas.draw()
 
-        slider_frame = tk.Frame(self.plot_window)
-        slider_frame.pack(fill=tk.X, pady=5)
-        slider = tk.Scale(
-            slider_frame, from_=0, to=len(self.timestamps) - 1, orient=tk.HORIZONTAL,
-            command=update_plot, length=500
-        )
-        slider.pack()
+        if self.spatial_window is None:
+            create_spatial_window(self)
+        else:
+            # A new CSV only moves the gauges
+            self.spatial_layout.set_positions(*self.spatial_positions)
+            self.spatial_slider.config(to=len(self.data) - 1)
+            self.spatial_window.lift()
+        set_spatial_clim(self)
+        self.spatial_timestamp_idx = None
+        update_spatial_layout(self, self.spatial_slider.get())
 
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while plotting: {e}")
\ No newline at end of file
+        messagebox.showerror("Error", f"An error occurred while plotting: {e}")
+
+
+def create_spatial_window(self):
+    """Creates the spatial layout window with every gauge drawn at its position and its own slider."""
+    self.spatial_window = tk.Toplevel(self.master)
+    self.spatial_window.title("Spatial Layout of Deformation")
+    self.spatial_window.protocol("WM_DELETE_WINDOW", lambda: close_spatial_window(self))
+    self.center_window(self.spatial_window)
+
+    self.spatial_figure = plt.Figure(figsize=(10, 6))
+    self.spatial_ax = self.spatial_figure.add_subplot(111)
+    self.spatial_canvas = FigureCanvasTkAgg(self.spatial_figure, master=self.spatial_window)
+    self.spatial_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    self.spatial_blit = BlitManager(self.spatial_canvas)
+
+    toolbar_frame = tk.Frame(self.spatial_window)
+    toolbar_frame.pack(fill=tk.X, pady=5)
+    toolbar = NavigationToolbar2Tk(self.spatial_canvas, toolbar_frame)
+    toolbar.update()
+
+    # Only the colours and the title change between frames
+    self.spatial_layout = spatial.GaugeLayout(self.spatial_ax, *self.spatial_positions)
+    self.spatial_blit.add_artist(self.spatial_layout.artist)
+    self.spatial_figure.colorbar(self.spatial_layout.mappable, ax=self.spatial_ax)
+    self.spatial_title = self.spatial_blit.add_artist(self.spatial_ax.set_title(""))
+    self.spatial_ax.set_xlabel("X Coordinate")
+    self.spatial_ax.set_ylabel("Y Coordinate")
+
+    slider_frame = tk.Frame(self.spatial_window)
+    slider_frame.pack(fill=tk.X, pady=5)
+    self.spatial_slider = tk.Scale(
+        slider_frame, from_=0, to=len(self.data) - 1, orient=tk.HORIZONTAL,
+        command=lambda value: update_spatial_layout(self, value), length=500
+    )
+    self.spatial_slider.set(self.current_timestamp_idx)
+    self.spatial_slider.pack()
+    tk.Button(
+        slider_frame, text="Export Animation",
+        command=lambda: player.export_animation(self, "spatial")
+    ).pack(pady=5)
+
+
+def set_spatial_clim(self):
+    """Fixes the colour scale of the spatial layout to the values of all timestamps."""
+    # One scale for every timestamp keeps the colour bar static, so frames can be blitted
+    table = self.stats_table
+    if table is not None and len(table) > 0 and np.isfinite(table["min"]).any():
+        self.spatial_layout.set_clim(np.nanmin(table["min"]), np.nanmax(table["peak"]))
+    self.spatial_canvas.draw_idle()
+
+
+def update_spatial_layout(self, timestamp_idx):
+    """Recolours the gauges for a timestamp and blits only the gauges and the title."""
+    timestamp_idx = int(timestamp_idx)
+    if self.spatial_window is None or timestamp_idx == self.spatial_timestamp_idx:
+        return
+    self.spatial_timestamp_idx = timestamp_idx
+    self.spatial_layout.set_values(self.data[timestamp_idx])
+    self.spatial_title.set_text(f"Deformation at Timestamp: {self.timestamps[timestamp_idx]}")
+    self.spatial_blit.update()
+
+
+def close_spatial_window(self):
+    """Closes the spatial layout window."""
+    if self.spatial_blit is not None:
+        self.spatial_blit.disconnect()
+        self.spatial_blit = None
+    if self.spatial_window is not None:
+        self.spatial_window.destroy()
+        self.spatial_window = None
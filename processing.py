@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 from tkinter import messagebox
 import plotter as plot
+import dataview
+import debug
+import stats
+import tasks
 
 def find_x_axis_row(df):
     """Find the row index of the cell containing 'x-axis'."""
@@ -17,32 +21,74 @@ def toggle_zeroing(self):
     """Toggle zeroing mode to apply or remove tare values from the data."""
     if self.data is None or self.tare is None:
         return
+    if self.loading:
+        messagebox.showinfo("Info", "Wait for the file to finish loading.")
+        return
 
     self.zeroing_enabled = not self.zeroing_enabled
-
-    if self.zeroing_enabled:
-        # Apply tare values individually for each x-axis distance
-        self.data = self.original_data + self.tare
-    else:
-        # Restore the original data
-        self.data = self.original_data.copy()
+    # Toggling starts from the raw or tared data, dropping earlier zero references
+    self.zero_offsets = []
+    update_data_view(self)
+    refresh_stats(self)
 
     plot.plot_deformation(self)
 
-def zero_from_timestamp(self):
+def zero_from_timestamp(self, timestamp_idx=None):
     """Zero the data based on the current timestamp by subtracting the values at that timestamp."""
     if self.data is None:
         return
+    if self.loading:
+        messagebox.showinfo("Info", "Wait for the file to finish loading.")
+        return
+    if timestamp_idx is None:
+        timestamp_idx = self.current_timestamp_idx
+
+    # The displayed values at the selected timestamp become a new offset on top of the others
+    self.zero_offsets.append(-self.data[timestamp_idx])
+    update_data_view(self)
+    refresh_stats(self)
+    plot.plot_deformation(self)
+
+def undo_zero(self):
+    """Removes the most recent zero reference, restoring the data as it was before it."""
+    if self.data is None or not self.zero_offsets:
+        return
+    if self.loading:
+        messagebox.showinfo("Info", "Wait for the file to finish loading.")
+        return
 
-    # Zero the data based on the current timestamp using the current state of self.data
-    zeroing_values = self.data[self.current_timestamp_idx]  # Deformation values at the selected timestamp
-    self.data = self.data - zeroing_values  # Subtract the selected timestamp's values from all data
+    self.zero_offsets.pop()
+    update_data_view(self)
+    refresh_stats(self)
     plot.plot_deformation(self)
 
+def clear_zeroing(self):
+    """Drops the tare and all zero references so data shows original_data again."""
+    self.zeroing_enabled = False
+    self.zero_offsets = []
+    update_data_view(self)
+    refresh_stats(self)
+
+def update_data_view(self):
+    """Points self.data at original_data with the active tare and zero references added on access.
+
+    original_data is never copied, so toggling and zeroing cost the same for any file size.
+    """
+    if self.original_data is None:
+        self.data = None
+        return
+    tare = self.tare if self.zeroing_enabled else None
+    self.data = dataview.apply_offsets(self.original_data, [tare] + self.zero_offsets)
+    plot.schedule_waterfall(self)
+
+@debug.timed
 def update_timestamp(self, value):
     """Updates the current timestamp index based on the slider value and refreshes the plot."""
     if self.data is None:
         return
+    # Playback moves the slider after drawing the frame itself
+    if int(value) == self.current_timestamp_idx and self.plot_key is not None:
+        return
 
     self.current_timestamp_idx = int(value)
     self.slider_label.config(
@@ -75,10 +121,9 @@ def update_stats(self):
     if self.data is None:
         return
 
-    deformation_values = self.data[self.current_timestamp_idx]
-    valid_values = deformation_values[~np.isnan(deformation_values) & ~np.isinf(deformation_values)]
-    peak = valid_values.max() if len(valid_values) > 0 else "N/A"
-    avg = valid_values.mean() if len(valid_values) > 0 else "N/A"
+    row = stats.row_stats(self, self.current_timestamp_idx)
+    peak = row["peak"] if not np.isnan(row["peak"]) else "N/A"
+    avg = row["mean"] if not np.isnan(row["mean"]) else "N/A"
     timestamp = self.timestamps[self.current_timestamp_idx] if self.timestamps is not None else "N/A"
     self.peak_label.config(
         text=f"Peak Deformation: {peak}"
@@ -93,6 +138,33 @@ def update_stats(self):
         text=f"Slider Position: {self.current_timestamp_idx}"
     )
 
+def refresh_stats(self):
+    """Points the statistics table at the current data, recomputing it on a worker thread if needed."""
+    if self.stats_task is not None:
+        self.stats_task.cancel()
+        self.stats_task = None
+
+    if self.data is self.original_data:
+        self.stats_table = self.original_stats_table
+        plot.update_stats_plot(self)
+        return
+
+    # Until the new table is ready the stats panel computes the current row directly
+    self.stats_table = None
+    data = self.data
+
+    def on_done(table):
+        self.stats_task = None
+        if self.data is data:
+            self.stats_table = table
+            self.update_stats()
+            plot.update_stats_plot(self)
+
+    self.stats_task = tasks.BackgroundTask(
+        self, None, lambda task: stats.compute_stats_table(data, task.check_cancelled),
+        on_done=on_done
+    ).start()
+
 def shift_timestamp(self, delta):
     """Shifts the current timestamp index by a given delta and updates the plot."""	
     if self.data is None:
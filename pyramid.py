@@ -0,0 +1,204 @@
+import collections
+import math
+import threading
+import numpy as np
+
+# Cells along each side of a tile, at every level
+TILE_SIZE = 256
+# Memory the cached tiles of one matrix may use, in bytes
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+# Number of base cells read at a time when a tile is reduced from the data itself
+CHUNK_CELLS = 4_000_000
+# Finer row levels cached as a by-product when a tile is reduced from the data
+FINER_LEVELS = 3
+
+
+def reduce_blocks(lo, hi, row_factor, col_factor):
+    """Reduces minimum and maximum arrays by blocks of row_factor x col_factor cells.
+
+    Partial blocks at the edges are padded with NaN, which the reduction
+    ignores; a block without any value stays NaN.
+    """
+    rows = -(-lo.shape[0] // row_factor) * row_factor
+    cols = -(-lo.shape[1] // col_factor) * col_factor
+    if (rows, cols) != lo.shape:
+        padding = ((0, rows - lo.shape[0]), (0, cols - lo.shape[1]))
+        lo = np.pad(lo, padding, constant_values=np.nan)
+        hi = np.pad(hi, padding, constant_values=np.nan)
+    shape = (rows // row_factor, row_factor, cols // col_factor, col_factor)
+    # fmin and fmax skip NaN without the warnings of nanmin and nanmax. Reducing
+    # the rows first runs over whole contiguous rows; the columns of a cell are
+    # then folded in halves, as reducing a short innermost axis is very slow.
+    lo = np.fmin.reduce(lo.reshape(shape), axis=1)
+    hi = np.fmax.reduce(hi.reshape(shape), axis=1)
+    while lo.shape[-1] > 1:
+        half = lo.shape[-1] // 2
+        lo = np.fmin(lo[..., :half], lo[..., half:2 * half])
+        hi = np.fmax(hi[..., :half], hi[..., half:2 * half])
+    return lo[..., 0], hi[..., 0]
+
+
+def extremes(lo, hi):
+    """Returns, per cell, whichever of the minimum and maximum is further from zero."""
+    with np.errstate(invalid="ignore"):
+        return np.where(np.abs(hi) >= np.abs(lo), hi, lo)
+
+
+class TilePyramid:
+    """Min/max pyramid of a data matrix, built lazily tile by tile and kept in an LRU cache.
+
+    Level (row_level, col_level) reduces 2**row_level timestamps and
+    2**col_level gauges into one cell; rows and columns have their own levels
+    because files are often much longer than they are wide. A tile is built
+    from its two finer tiles when both are cached, otherwise straight from the
+    data a block of rows at a time, so the first overview is one pass over the
+    file and zooming in only reads the part in view.
+    Tiles are requested from one worker thread at a time.
+    """
+
+    def __init__(self, data, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.data = data
+        self.num_rows, self.num_cols = data.shape
+        self.budget_bytes = budget_bytes
+        self.tiles = collections.OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def level_shape(self, row_level, col_level):
+        return -(-self.num_rows // 2 ** row_level), -(-self.num_cols // 2 ** col_level)
+
+    def levels_for(self, num_rows, num_cols, height, width):
+        """Returns the coarsest levels that still give at least one cell per screen pixel."""
+        row_level = max(0, int(math.floor(math.log2(max(1, num_rows / max(1, height))))))
+        col_level = max(0, int(math.floor(math.log2(max(1, num_cols / max(1, width))))))
+        return row_level, col_level
+
+    def cached_tile(self, key):
+        with self.lock:
+            tile = self.tiles.get(key)
+            if tile is not None:
+                self.tiles.move_to_end(key)
+            return tile
+
+    def store_tile(self, key, tile):
+        with self.lock:
+            # A tile may be stored again, e.g. by a render racing a cancelled one
+            old = self.tiles.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[0].nbytes + old[1].nbytes
+            self.tiles[key] = tile
+            self.nbytes += tile[0].nbytes + tile[1].nbytes
+            while self.nbytes > self.budget_bytes and len(self.tiles) > 1:
+                _, (lo, hi) = self.tiles.popitem(last=False)
+                self.nbytes -= lo.nbytes + hi.nbytes
+
+    def tile(self, row_level, col_level, tile_row, tile_col, check_cancelled=None):
+        """Returns the minimum and maximum arrays of one tile, building it when it is not cached."""
+        key = (row_level, col_level, tile_row, tile_col)
+        tile = self.cached_tile(key)
+        if tile is None:
+            tile = self.tile_from_children(*key)
+            if tile is None:
+                tile = self.tile_from_data(*key, check_cancelled)
+            self.store_tile(key, tile)
+        return tile
+
+    def tile_from_children(self, row_level, col_level, tile_row, tile_col):
+        """Merges the two finer tiles of a tile, along rows or along columns, when both are cached.
+
+        Returns None when neither pair is cached.
+        """
+        num_rows, num_cols = self.level_shape(row_level, col_level)
+        candidates = []
+        if row_level > 0:
+            children = [(row_level - 1, col_level, 2 * tile_row + i, tile_col) for i in (0, 1)]
+            candidates.append((children, 0, (2, 1)))
+        if col_level > 0:
+            children = [(row_level, col_level - 1, tile_row, 2 * tile_col + i) for i in (0, 1)]
+            candidates.append((children, 1, (1, 2)))
+
+        for children, axis, factors in candidates:
+            # The second child does not exist at the bottom or right edge of the finer level
+            finer_size = self.level_shape(*children[0][:2])[axis]
+            children = [key for key in children if key[2 + axis] * TILE_SIZE < finer_size]
+            tiles = [self.cached_tile(key) for key in children]
+            if any(tile is None for tile in tiles):
+                continue
+            lo = np.concatenate([tile[0] for tile in tiles], axis=axis)
+            hi = np.concatenate([tile[1] for tile in tiles], axis=axis)
+            lo, hi = reduce_blocks(lo, hi, *factors)
+            # Padding of an odd edge can add a cell past the end of this level
+            return lo[:num_rows - tile_row * TILE_SIZE, :num_cols - tile_col * TILE_SIZE], \
+                hi[:num_rows - tile_row * TILE_SIZE, :num_cols - tile_col * TILE_SIZE]
+        return None
+
+    def tile_from_data(self, row_level, col_level, tile_row, tile_col, check_cancelled=None):
+        """Reduces a tile straight from the data, reading a block of whole cell rows at a time.
+
+        The rows are reduced to a few finer levels first and the tiles of
+        those levels are cached on the way, so zooming in on the part just
+        read needs no second pass over the data.
+        """
+        row_factor, col_factor = 2 ** row_level, 2 ** col_level
+        row_start = tile_row * TILE_SIZE * row_factor
+        row_stop = min(self.num_rows, row_start + TILE_SIZE * row_factor)
+        col_start = tile_col * TILE_SIZE * col_factor
+        col_stop = min(self.num_cols, col_start + TILE_SIZE * col_factor)
+        fine_level = max(0, row_level - FINER_LEVELS)
+
+        cell_rows_per_block = max(1, CHUNK_CELLS // max(1, (col_stop - col_start) * row_factor))
+        rows_per_block = cell_rows_per_block * row_factor
+        los, his = [], []
+        for start in range(row_start, row_stop, rows_per_block):
+            if check_cancelled is not None:
+                check_cancelled()
+            block = np.asarray(
+                self.data[start:min(row_stop, start + rows_per_block), col_start:col_stop], dtype=np.float32
+            )
+            lo, hi = reduce_blocks(block, block, 2 ** fine_level, col_factor)
+            los.append(lo)
+            his.append(hi)
+        lo, hi = np.concatenate(los), np.concatenate(his)
+
+        for level in range(fine_level, row_level):
+            first_tile = tile_row * 2 ** (row_level - level)
+            for k, start in enumerate(range(0, len(lo), TILE_SIZE)):
+                key = (level, col_level, first_tile + k, tile_col)
+                self.store_tile(key, (lo[start:start + TILE_SIZE].copy(), hi[start:start + TILE_SIZE].copy()))
+            lo, hi = reduce_blocks(lo, hi, 2, 1)
+        return lo, hi
+
+    def render(self, row_start, row_stop, col_start, col_stop, height, width, check_cancelled=None, report=None):
+        """Returns the image of a part of the matrix at about screen resolution.
+
+        Returns the extreme of every cell and the base rows and columns it
+        covers, which are the requested ones rounded out to whole cells.
+        """
+        row_start, col_start = max(0, row_start), max(0, col_start)
+        row_stop, col_stop = min(self.num_rows, row_stop), min(self.num_cols, col_stop)
+        row_level, col_level = self.levels_for(row_stop - row_start, col_stop - col_start, height, width)
+        row_factor, col_factor = 2 ** row_level, 2 ** col_level
+        level_rows = (row_start // row_factor, -(-row_stop // row_factor))
+        level_cols = (col_start // col_factor, -(-col_stop // col_factor))
+
+        tile_rows = range(level_rows[0] // TILE_SIZE, (level_rows[1] - 1) // TILE_SIZE + 1)
+        tile_cols = range(level_cols[0] // TILE_SIZE, (level_cols[1] - 1) // TILE_SIZE + 1)
+        total = len(tile_rows) * len(tile_cols)
+        rows_of_tiles = []
+        for i, tile_row in enumerate(tile_rows):
+            row = []
+            for j, tile_col in enumerate(tile_cols):
+                row.append(extremes(*self.tile(row_level, col_level, tile_row, tile_col, check_cancelled)))
+                if report is not None:
+                    report(100 * (i * len(tile_cols) + j + 1) // total)
+            rows_of_tiles.append(np.concatenate(row, axis=1))
+        image = np.concatenate(rows_of_tiles, axis=0)
+
+        offset_row = tile_rows[0] * TILE_SIZE
+        offset_col = tile_cols[0] * TILE_SIZE
+        image = image[level_rows[0] - offset_row:level_rows[1] - offset_row,
+                      level_cols[0] - offset_col:level_cols[1] - offset_col]
+        # The last cell may reach past the data; it still spans a whole cell
+        covered_rows = (level_rows[0] * row_factor, level_rows[1] * row_factor)
+        covered_cols = (level_cols[0] * col_factor, level_cols[1] * col_factor)
+        return image, covered_rows, covered_cols
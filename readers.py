@@ -0,0 +1,362 @@
+import io
+import itertools
+import mmap
+import numpy as np
+import pandas as pd
+import storage
+
+# Number of preamble lines the Luna software writes before the data header. The header is found
+# by its 'x-axis' row wherever it is; this only shapes synthetic files and the legacy parse
+HEADER_SKIP_ROWS = 31
+# Maximum number of lines scanned as text when looking for the 'x-axis' row
+MAX_HEADER_LINES = 2000
+# Number of leading non-numeric columns (timestamp and labels) in every row
+DATA_COLUMN_OFFSET = 3
+# Number of cells parsed per batch; a batch holds the GIL for a few tens of milliseconds
+CHUNK_CELLS = 250_000
+# Bytes read from the start of a file to recognise its format and delimiter
+SNIFF_BYTES = 64 * 1024
+# Delimiters of the text exports, in order of preference
+DELIMITERS = ("\t", ",")
+# Label of the row of gauge distances that ends the header of every channel
+X_AXIS_LABEL = "x-axis"
+# Lines from the top of the file shown in the preview
+PREVIEW_LINES = 30
+
+
+def read_head(filepath, size=SNIFF_BYTES):
+    """Returns the first bytes of a file, for recognising its format."""
+    with open(filepath, "rb") as file:
+        return file.read(size)
+
+
+def sniff_delimiter(head):
+    """Returns the delimiter of a text export from its first bytes, or None when they are not text."""
+    if b"\0" in head:
+        return None
+    text = head.decode("utf-8", errors="replace")
+    for delimiter in DELIMITERS:
+        if delimiter in text:
+            return delimiter
+    return None
+
+
+def is_table_row(cells):
+    """True for a row as wide as the data: gauge IDs, tare, x-axis and data rows, unlike the key/value preamble."""
+    return len(cells) > DATA_COLUMN_OFFSET
+
+
+def is_x_axis_row(line, delimiter):
+    return X_AXIS_LABEL in line.lower() and is_table_row(line.split(delimiter))
+
+
+def scan_header(filepath, delimiter="\t", max_lines=MAX_HEADER_LINES):
+    """Scans the first lines of a text export for the 'x-axis' row.
+
+    Returns the lines up to it, its line number (None when there is none)
+    and the byte offset of the first data row below it.
+    """
+    header_lines = []
+    offset = 0
+    with open(filepath, "rb") as file:
+        for line_number, raw_line in enumerate(file):
+            if line_number >= max_lines:
+                break
+            offset += len(raw_line)
+            line = raw_line.decode("utf-8", errors="replace").rstrip("\r\n")
+            header_lines.append(line)
+            if is_x_axis_row(line, delimiter):
+                return header_lines, line_number, offset
+    return header_lines, None, offset
+
+
+def find_table_start(lines, x_axis_line, delimiter):
+    """Returns the line number of the first of the full-width rows that end with the 'x-axis' row."""
+    start = x_axis_line
+    while start > 0 and is_table_row(lines[start - 1].split(delimiter)):
+        start -= 1
+    return start
+
+
+def find_tare_options(lines, table_start, x_axis_line, delimiter="\t"):
+    """Finds the 'Tare' cells above the 'x-axis' row as (row, column) pairs, rows counted from the table start.
+
+    With the usual 31 preamble lines this numbers rows like the old loader did.
+    """
+    tare_options = []
+    for line_number in range(table_start, x_axis_line):
+        cells = lines[line_number].split(delimiter)
+        for col, cell in enumerate(cells):
+            if "tare" in cell.lower():
+                tare_options.append((line_number - table_start + 1, col + 1))
+    return tare_options
+
+
+def cells_to_numeric(cells, width, dtype=np.float64):
+    """Converts the numeric cells of a header row to an array of the given width (NaN where invalid)."""
+    values = pd.to_numeric(
+        pd.Series(cells[DATA_COLUMN_OFFSET:DATA_COLUMN_OFFSET + width], dtype=object),
+        errors="coerce"
+    ).to_numpy(dtype=dtype)
+    if len(values) < width:
+        values = np.concatenate([values, np.full(width - len(values), np.nan, dtype=dtype)])
+    return values
+
+
+def find_sections(filepath, x_axis_line, labels, delimiter, data_start):
+    """Finds the channels after the first in a file that holds several, one below the other.
+
+    Every further channel repeats the header: its own table rows (the ones
+    labelled like those of the first channel) and 'x-axis' row, optionally
+    after a few preamble lines. Returns per channel its header lines, the
+    line number of its 'x-axis' row, and the byte offsets where its header
+    and its data start. The file is searched for the label without being
+    parsed, so this is a fast scan even for very large files.
+    """
+    label_at = x_axis_line.lower().index(X_AXIS_LABEL)
+    marker = x_axis_line[label_at:label_at + len(X_AXIS_LABEL)].encode("utf-8")
+    sections = []
+    with open(filepath, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = data_start
+        while True:
+            hit = mm.find(marker, position)
+            if hit < 0:
+                break
+            line_start = mm.rfind(b"\n", 0, hit) + 1
+            line_end = mm.find(b"\n", hit)
+            line_end = len(mm) if line_end < 0 else line_end + 1
+            position = line_end
+            line = mm[line_start:line_end].decode("utf-8", errors="replace").rstrip("\r\n")
+            if not is_x_axis_row(line, delimiter):
+                continue
+
+            # Walk up from the 'x-axis' row to the last data row of the channel before
+            lines = [line]
+            header_start = line_start
+            while header_start > data_start and len(lines) < MAX_HEADER_LINES:
+                previous_start = mm.rfind(b"\n", 0, header_start - 1) + 1
+                previous = mm[previous_start:header_start].decode("utf-8", errors="replace").rstrip("\r\n")
+                cells = previous.split(delimiter)
+                if is_table_row(cells) and cells[0].strip() not in labels:
+                    break
+                lines.insert(0, previous)
+                header_start = previous_start
+            sections.append({
+                "lines": lines,
+                "x_axis_line": len(lines) - 1,
+                "header_start": header_start,
+                "data_start": line_end,
+            })
+            data_start = line_end
+    return sections
+
+
+class GrowableArray:
+    """Array that grows along its first axis as rows are appended, like a list."""
+
+    def __init__(self, row_shape=(), dtype=np.float64, capacity=1024):
+        self._buffer = np.empty((max(1, capacity),) + tuple(row_shape), dtype=dtype)
+        self.size = 0
+
+    def reserve(self, capacity):
+        """Grows the buffer so that at least capacity rows fit without reallocating."""
+        if capacity > len(self._buffer):
+            buffer = np.empty((capacity,) + self._buffer.shape[1:], dtype=self._buffer.dtype)
+            buffer[:self.size] = self._buffer[:self.size]
+            self._buffer = buffer
+
+    def append(self, rows):
+        """Appends a block of rows, growing the buffer geometrically when it is full."""
+        needed = self.size + len(rows)
+        if needed > len(self._buffer):
+            self.reserve(max(needed, len(self._buffer) * 3 // 2))
+        self._buffer[self.size:needed] = rows
+        self.size = needed
+
+    @property
+    def array(self):
+        """Returns a view of the rows appended so far."""
+        return self._buffer[:self.size]
+
+    def trim(self):
+        """Releases unused capacity and returns the final array."""
+        if self.size != len(self._buffer):
+            self._buffer = self._buffer[:self.size].copy()
+        return self._buffer
+
+
+class RingBuffer:
+    """Array of the last rows appended, like GrowableArray but dropping the oldest rows beyond its capacity.
+
+    Every row is written twice, capacity rows apart, so the rows kept are
+    always one contiguous view, oldest first, and appending costs only the
+    new rows.
+    """
+
+    def __init__(self, capacity, row_shape=(), dtype=np.float64):
+        self.capacity = max(1, capacity)
+        self._buffer = np.empty((2 * self.capacity,) + tuple(row_shape), dtype=dtype)
+        # Position after the newest row, in the first half of the buffer
+        self._end = 0
+        self.size = 0
+
+    def append(self, rows):
+        """Appends a block of rows, overwriting the oldest ones when the buffer is full."""
+        rows = rows[-self.capacity:]
+        count = len(rows)
+        first = min(count, self.capacity - self._end)
+        for start in (self._end, self._end + self.capacity):
+            self._buffer[start:start + first] = rows[:first]
+        for start in (0, self.capacity):
+            self._buffer[start:start + count - first] = rows[first:]
+        self._end = (self._end + count) % self.capacity
+        self.size = min(self.capacity, self.size + count)
+
+    @property
+    def array(self):
+        """Returns a view of the rows kept, oldest first; later appends write into it."""
+        start = (self._end - self.size) % self.capacity
+        return self._buffer[start:start + self.size]
+
+
+def read_header(filepath, channel=0, delimiter=None):
+    """Reads everything above the data block of a channel: distances, tare rows and the preview lines.
+
+    The delimiter is sniffed from the start of the file when not given.
+    Also returns the number of channels and the byte range of the channel's
+    data. Returns None when no 'x-axis' row is found.
+    """
+    if delimiter is None:
+        delimiter = sniff_delimiter(read_head(filepath)) or "\t"
+    header_lines, x_axis_line, data_start = scan_header(filepath, delimiter)
+    if x_axis_line is None:
+        return None
+
+    table_start = find_table_start(header_lines, x_axis_line, delimiter)
+    labels = {line.split(delimiter)[0].strip() for line in header_lines[table_start:x_axis_line]}
+    sections = [{"lines": header_lines, "x_axis_line": x_axis_line, "header_start": 0, "data_start": data_start}]
+    sections += find_sections(filepath, header_lines[x_axis_line], labels, delimiter, data_start)
+    if not 0 <= channel < len(sections):
+        raise ValueError(f"The file has {len(sections)} channels; there is no channel {channel + 1}.")
+    section = sections[channel]
+    lines, x_axis_line = section["lines"], section["x_axis_line"]
+
+    x_axis_cells = lines[x_axis_line].split(delimiter)
+    num_columns = len(x_axis_cells)
+    width = num_columns - DATA_COLUMN_OFFSET
+
+    table_start = find_table_start(lines, x_axis_line, delimiter)
+    tare_options = find_tare_options(lines, table_start, x_axis_line, delimiter)
+    tare_values = None
+    if tare_options:
+        tare_values = np.array([
+            cells_to_numeric(lines[table_start + row - 1].split(delimiter), width)
+            for row, _ in tare_options
+        ])
+
+    return {
+        "distances": cells_to_numeric(x_axis_cells, width),
+        "tare_options": tare_options,
+        "tare_values": tare_values,
+        "header_lines": header_lines[:PREVIEW_LINES],
+        "num_columns": num_columns,
+        "delimiter": delimiter,
+        "channel": channel,
+        "channels": len(sections),
+        "data_start": section["data_start"],
+        # The last channel runs to the end of the file, however long it has grown
+        "data_stop": sections[channel + 1]["header_start"] if channel + 1 < len(sections) else None,
+    }
+
+
+def parse_lines(lines, num_columns, dtype=np.float64, delimiter="\t"):
+    """Parses a batch of data lines into their timestamps and a row-major value array."""
+    value_columns = list(range(DATA_COLUMN_OFFSET, num_columns))
+    timestamps = np.array([line.split(delimiter, 1)[0] for line in lines], dtype=object)
+    try:
+        data = np.loadtxt(lines, delimiter=delimiter, usecols=value_columns, dtype=dtype, ndmin=2)
+    except ValueError:
+        # Empty or non-numeric cells: fall back to a coercing parse of this batch only
+        df = pd.read_csv(
+            io.StringIO("".join(lines)), sep=delimiter, header=None,
+            names=range(num_columns), usecols=value_columns, dtype=str, engine="c"
+        )
+        data = df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=dtype)
+    return timestamps, data
+
+
+def iter_data_chunks(filepath, header, storage_format=storage.DEFAULT_FORMAT, chunk_cells=CHUNK_CELLS):
+    """Reads the numeric block below the 'x-axis' row of the header's channel in row batches.
+
+    Yields (timestamps, data, bytes_read) for every batch, the data already in
+    the storage format; bytes_read is the offset in the file read up to.
+    In a growing file (header["growing"]) a last line without its newline is
+    still being written; it is left for the next read.
+    """
+    num_columns = header["num_columns"]
+    delimiter = header["delimiter"]
+    data_stop = header["data_stop"]
+    growing = header.get("growing", False)
+    chunk_rows = max(1, chunk_cells // max(1, num_columns - DATA_COLUMN_OFFSET))
+    with open(filepath, "rb") as file:
+        file.seek(header["data_start"])
+        bytes_read = header["data_start"]
+        while data_stop is None or bytes_read < data_stop:
+            raw_lines = list(itertools.islice(file, chunk_rows))
+            if not raw_lines:
+                break
+            lines = []
+            for raw_line in raw_lines:
+                # The header of the next channel starts at data_stop
+                if data_stop is not None and bytes_read >= data_stop:
+                    break
+                if growing and not raw_line.endswith(b"\n"):
+                    break
+                bytes_read += len(raw_line)
+                if raw_line.strip():
+                    lines.append(raw_line.decode("utf-8", errors="replace"))
+            if lines:
+                timestamps, data = parse_lines(lines, num_columns, storage.parse_dtype(storage_format), delimiter)
+                yield timestamps, storage.encode(data, storage_format), bytes_read
+
+
+def write_sample(filepath, rows, gauges, delimiter="\t", channels=1, seed=0):
+    """Writes a synthetic export with the Luna preamble and, per channel, the header rows and data rows."""
+    rng = np.random.default_rng(seed)
+    with open(filepath, "w", encoding="utf-8") as file:
+        for i in range(HEADER_SKIP_ROWS):
+            file.write(f"Header {i}:{delimiter}value {i}\n")
+        for _ in range(channels):
+            pad = delimiter * DATA_COLUMN_OFFSET
+            file.write("Gage/Segment ID:" + pad + delimiter.join(str(i) for i in range(gauges)) + "\n")
+            file.write("Tare" + pad + delimiter.join(f"{v:.3f}" for v in rng.normal(size=gauges)) + "\n")
+            file.write("x-axis" + pad + delimiter.join(f"{0.00065 * i:.5f}" for i in range(gauges)) + "\n")
+            # Write the data block in batches to keep the generator fast for 1M rows
+            batch = 10000
+            for start in range(0, rows, batch):
+                count = min(batch, rows - start)
+                values = rng.normal(scale=100.0, size=(count, gauges))
+                lines = [
+                    f"2024-01-01 {(start + r) // 3600 % 24:02d}:{(start + r) // 60 % 60:02d}:"
+                    f"{(start + r) % 60:02d}.{r % 1000:03d}{delimiter}Measurement{delimiter}strain{delimiter}"
+                    + delimiter.join(f"{v:.3f}" for v in row)
+                    for r, row in enumerate(values)
+                ]
+                file.write("\n".join(lines) + "\n")
+
+
+def read_points_csv(filepath):
+    """Reads the X and Y coordinates written by ExportPolylinePoints.lsp."""
+    points_df = pd.read_csv(filepath, skiprows=1)
+    return points_df["X Coordinate"].to_numpy(dtype=float), points_df["Y Coordinate"].to_numpy(dtype=float)
+
+
+def read_segments_csv(filepath):
+    """Reads the fibre segments placed on the polyline, one (fibre start, fibre end, polyline start, polyline end) per row.
+
+    Fibre distances are in the units of the measurement file's x-axis, polyline
+    lengths in drawing units measured from the first polyline point.
+    """
+    segments_df = pd.read_csv(filepath)
+    columns = ["Fibre Start", "Fibre End", "Polyline Start", "Polyline End"]
+    return [tuple(row) for row in segments_df[columns].to_numpy(dtype=float).tolist()]
@@ -0,0 +1,63 @@
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from decimation import DecimatedLines
+
+
+def valid_points(deformation_values, distances, range_start=float('-inf'), range_end=float('inf')):
+    """Returns the mask of points that have a value and a distance inside the distance range."""
+    return (~pd.isna(deformation_values)) & (~pd.isna(distances)) & \
+           (distances >= range_start) & (distances <= range_end)
+
+
+def style_deformation_axes(ax, timestamp):
+    """Sets the title, axis labels and grid of a deformation plot."""
+    ax.set_title(f"Deformation Plot for Timestamp: {timestamp}")
+    ax.set_xlabel("Distance")
+    ax.set_ylabel("Deformation")
+    ax.grid(True)
+
+
+def set_deformation_limits(ax, distances, deformation_values, ymin=None, ymax=None):
+    """Limits the plot area to the plotted values, or to the given Y limits, with about 10 ticks per axis."""
+    if len(distances) > 0 and len(deformation_values) > 0:
+        ax.set_xlim([distances.min(), distances.max()])
+        ax.set_ylim([
+            deformation_values.min() if ymin is None else ymin,
+            deformation_values.max() if ymax is None else ymax,
+        ])
+
+    # Set 10 equally spaced ticks for x-axis and y-axis
+    ax.set_xticks(ax.get_xticks()[::max(1, len(ax.get_xticks()) // 10)])
+    ax.set_yticks(ax.get_yticks()[::max(1, len(ax.get_yticks()) // 10)])
+
+
+def new_figure(figsize=(8, 6), dpi=100):
+    """Returns an offscreen figure with an Agg canvas and a single axes; needs no display."""
+    figure = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    return figure, canvas, figure.add_subplot(111)
+
+
+def save_deformation_snapshot(filepath, distances, deformation_values, timestamp,
+                              ymin=None, ymax=None, figsize=(8, 6), dpi=100):
+    """Saves the main deformation plot of one timestamp as an image, like the main window draws it."""
+    mask = valid_points(deformation_values, distances)
+    distances = distances[mask]
+    deformation_values = deformation_values[mask]
+
+    figure, _, ax = new_figure(figsize, dpi)
+    DecimatedLines(ax).plot(distances, deformation_values, label=f"Current: {timestamp}")
+    style_deformation_axes(ax, timestamp)
+    set_deformation_limits(ax, distances, deformation_values, ymin, ymax)
+    ax.legend()
+    figure.savefig(filepath)
+
+
+def user_limit(text):
+    """Returns a Y limit typed by the user, or None when the entry is empty or not a number."""
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
@@ -0,0 +1,121 @@
+import numpy as np
+import matplotlib
+from matplotlib.cm import ScalarMappable
+
+# Layouts with more gauges than this are drawn as one image instead of a marker per gauge
+RASTER_MIN_POINTS = 2000
+# Cells of the image along each axis, and the radius of a gauge in cells
+RASTER_CELLS = 512
+RASTER_RADIUS = 2
+
+
+def footprint(radius):
+    """Returns the row and column offsets of the cells within radius of a centre cell."""
+    rows, cols = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    inside = rows ** 2 + cols ** 2 <= radius ** 2
+    return rows[inside], cols[inside]
+
+
+def raster_cells(x, y, extent, shape, radius=RASTER_RADIUS):
+    """Returns the flat image cells covered by the gauges and the gauge drawn in each.
+
+    Where gauges overlap the later one wins, like later markers of a scatter.
+    Gauges without a position are left out.
+    """
+    x0, x1, y0, y1 = extent
+    num_rows, num_cols = shape
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    cols = np.rint((x[valid] - x0) / (x1 - x0) * (num_cols - 1)).astype(np.int64)
+    rows = np.rint((y[valid] - y0) / (y1 - y0) * (num_rows - 1)).astype(np.int64)
+
+    d_rows, d_cols = footprint(radius)
+    rows = np.clip(rows[:, None] + d_rows, 0, num_rows - 1).ravel()
+    cols = np.clip(cols[:, None] + d_cols, 0, num_cols - 1).ravel()
+    cells = rows * num_cols + cols
+    gauges = np.repeat(valid, len(d_rows))
+
+    # Keep the last gauge of every cell
+    reversed_cells = cells[::-1]
+    _, first = np.unique(reversed_cells, return_index=True)
+    keep = len(cells) - 1 - first
+    return cells[keep], gauges[keep]
+
+
+def padded_extent(x, y, shape, radius=RASTER_RADIUS):
+    """Returns the image extent around the gauges, with room for the outermost footprints."""
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.any():
+        return -1.0, 1.0, -1.0, 1.0
+    extent = []
+    for values, cells in ((x[finite], shape[1]), (y[finite], shape[0])):
+        low, high = values.min(), values.max()
+        span = high - low if high > low else 1.0
+        pad = span * radius / max(1, cells - 1 - 2 * radius)
+        extent += [low - pad, high + pad]
+    return tuple(extent)
+
+
+class GaugeLayout:
+    """Draws one value per gauge at its XY position and recolours it cheaply per frame.
+
+    Small layouts are a scatter; large ones are painted into a single RGBA
+    image whose cells are looked up once, so a frame is a colour table lookup,
+    one fancy assignment and one image draw whatever the number of gauges.
+    The positions never change the data; only the colours change per frame.
+    mappable carries the colour scale for a colour bar.
+    """
+
+    def __init__(self, ax, x, y, cmap="viridis", size=50):
+        self.ax = ax
+        self.count = len(x)
+        self.raster = self.count > RASTER_MIN_POINTS
+        if self.raster:
+            self.mappable = ScalarMappable(cmap=cmap)
+            self.colors = (matplotlib.colormaps[cmap](np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+            self.image = np.zeros((RASTER_CELLS, RASTER_CELLS, 4), dtype=np.uint8)
+            self.artist = ax.imshow(self.image, origin="lower", interpolation="nearest", aspect="auto")
+        else:
+            self.artist = ax.scatter(x, y, c=np.zeros(self.count), cmap=cmap, s=size)
+            self.mappable = self.artist
+        self.set_positions(x, y)
+
+    def set_positions(self, x, y):
+        """Moves the gauges, e.g. after a new polyline was loaded, and fits the axes to them."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if self.raster:
+            shape = self.image.shape[:2]
+            extent = padded_extent(x, y, shape)
+            self.cells, self.gauges = raster_cells(x, y, extent, shape)
+            self.image.fill(0)
+            self.artist.set_extent(extent)
+        else:
+            self.artist.set_offsets(np.column_stack((x, y)))
+            self.ax.ignore_existing_data_limits = True
+            finite = np.isfinite(x) & np.isfinite(y)
+            self.ax.update_datalim(np.column_stack((x[finite], y[finite])))
+            self.ax.autoscale_view()
+
+    def set_values(self, values):
+        """Recolours every gauge from one value per gauge."""
+        values = np.asarray(values, dtype=np.float64)
+        if self.raster:
+            # Like a scatter, take unset limits from the first values shown
+            self.mappable.norm.autoscale_None(values)
+            vmin, vmax = self.mappable.get_clim()
+            scale = (len(self.colors) - 1) / (vmax - vmin) if vmax > vmin else 0.0
+            shown = values[self.gauges]
+            levels = np.clip((shown - vmin) * scale, 0, len(self.colors) - 1)
+            # Gauges without a value stay transparent
+            colors = self.colors[np.nan_to_num(levels).astype(np.intp)]
+            colors[np.isnan(shown), 3] = 0
+            self.image.reshape(-1, 4)[self.cells] = colors
+            self.artist.set_data(self.image)
+        else:
+            self.artist.set_array(values)
+
+    def set_clim(self, vmin, vmax):
+        self.mappable.set_clim(vmin, vmax)
+
+    def get_clim(self):
+        return self.mappable.get_clim()
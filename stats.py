@@ -0,0 +1,102 @@
+import numpy as np
+from readers import GrowableArray, RingBuffer
+
+# Number of cells reduced per block when computing the table of a whole matrix
+BLOCK_CELLS = 4_000_000
+
+
+def block_stats(block):
+    """Computes peak, minimum, mean, standard deviation and peak index for every row of a block.
+
+    NaN and infinite values are ignored; rows without valid values get NaN and index -1.
+    """
+    block = np.asarray(block, dtype=np.float64)
+    finite = np.isfinite(block)
+    valid = finite.any(axis=1)
+    count = finite.sum(axis=1)
+    peak_index = np.argmax(np.where(finite, block, -np.inf), axis=1)
+    rows = np.arange(len(block))
+    # Rows without valid values are masked explicitly; warnings filters are process-wide and not thread-safe
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(finite, block, 0.0).sum(axis=1) / count
+        deviation = np.where(finite, block - mean[:, None], 0.0)
+        std = np.sqrt((deviation * deviation).sum(axis=1) / count)
+    return {
+        "peak": np.where(valid, block[rows, peak_index], np.nan),
+        "min": np.where(valid, np.where(finite, block, np.inf).min(axis=1), np.nan),
+        "mean": mean,
+        "std": std,
+        "peak_index": np.where(valid, peak_index, -1),
+    }
+
+
+class StatsTable:
+    """Per-timestamp statistics of a data matrix, filled in row blocks.
+
+    The table grows with append() while a file streams in, so the stats
+    panel and the statistics plot only ever look values up. With a capacity
+    it keeps the statistics of the last capacity rows, like a RingBuffer.
+    """
+
+    KEYS = ("peak", "min", "mean", "std", "peak_index")
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.columns = {
+            key: GrowableArray(dtype=np.int64 if key == "peak_index" else np.float64) if capacity is None
+            else RingBuffer(capacity, dtype=np.int64 if key == "peak_index" else np.float64)
+            for key in self.KEYS
+        }
+
+    def __len__(self):
+        # Columns are appended one after another, so a reader may see them mid-append
+        return min(column.size for column in self.columns.values())
+
+    def __getitem__(self, key):
+        return self.columns[key].array
+
+    def append(self, block):
+        """Adds the statistics of a block of rows."""
+        for key, values in block_stats(block).items():
+            self.columns[key].append(values)
+
+    def row(self, idx, distances=None):
+        """Returns the statistics of one timestamp as a dict, with the peak location if distances are given."""
+        result = {key: self.columns[key].array[idx] for key in self.KEYS}
+        peak_index = result["peak_index"]
+        result["peak_distance"] = (
+            distances[peak_index] if distances is not None and peak_index >= 0 else np.nan
+        )
+        return result
+
+
+def table_from_columns(columns):
+    """Returns a statistics table holding the given columns, e.g. read back from a cache."""
+    table = StatsTable()
+    for key in StatsTable.KEYS:
+        table.columns[key].append(columns[key])
+    return table
+
+
+def compute_stats_table(data, check_cancelled=None, report=None):
+    """Computes the statistics table of a whole matrix block by block."""
+    table = StatsTable()
+    num_rows = len(data)
+    rows_per_block = max(1, BLOCK_CELLS // max(1, data.shape[1]))
+    for start in range(0, num_rows, rows_per_block):
+        if check_cancelled is not None:
+            check_cancelled()
+        table.append(data[start:start + rows_per_block])
+        if report is not None:
+            report(100 * min(num_rows, start + rows_per_block) // max(1, num_rows))
+    return table
+
+
+def row_stats(app, idx):
+    """Returns the statistics of one timestamp, from the table when it covers the row."""
+    table = app.stats_table
+    if table is None or idx >= len(table):
+        table = StatsTable()
+        table.append(app.data[idx:idx + 1])
+        idx = 0
+    return table.row(idx, app.distances)
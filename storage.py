@@ -0,0 +1,70 @@
+import numpy as np
+import dataview
+
+# Formats the data matrix can be kept in, from exact to most compact
+FORMATS = ("float64", "float32", "int32", "int16")
+DEFAULT_FORMAT = "float64"
+# The integer formats keep this many digits after the decimal point, as many as Luna writes
+SCALED_DECIMALS = 3
+SCALE = 10.0 ** -SCALED_DECIMALS
+
+
+def format_name(storage):
+    """Returns the name of a storage format given as a name or a NumPy dtype."""
+    name = np.dtype(storage).name
+    if name not in FORMATS:
+        raise ValueError(f"Unsupported storage format '{name}', use one of {', '.join(FORMATS)}.")
+    return name
+
+
+def is_scaled(storage):
+    """True for the integer formats, which store values as multiples of SCALE."""
+    return np.issubdtype(np.dtype(format_name(storage)), np.integer)
+
+
+def invalid_value(storage):
+    """Returns the integer that marks an empty or invalid cell in a scaled format."""
+    return np.iinfo(np.dtype(format_name(storage))).min
+
+
+def parse_dtype(storage):
+    """Returns the float type a batch is parsed into before it is stored."""
+    return np.float32 if format_name(storage) == "float32" else np.float64
+
+
+def encode(values, storage):
+    """Converts a parsed float batch to the storage format.
+
+    Scaled formats round to SCALED_DECIMALS digits and store NaN and
+    infinite cells as the invalid marker; values that do not fit raise
+    ValueError rather than being clipped.
+    """
+    name = format_name(storage)
+    if not is_scaled(name):
+        return np.asarray(values, dtype=name)
+
+    info = np.iinfo(np.dtype(name))
+    finite = np.isfinite(values)
+    scaled = np.rint(np.where(finite, values, 0) / SCALE)
+    if finite.any():
+        low, high = scaled[finite].min(), scaled[finite].max()
+        if low <= info.min or high > info.max:
+            raise ValueError(
+                f"Values from {low * SCALE:g} to {high * SCALE:g} do not fit {name} with "
+                f"{SCALED_DECIMALS} decimals; use int32, float32 or float64."
+            )
+    encoded = scaled.astype(name)
+    encoded[~finite] = info.min
+    return encoded
+
+
+def decoded(values, storage):
+    """Returns a matrix in a storage format as the viewers read it: floats with NaN for invalid cells."""
+    if not is_scaled(storage):
+        return values
+    return dataview.ScaledView(values, SCALED_DECIMALS, invalid_value(storage))
+
+
+def raw(data):
+    """Returns the stored matrix behind a decoded one, e.g. to save it."""
+    return data.values if isinstance(data, dataview.ScaledView) else data
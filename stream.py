@@ -0,0 +1,216 @@
+"""
+Live view of the frames an acquisition PC pushes to the ingest server, see ingest.py.
+
+The newest timestamps are kept in ring buffers, so every refresh costs only
+the rows that arrived. The plot and the stats panel are redrawn at most
+REFRESH_RATE times per second, however fast rows arrive.
+"""
+import queue
+import numpy as np
+import tkinter as tk
+from tkinter import messagebox, simpledialog
+import plotter as plot
+import loader as load
+import dataview
+import follow
+import ingest
+import readers
+import stats
+
+# Most redraws per second of a stream; rows arriving in between are kept but not drawn one by one
+REFRESH_RATE = 20
+# Timestamps kept of a stream, fewer when rows are so wide that they would exceed STREAM_CELLS
+STREAM_TIMESTAMPS = 10_000
+# Cells kept of a stream; the ring buffer stores every cell twice
+STREAM_CELLS = 10_000_000
+
+
+def toggle_stream(app):
+    """Starts listening for frames on a TCP port of this computer, or stops listening."""
+    if app.stream is not None:
+        stop_stream(app)
+        return
+    if app.loading:
+        messagebox.showinfo("Info", "Wait for the file to finish loading.")
+        return
+
+    port = simpledialog.askinteger(
+        "Listen for Frames", "TCP port to listen on (0 picks a free one):",
+        initialvalue=ingest.DEFAULT_PORT, minvalue=0, maxvalue=65535
+    )
+    if port is None:
+        return
+    try:
+        server = ingest.IngestServer(port=port).start()
+    except OSError as e:
+        messagebox.showerror("Error", f"Could not listen on port {port}: {e}")
+        return
+
+    follow.detach(app)
+    app.filepath = None
+    host, port = server.address[:2]
+    app.stream = {
+        "server": server,
+        "name": f"{host}:{port}",
+        # Ring buffers of the newest timestamps, rows and statistics, set up when the distances arrive
+        "timestamps": None,
+        "data": None,
+        "stats": None,
+        # Statistics of the zeroed rows and the zero references they were computed with
+        "zero_table": None,
+        "zero_offsets": None,
+        # Rows kept but not drawn as the current line, and rows pushed out before they were shown
+        "skipped": 0,
+        "dropped": 0,
+    }
+    app.stream_button.config(text="Stop Listening")
+    app.file_label.config(text=f"Listening on {app.stream['name']}", fg="gray")
+    app.stream_after_id = app.master.after(1000 // REFRESH_RATE, lambda: refresh(app))
+
+
+def stop_stream(app):
+    """Closes the ingest server; the rows received so far stay in view."""
+    stream = app.stream
+    if stream is None:
+        return
+    if app.stream_after_id is not None:
+        app.master.after_cancel(app.stream_after_id)
+        app.stream_after_id = None
+    stream["server"].stop()
+    app.stream = None
+    app.stream_button.config(text="Listen for Frames")
+    if app.data is not None:
+        app.file_label.config(text=f"{stream['name']} (stopped, {len(app.data)} timestamps)", fg="black")
+    else:
+        app.file_label.config(text="No file loaded", fg="gray")
+
+
+def refresh(app):
+    """Takes every batch the server queued since the last refresh, then redraws once."""
+    app.stream_after_id = None
+    stream = app.stream
+    if stream is None:
+        return
+
+    blocks = []
+    while True:
+        try:
+            item = stream["server"].frames.get_nowait()
+        except queue.Empty:
+            break
+        if item[0] == "distances":
+            append_blocks(app, stream, blocks)
+            blocks = []
+            start_view(app, stream, item[1])
+        elif stream["data"] is not None and item[2].shape[1] == stream["data"].array.shape[1]:
+            blocks.append(item[1:])
+        else:
+            stream["dropped"] += len(item[1])
+    append_blocks(app, stream, blocks)
+    show_status(app)
+    app.stream_after_id = app.master.after(1000 // REFRESH_RATE, lambda: refresh(app))
+
+
+def start_view(app, stream, distances):
+    """Sets up ring buffers and the header for the gauges of new distances; the next rows replace the view."""
+    capacity = max(1, min(STREAM_TIMESTAMPS, STREAM_CELLS // max(1, len(distances))))
+    stream["timestamps"] = readers.RingBuffer(capacity, dtype=object)
+    stream["data"] = readers.RingBuffer(capacity, (len(distances),))
+    stream["stats"] = stats.StatsTable(capacity)
+    stream["zero_table"] = stream["zero_offsets"] = None
+    app.data = None
+
+    # A stream has no channels and no tare rows
+    if app.channel_dropdown is not None:
+        app.channel_dropdown.destroy()
+        app.channel_dropdown = None
+    if app.tare_dropdown is not None:
+        app.tare_dropdown.destroy()
+        app.tare_dropdown = None
+    app.tare = None
+    app.tare_values = None
+    app.distances = distances
+
+    app.data_text.config(state=tk.NORMAL)
+    app.data_text.delete(1.0, tk.END)
+    app.data_text.insert(
+        tk.END, f"Frames from {stream['name']}\n{len(distances)} gauges, newest {capacity} timestamps kept\n"
+    )
+    app.data_text.config(state=tk.DISABLED)
+
+
+def append_blocks(app, stream, blocks):
+    """Appends the rows of queued batches to the ring buffers and shows the newest."""
+    if not blocks:
+        return
+    timestamps = np.concatenate([block[0] for block in blocks])
+    data = np.concatenate([block[1] for block in blocks])
+    ring = stream["data"]
+    stream["dropped"] += max(0, len(data) - ring.capacity)
+    stream["timestamps"].append(timestamps)
+    ring.append(data)
+    stream["stats"].append(data[-ring.capacity:])
+
+    if app.data is None:
+        load.show_rows(app, stream["timestamps"].array, ring.array, stream["stats"], first=True)
+    else:
+        app.timestamps = stream["timestamps"].array
+        app.original_data = ring.array
+        app.original_stats_table = stream["stats"]
+        app.data = dataview.apply_offsets(app.original_data, dataview.view_offsets(app.data))
+        if app.data is app.original_data:
+            app.stats_table = app.original_stats_table
+        else:
+            app.stats_table = zeroed_stats(app, stream, len(data))
+        last = len(app.data) - 1
+        app.slider.config(to=last)
+        if app.range_slider is not None and app.range_window is not None:
+            app.range_slider.config(to=last)
+        if app.spatial_slider is not None and app.spatial_window is not None:
+            app.spatial_slider.config(to=last)
+        plot.update_stats_plot(app)
+
+    # One redraw per refresh; with a full ring the rows under every index move on
+    stream["skipped"] += len(data) - 1
+    if app.stick_var.get():
+        app.current_timestamp_idx = len(app.data) - 1
+        app.slider.set(app.current_timestamp_idx)
+    app.current_timestamp_idx = min(app.current_timestamp_idx, len(app.data) - 1)
+    app.slider_label.config(text=f"Timestamp Index: {app.current_timestamp_idx}")
+    app.update_stats()
+    plot.plot_deformation(app)
+
+
+def zeroed_stats(app, stream, new_rows):
+    """Returns the statistics of the zeroed rows, recomputed only when the zero references change."""
+    offsets = dataview.view_offsets(app.data)
+    previous = stream["zero_offsets"]
+    if (
+        stream["zero_table"] is None or len(offsets) != len(previous) or
+        any(offset is not old for offset, old in zip(offsets, previous))
+    ):
+        if app.stats_task is not None:
+            app.stats_task.cancel()
+            app.stats_task = None
+        stream["zero_table"] = stats.StatsTable(stream["data"].capacity)
+        stream["zero_table"].append(app.data[:])
+        stream["zero_offsets"] = offsets
+    else:
+        stream["zero_table"].append(app.data[-min(new_rows, len(app.data)):])
+    return stream["zero_table"]
+
+
+def show_status(app):
+    """Shows the timestamps kept and the frame counters in the file label."""
+    stream = app.stream
+    server = stream["server"]
+    if app.data is None:
+        return
+    app.file_label.config(
+        text=(
+            f"{stream['name']} ({len(app.data)} timestamps; {server.received} received, "
+            f"{stream['skipped']} not drawn, {server.dropped + stream['dropped']} dropped, "
+            f"{server.throttled} throttled)"
+        ),
+        fg="black"
+    )
@@ -0,0 +1,90 @@
+import queue
+import threading
+
+# How often the Tk loop checks the worker's queue, in milliseconds
+POLL_INTERVAL_MS = 50
+
+
+class TaskCancelled(Exception):
+    """Raised inside a worker when the user pressed Cancel."""
+
+
+class BackgroundTask:
+    """Runs work on a worker thread and relays its progress to the Tk loop through a queue.
+
+    The worker calls report() and checks check_cancelled(); every callback
+    (on_progress, on_done, on_error, on_cancel) runs on the UI thread.
+    With message=None the task runs quietly, without a loading window.
+    """
+
+    def __init__(self, app, message, work, on_done=None, on_progress=None,
+                 on_error=None, on_cancel=None, cancellable=True):
+        self.app = app
+        self.work = work
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.loading_window = self.progress_var = None
+        if message is not None:
+            self.loading_window, self.progress_var = app.show_loading_window(
+                message, on_cancel=self.cancel if cancellable else None
+            )
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Starts the worker thread and the polling loop."""
+        self.thread.start()
+        self.app.master.after(POLL_INTERVAL_MS, self._poll)
+        return self
+
+    def cancel(self):
+        """Asks the worker to stop at its next check."""
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        """Raises TaskCancelled in the worker once Cancel was pressed."""
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+
+    def report(self, percent, payload=None):
+        """Sends progress (0-100) and an optional payload for on_progress to the UI thread."""
+        self.messages.put(("progress", percent, payload))
+
+    def _run(self):
+        try:
+            result = self.work(self)
+        except TaskCancelled:
+            self.messages.put(("cancelled", None, None))
+        except Exception as e:  # Reported to the user on the UI thread
+            self.messages.put(("error", e, None))
+        else:
+            self.messages.put(("done", result, None))
+
+    def _poll(self):
+        while True:
+            try:
+                kind, value, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                if self.progress_var is not None:
+                    self.progress_var.set(int(value))
+                if payload is not None and self.on_progress is not None:
+                    self.on_progress(payload)
+                continue
+
+            if self.loading_window is not None:
+                self.loading_window.destroy()
+            if kind == "done" and self.on_done is not None:
+                self.on_done(value)
+            elif kind == "error" and self.on_error is not None:
+                self.on_error(value)
+            elif kind == "cancelled" and self.on_cancel is not None:
+                self.on_cancel()
+            return
+
+        self.app.master.after(POLL_INTERVAL_MS, self._poll)
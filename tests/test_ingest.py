@@ -0,0 +1,10 @@
+import ingest
+
+
+def test_binary_frames_keep_the_file_timestamps():
+    for timestamp in ["2024-01-01 00:00:00.000", "2024-01-01 13:59:07.123", "2024-06-30 23:59:59.999"]:
+        assert ingest.format_timestamp(ingest.timestamp_seconds(timestamp)) == timestamp
+
+
+def test_unreadable_timestamps_are_none():
+    assert ingest.timestamp_seconds("Measurement") is None
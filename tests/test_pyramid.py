@@ -0,0 +1,17 @@
+import numpy as np
+from pyramid import TilePyramid
+
+
+def test_storing_a_tile_twice_counts_its_bytes_once():
+    pyramid = TilePyramid(np.zeros((4, 4)))
+    key = (0, 0, 0, 0)
+    first = (np.zeros((2, 2)), np.zeros((2, 2)))
+    second = (np.zeros((3, 3)), np.zeros((3, 3)))
+
+    pyramid.store_tile(key, first)
+    pyramid.store_tile(key, first)
+    assert pyramid.nbytes == first[0].nbytes + first[1].nbytes
+
+    pyramid.store_tile(key, second)
+    assert pyramid.nbytes == second[0].nbytes + second[1].nbytes
+    assert len(pyramid.tiles) == 1
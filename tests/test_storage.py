@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+import formats
+import readers
+import storage
+
+
+def test_scaled_formats_return_the_parsed_values(tmp_path):
+    filepath = tmp_path / "sample.txt"
+    readers.write_sample(filepath, rows=2000, gauges=50)
+    expected = formats.parse_file(filepath)["data"]
+    decoded = formats.parse_file(filepath, "int32")["data"]
+    assert np.array_equal(decoded[:], expected)
+
+
+@pytest.mark.parametrize("storage_format", ["int32", "int16"])
+def test_every_three_decimal_value_round_trips(storage_format):
+    # Every value with three decimals that int16 can hold, as text rows like the exports
+    cells = [f"{value / 1000:.3f}" for value in range(-32767, 32768)]
+    lines = ["2024-01-01 00:00:00.000\tMeasurement\tstrain\t" + "\t".join(cells[i:i + 100]) + "\n"
+             for i in range(0, len(cells) - 100, 100)]
+    _, parsed = readers.parse_lines(lines, 100 + readers.DATA_COLUMN_OFFSET)
+    decoded = storage.decoded(storage.encode(parsed, storage_format), storage_format)
+    assert np.array_equal(decoded[:], parsed)
+    assert decoded[3, 7] == parsed[3, 7]
@@ -1,268 +1,492 @@
+import math
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from blitting import BlitManager
+from decimation import DecimatedLines
+import dataview
+import export
+import framecache
+import processing as util
+import player
+import render
+import tasks
+
+# Frames pre-rendered on each side of the slider while the frame cache is on
+FRAME_CACHE_RADIUS = 30
 
 def create_plot_window(self, start, end, valid_indices):
-    """Creates a new plot window for the specified range of distances and deformation values."""
-    # Create a new window for the plot
-    plot_window = tk.Toplevel(self.master)
-    plot_window.title(f"Plot for Range {start:.2f}m to {end:.2f}m")
+    """Adds the specified range of distances to the range dashboard, opening it if needed."""
+    if self.range_window is None or not self.range_window.winfo_exists():
+        create_range_window(self)
+
+    columns = dataview.range_columns(valid_indices)
+    self.ranges.append({
+        "start": start,
+        "end": end,
+        "columns": columns,
+        "distances": self.distances[columns],
+        "locked_lines": [],
+    })
+    layout_ranges(self)
+
+def create_range_window(self):
+    """Creates the dashboard window showing every range in one figure with a shared slider."""
+    self.range_window = tk.Toplevel(self.master)
+    self.range_window.title("Range Dashboard")
+    self.range_window.protocol("WM_DELETE_WINDOW", lambda: close_range_window(self))
 
     # Center the new window relative to the original window
-    self.center_window(plot_window)
-
-    # Create a figure and canvas for the new plot
-    figure = plt.Figure(figsize=(8, 6))
-    ax = figure.add_subplot(111)
-    canvas = FigureCanvasTkAgg(figure, master=plot_window)
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    self.center_window(self.range_window)
+
+    # One figure and canvas for all ranges
+    self.range_figure = plt.Figure(figsize=(10, 7))
+    self.range_canvas = FigureCanvasTkAgg(self.range_figure, master=self.range_window)
+    self.range_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    self.range_blit = BlitManager(self.range_canvas)
+    # Optional pre-rendered frames around the slider, dropped after every full draw
+    self.range_frame_cache = framecache.FrameCache()
+    self.range_renderer = None
+    self.range_cache_data = None
+    self.range_canvas.mpl_connect("draw_event", lambda event: on_range_draw(self, event))
 
     # Add Matplotlib's navigation toolbar for zoom and pan
-    toolbar_frame = tk.Frame(plot_window)
+    toolbar_frame = tk.Frame(self.range_window)
     toolbar_frame.pack(fill=tk.X, pady=5)
-    toolbar = NavigationToolbar2Tk(canvas, toolbar_frame)
+    toolbar = NavigationToolbar2Tk(self.range_canvas, toolbar_frame)
     toolbar.update()
 
-    # Add a slider for the new plot
-    slider_frame = tk.Frame(plot_window)
+    # One slider drives every range
+    slider_frame = tk.Frame(self.range_window)
     slider_frame.pack(fill=tk.X, pady=5)
 
-    slider = tk.Scale(
+    self.range_slider = tk.Scale(
         slider_frame,
         from_=0,
         to=len(self.data) - 1,
         orient=tk.HORIZONTAL,
-        length=700
+        length=700,
+        command=lambda value: update_ranges(self, value)
     )
-    slider.pack(side=tk.LEFT, padx=5)
+    self.range_slider.pack(side=tk.LEFT, padx=5)
 
-    slider_label = tk.Label(
+    self.range_slider_label = tk.Label(
         slider_frame,
         text="Timestamp Index: 0"
     )
-    slider_label.pack(side=tk.LEFT, padx=5)
+    self.range_slider_label.pack(side=tk.LEFT, padx=5)
 
     # Add control buttons
-    control_frame = tk.Frame(plot_window)
+    control_frame = tk.Frame(self.range_window)
     control_frame.pack(fill=tk.X, pady=5)
 
-    locked_lines = []  # Maintain a separate list of locked lines for this window
+    self.range_playback_running = False
+    self.range_playback_speed = player.PLAYBACK_RATE
+    self.range_playback_remainder = 0.0
+
+    tk.Button(control_frame, text="Toggle Zeroing", command=lambda: toggle_zeroing(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="Zero from Timestamp", command=lambda: zero_from_timestamp(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="Lock Line", command=lambda: lock_line(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="Reset Graph", command=lambda: reset_graph(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="Remove Last Range", command=lambda: remove_last_range(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="⏯", command=lambda: toggle_playback(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="⏩", command=lambda: fast_forward(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="⏪", command=lambda: reverse(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="Save Image", command=lambda: save_image(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="Export Data", command=lambda: export_data(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(control_frame, text="Export Animation",
+              command=lambda: player.export_animation(self, "ranges")).pack(side=tk.LEFT, padx=5)
+
+    self.range_frame_cache_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(
+        control_frame, text="Frame Cache", variable=self.range_frame_cache_var,
+        command=lambda: toggle_frame_cache(self)
+    ).pack(side=tk.LEFT, padx=5)
+
+    # Playback speed, plus stride and measured frame rate while playing
+    self.range_playback_label = tk.Label(control_frame, text=player.speed_text(self.range_playback_speed))
+    self.range_playback_label.pack(side=tk.LEFT, padx=5)
+
+    # Y-axis controls below the control frame, applied to every range
+    yaxis_frame = tk.Frame(self.range_window)
+    yaxis_frame.pack(side=tk.LEFT, anchor="w", pady=5)
+
+    tk.Label(yaxis_frame, text="Y min:").pack(side=tk.LEFT, padx=2)
+    self.range_ymin_var = tk.StringVar()
+    ymin_entry = tk.Entry(yaxis_frame, textvariable=self.range_ymin_var, width=8)
+    ymin_entry.pack(side=tk.LEFT, padx=2)
 
-    def update_plot(value):
-        """Updates the plot based on the slider value and applies persistent Y-axis limits."""
-        timestamp_idx = int(value)
-        deformation_values = self.data[timestamp_idx][valid_indices]
-        distances = self.distances[valid_indices]
+    tk.Label(yaxis_frame, text="Y max:").pack(side=tk.LEFT, padx=2)
+    self.range_ymax_var = tk.StringVar()
+    ymax_entry = tk.Entry(yaxis_frame, textvariable=self.range_ymax_var, width=8)
+    ymax_entry.pack(side=tk.LEFT, padx=2)
 
-        ax.clear()
+    tk.Button(yaxis_frame, text="Apply Y Limits", command=lambda: apply_yaxis_limits(self)).pack(side=tk.LEFT, padx=5)
+    tk.Button(yaxis_frame, text="Reset Y Limits", command=lambda: reset_yaxis_limits(self)).pack(side=tk.LEFT, padx=5)
+
+def close_range_window(self):
+    """Stops playback, forgets all ranges and closes the dashboard."""
+    self.range_playback_running = False
+    self.playback_clock.unsubscribe("ranges")
+    self.ranges = []
+    self.range_timestamp_idx = None
+    stop_frame_renderer(self)
+    if self.range_blit is not None:
+        self.range_blit.disconnect()
+        self.range_blit = None
+    if self.range_window is not None:
+        self.range_window.destroy()
+        self.range_window = None
+
+def range_ylim(self):
+    """Returns the user's Y-axis limits of the dashboard, None where unset or still being typed."""
+    return render.user_limit(self.range_ymin_var.get()), render.user_limit(self.range_ymax_var.get())
+
+def draw_range_axes(self, figure, timestamp_idx):
+    """Adds one subplot per range to a figure and returns each range's artists and the figure title."""
+    num_columns = math.ceil(math.sqrt(len(self.ranges)))
+    num_rows = math.ceil(len(self.ranges) / num_columns)
+    ymin, ymax = range_ylim(self)
+    artists = []
+
+    for number, rng in enumerate(self.ranges, start=1):
+        ax = figure.add_subplot(num_rows, num_columns, number)
+        # Lines are drawn at screen resolution and redecimated on zoom and pan
+        lines = DecimatedLines(ax)
 
         # Plot all locked lines
-        for line_data in locked_lines:
-            ax.plot(line_data['distances'], line_data['deformation_values'],
-                    label=f"Locked: {line_data['timestamp']}")
-
-        # Plot the current line
-        ax.plot(
-            distances,
-            deformation_values,
-            label=f"Timestamp: {self.timestamps[timestamp_idx]}"
-        )
-        ax.set_title(
-            f"Deformation vs Distance\nRange: {start:.2f}m to {end:.2f}m"
+        for line_data in rng["locked_lines"]:
+            lines.plot(line_data['distances'], line_data['deformation_values'],
+                       label=f"Locked: {line_data['timestamp']}")
+
+        # The current line is the only artist that changes between frames
+        current_line = lines.plot(
+            rng["distances"],
+            self.data[timestamp_idx, rng["columns"]],
+            label="Current"
         )
+
+        ax.set_title(f"Range: {rng['start']:.2f}m to {rng['end']:.2f}m")
         ax.set_xlabel("Distance (m)")
         ax.set_ylabel("Deformation (microstrain)")
         ax.grid(True)
         ax.legend()
-
         # Apply persistent Y-axis limits
-        ymin = float(ymin_var.get()) if ymin_var.get() else None
-        ymax = float(ymax_var.get()) if ymax_var.get() else None
         ax.set_ylim(ymin, ymax)
-
-        canvas.draw()
-
-        slider_label.config(text=f"Timestamp Index: {timestamp_idx}")
-
-    def toggle_zeroing():
-        """Toggle zeroing mode to apply or remove tare values from the data."""
-        if self.zeroing_enabled:
-            self.data = self.original_data.copy()
-        else:
-            if self.tare is not None:
-                # Apply tare values individually for the selected range
-                self.data = self.original_data + self.tare
-        self.zeroing_enabled = not self.zeroing_enabled
-        update_plot(slider.get())
-
-    def zero_from_timestamp():
-        """Zero the data based on the current timestamp by subtracting the values at that timestamp."""
-        timestamp_idx = slider.get()
-        zeroing_values = self.data[timestamp_idx]
-        self.data = self.original_data - zeroing_values
-        update_plot(slider.get())
-
-    def lock_line():
-        """Locks the current line of deformation values and distances for later reference."""
-        timestamp_idx = slider.get()
-        deformation_values = self.data[timestamp_idx][valid_indices]
-        distances = self.distances[valid_indices]
-
-        if len(distances) > 0 and len(deformation_values) > 0:
-            locked_lines.append({
-                'distances': distances,
-                'deformation_values': deformation_values,
-                'timestamp': self.timestamps[timestamp_idx]
-            })
-
-        # Update the plot to include the locked lines
-        update_plot(slider.get())
-
-    def reset_graph():
-        """Resets the graph to its original state, clearing locked lines and zeroing."""
-        self.data = self.original_data.copy()
-        locked_lines.clear()  # Clear all locked lines
-        update_plot(slider.get())
-
-    def toggle_playback():
-        """Toggles playback mode to run through timestamps automatically."""
-        nonlocal playback_running
-        playback_running = not playback_running
-        if playback_running:
-            run_playback()
-
-    def fast_forward():
-        """Increases the playback speed for fast-forwarding through timestamps."""
-        nonlocal playback_speed
-        playback_speed = min(playback_speed * 2, self.max_playback_speed)
-
-    def reverse():
-        """Reverses the playback speed for going backward through timestamps."""
-        nonlocal playback_speed
-        playback_speed = max(playback_speed // 2, -self.max_playback_speed)
-
-        # Ensure playback speed is negative for reverse
-        if playback_speed > 0:
-            playback_speed = -1
-
-    def run_playback():
-        """Runs the playback by updating the timestamp index and refreshing the plot."""
-        if not playback_running:
-            return
-        new_idx = slider.get() + playback_speed
-        if 0 <= new_idx < len(self.data):
-            slider.set(new_idx)
-            update_plot(new_idx)
-        # Schedule the next playback step
-        plot_window.after(100, run_playback)
-
-    def save_image():
-        """Saves the current plot as an image file."""
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".png",
-            filetypes=[("PNG files", "*.png"),
-                       ("All files", "*.*")])
-        if file_path:
-            figure.savefig(file_path)
-            messagebox.showinfo("Info", f"Plot saved to {file_path}")
-
-    def export_to_excel():
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            filetypes=[
-                ("Excel files", "*.xlsx"),
-                ("All files", "*.*")
-            ]
-        )
-        if file_path:
-            loading_window, progress = self.show_loading_window(
-                "Exporting to Excel..."
+        artists.append({"ax": ax, "lines": lines, "current_line": current_line})
+
+    title = figure.suptitle(f"Timestamp: {self.timestamps[timestamp_idx]}")
+    return artists, title
+
+def layout_ranges(self):
+    """Rebuilds one subplot per range with its locked lines and a blitted current line."""
+    self.range_figure.clear()
+    self.range_blit.clear()
+    if not self.ranges:
+        self.range_canvas.draw()
+        return
+
+    timestamp_idx = int(self.range_slider.get())
+    self.range_timestamp_idx = timestamp_idx
+    artists, title = draw_range_axes(self, self.range_figure, timestamp_idx)
+    for rng, rng_artists in zip(self.ranges, artists):
+        rng.update(rng_artists)
+        self.range_blit.add_artist(rng["current_line"])
+    self.range_title = self.range_blit.add_artist(title)
+
+    self.range_figure.tight_layout()
+    self.range_canvas.draw()
+    self.range_slider_label.config(text=f"Timestamp Index: {timestamp_idx}")
+
+def update_ranges(self, value):
+    """Moves every range to a timestamp in one redraw, blitting unless a Y axis has to grow."""
+    if not self.ranges or self.data is None:
+        return
+    timestamp_idx = int(value)
+    # Playback moves the slider after drawing the frame itself
+    if timestamp_idx == self.range_timestamp_idx:
+        return
+    previous_idx = self.range_timestamp_idx
+    self.range_timestamp_idx = timestamp_idx
+    ymin, ymax = range_ylim(self)
+    needs_draw = False
+
+    for rng in self.ranges:
+        deformation_values = self.data[timestamp_idx, rng["columns"]]
+        rng["lines"].set_data(rng["current_line"], rng["distances"], deformation_values)
+
+        if ymin is None and ymax is None:
+            finite = deformation_values[np.isfinite(deformation_values)]
+            low, high = rng["ax"].get_ylim()
+            if len(finite) and (finite.min() < low or finite.max() > high):
+                margin = 0.1 * max(finite.max() - finite.min(), 1e-9)
+                rng["ax"].set_ylim(min(low, finite.min() - margin), max(high, finite.max() + margin))
+                needs_draw = True
+
+    self.range_title.set_text(f"Timestamp: {self.timestamps[timestamp_idx]}")
+    self.range_slider_label.config(text=f"Timestamp Index: {timestamp_idx}")
+    if needs_draw:
+        self.range_canvas.draw()
+    elif not show_cached_frame(self, timestamp_idx):
+        self.range_blit.update()
+
+    if self.range_renderer is not None and previous_idx is not None:
+        # Render ahead at the playback stride, or frame by frame while scrubbing
+        step = abs(timestamp_idx - previous_idx) if self.range_playback_running else 1
+        self.range_renderer.move_to(timestamp_idx, step, timestamp_idx - previous_idx)
+
+def toggle_frame_cache(self):
+    """Starts or stops pre-rendering the frames around the slider."""
+    if self.range_frame_cache_var.get():
+        start_frame_renderer(self)
+    else:
+        stop_frame_renderer(self)
+        self.range_frame_cache.invalidate()
+
+def on_range_draw(self, event):
+    """Drops the pre-rendered frames after a full draw, as zoom, size, limits or zeroing may have changed."""
+    stop_frame_renderer(self)
+    self.range_frame_cache.invalidate()
+    if self.range_frame_cache_var.get() and self.ranges:
+        # Rebuild the offscreen copy once the draw has finished
+        self.range_window.after_idle(lambda: start_frame_renderer(self))
+
+def stop_frame_renderer(self):
+    if self.range_renderer is not None:
+        self.range_renderer.stop()
+        self.range_renderer = None
+
+def start_frame_renderer(self):
+    """Copies the dashboard to an offscreen figure and renders the frames around the slider from it."""
+    if (
+        self.range_renderer is not None or not self.range_frame_cache_var.get() or
+        not self.ranges or self.data is None or self.range_timestamp_idx is None
+    ):
+        return
+
+    figure = plt.Figure(figsize=self.range_figure.get_size_inches(), dpi=self.range_figure.dpi)
+    artists, title = draw_range_axes(self, figure, self.range_timestamp_idx)
+    for rng, rng_artists in zip(self.ranges, artists):
+        # Same layout and view as on screen, including zoom and pan
+        ax = rng_artists["ax"]
+        ax.set_position(rng["ax"].get_position())
+        ax.set_xlim(rng["ax"].get_xlim())
+        ax.set_ylim(rng["ax"].get_ylim())
+        ax.set_autoscalex_on(rng["ax"].get_autoscalex_on())
+
+    # The renderer thread keeps its own references while the app moves on
+    data = self.data
+    ranges = list(self.ranges)
+    timestamps = self.timestamps
+
+    def set_frame(idx):
+        for rng, rng_artists in zip(ranges, artists):
+            rng_artists["lines"].set_data(
+                rng_artists["current_line"], rng["distances"], data[idx, rng["columns"]]
             )
-            try:
-                progress.set(10)
-                self.master.update_idletasks()
-
-                # Extract and transpose the selected range
-                selected_data = self.data[:, valid_indices].T
-                selected_distances = self.distances[valid_indices]
-                selected_timestamps = self.timestamps
-
-                # Create a DataFrame
-                df = pd.DataFrame(
-                    selected_data,
-                    columns=selected_timestamps
-                )
-                df.insert(0, "Distance", selected_distances)
-
-                progress.set(50)
-                self.master.update_idletasks()
-
-                # Save to Excel
-                df.to_excel(file_path, index=False)
-
-                progress.set(100)
-                self.master.update_idletasks()
-                messagebox.showinfo("Info", f"Data exported to {file_path}")
-            except (OSError, ValueError) as e:
-                messagebox.showerror("Error", f"Failed to export data: {e}")
-            finally:
-                loading_window.destroy()
-
-    playback_running = False
-    playback_speed = 1
-
-    tk.Button(control_frame, text="Toggle Zeroing", command=toggle_zeroing).pack(side=tk.LEFT, padx=5)
-    tk.Button(control_frame, text="Zero from Timestamp", command=zero_from_timestamp).pack(side=tk.LEFT, padx=5)
-    tk.Button(control_frame, text="Lock Line", command=lock_line).pack(side=tk.LEFT, padx=5)
-    tk.Button(control_frame, text="Reset Graph", command=reset_graph).pack(side=tk.LEFT, padx=5)
-    tk.Button(control_frame, text="⏯", command=toggle_playback).pack(side=tk.LEFT, padx=5)
-    tk.Button(control_frame, text="⏩", command=fast_forward).pack(side=tk.LEFT, padx=5)
-    tk.Button(control_frame, text="⏪", command=reverse).pack(side=tk.LEFT, padx=5)
-    tk.Button(control_frame, text="Save Image", command=save_image).pack(side=tk.LEFT, padx=5)
-    tk.Button(control_frame, text="Export to Excel", command=export_to_excel).pack(side=tk.LEFT, padx=5)
-
-    # Move Y-axis controls to a new row below the control frame and align them to the left side of the window
-    yaxis_frame = tk.Frame(plot_window)
-    yaxis_frame.pack(side=tk.LEFT, anchor="w", pady=5)
-
-    tk.Label(yaxis_frame, text="Y min:").pack(side=tk.LEFT, padx=2)
-    ymin_var = tk.StringVar()
-    ymin_entry = tk.Entry(yaxis_frame, textvariable=ymin_var, width=8)
-    ymin_entry.pack(side=tk.LEFT, padx=2)
-
-    tk.Label(yaxis_frame, text="Y max:").pack(side=tk.LEFT, padx=2)
-    ymax_var = tk.StringVar()
-    ymax_entry = tk.Entry(yaxis_frame, textvariable=ymax_var, width=8)
-    ymax_entry.pack(side=tk.LEFT, padx=2)
-
-    def apply_yaxis_limits():
-        """Applies the Y-axis limits entered by the user and updates the graph."""
-        try:
-            ymin = float(ymin_var.get()) if ymin_var.get() else None
-            ymax = float(ymax_var.get()) if ymax_var.get() else None
-
-            if ymin is not None and ymax is not None and ymin >= ymax:
-                raise ValueError("Y min must be less than Y max.")
-
-            ax.set_ylim(ymin, ymax)
-            canvas.draw()  # Trigger a redraw of the graph
-        except ValueError as e:
-            messagebox.showerror("Error", f"Invalid Y-axis limits: {e}")
-
-    def reset_yaxis_limits():
-        """Reset y-axis min/max entry fields and replot."""
-        ymin_var.set("")
-        ymax_var.set("")
-        ax.set_ylim(None, None)  # Reset limits to default
-        canvas.draw()
-
-    tk.Button(yaxis_frame, text="Apply Y Limits", command=apply_yaxis_limits).pack(side=tk.LEFT, padx=5)
-    tk.Button(yaxis_frame, text="Reset Y Limits", command=reset_yaxis_limits).pack(side=tk.LEFT, padx=5)
-
-    slider.config(command=update_plot)
-    update_plot(0)  # Initialize the plot with the first timestamp
+        title.set_text(f"Timestamp: {timestamps[idx]}")
+
+    # Never plan more frames than the budget holds, or they would evict each other
+    frame_bytes = 4 * int(figure.bbox.width) * int(figure.bbox.height)
+    radius = min(FRAME_CACHE_RADIUS, max(1, self.range_frame_cache.budget_bytes // frame_bytes // 2 - 1))
+
+    self.range_cache_data = data
+    self.range_renderer = framecache.FrameRenderer(
+        self, self.range_frame_cache, figure,
+        [rng_artists["current_line"] for rng_artists in artists] + [title],
+        set_frame, len(data), radius
+    ).start()
+    self.range_renderer.move_to(self.range_timestamp_idx)
+
+def extend_frame_renderer(self, previous_data):
+    """Keeps the pre-rendered frames when rows were appended to the matrix they were rendered from."""
+    if self.range_renderer is None or self.range_cache_data is not previous_data:
+        return
+    if self.data is previous_data:
+        # The view grew in place, so the new rows can be rendered too
+        self.range_renderer.num_frames = len(self.data)
+    else:
+        # The renderer keeps the shorter matrix; the rows after it are drawn live
+        self.range_cache_data = self.data
+
+def show_cached_frame(self, timestamp_idx):
+    """Puts a pre-rendered frame on screen; returns False when the frame has to be drawn live."""
+    if self.range_renderer is None:
+        return False
+    if self.data is not self.range_cache_data:
+        # Zeroing or tare changed in the main window
+        stop_frame_renderer(self)
+        self.range_frame_cache.invalidate()
+        self.range_window.after_idle(lambda: start_frame_renderer(self))
+        return False
+
+    frame = self.range_frame_cache.get(timestamp_idx)
+    buffer = np.asarray(self.range_canvas.buffer_rgba())
+    if frame is None or frame.shape != buffer.shape:
+        return False
+    np.copyto(buffer, frame)
+    self.range_canvas.blit(self.range_figure.bbox)
+    return True
+
+def toggle_zeroing(self):
+    """Toggle zeroing mode to apply or remove tare values from the data."""
+    util.toggle_zeroing(self)
+    layout_ranges(self)
+
+def zero_from_timestamp(self):
+    """Zero the data based on the current timestamp by subtracting the values at that timestamp."""
+    util.zero_from_timestamp(self, int(self.range_slider.get()))
+    layout_ranges(self)
+
+def lock_line(self):
+    """Locks the current line of every range for later reference."""
+    timestamp_idx = int(self.range_slider.get())
+    for rng in self.ranges:
+        rng["locked_lines"].append({
+            'distances': rng["distances"],
+            'deformation_values': self.data[timestamp_idx, rng["columns"]],
+            'timestamp': self.timestamps[timestamp_idx]
+        })
+
+    # Update the plot to include the locked lines
+    layout_ranges(self)
+
+def reset_graph(self):
+    """Resets the graph to its original state, clearing locked lines and zeroing."""
+    util.clear_zeroing(self)
+    for rng in self.ranges:
+        rng["locked_lines"].clear()  # Clear all locked lines
+    layout_ranges(self)
+
+def remove_last_range(self):
+    """Removes the most recently added range, closing the dashboard after the last one."""
+    if self.ranges:
+        self.ranges.pop()
+    if self.ranges:
+        layout_ranges(self)
+    else:
+        close_range_window(self)
+
+def toggle_playback(self):
+    """Toggles playback mode to run through timestamps automatically."""
+    self.range_playback_running = not self.range_playback_running
+    if self.range_playback_running:
+        self.range_playback_remainder = 0.0
+        self.playback_clock.subscribe(
+            "ranges", lambda elapsed: playback_frame(self, elapsed), lambda error: playback_failed(self, error)
+        )
+    else:
+        self.playback_clock.unsubscribe("ranges")
+        self.range_playback_label.config(text=player.speed_text(self.range_playback_speed))
+
+def playback_failed(self, error):
+    """Shows the dashboard's playback as stopped after a frame failed to draw."""
+    self.range_playback_running = False
+    self.range_playback_label.config(text=player.speed_text(self.range_playback_speed))
+    messagebox.showerror("Error", f"Playback stopped: {error}")
+
+def fast_forward(self):
+    """Increases the playback speed for fast-forwarding through timestamps."""
+    self.range_playback_speed = player.faster(self.range_playback_speed, self.max_playback_speed)
+    self.range_playback_label.config(text=player.speed_text(self.range_playback_speed))
+
+def reverse(self):
+    """Reverses the playback speed for going backward through timestamps."""
+    self.range_playback_speed = player.slower(self.range_playback_speed, self.max_playback_speed)
+    self.range_playback_label.config(text=player.speed_text(self.range_playback_speed))
+
+def playback_frame(self, elapsed):
+    """Advances the shared slider by the timestamps due for the elapsed seconds, redrawing every range once.
+
+    Like the main window, the stride grows by itself when a frame takes longer than the tick interval.
+    """
+    if not self.range_playback_running or self.range_window is None or self.data is None:
+        self.playback_clock.unsubscribe("ranges")
+        return
+    steps, self.range_playback_remainder = player.take_steps(
+        self.range_playback_remainder, self.range_playback_speed, elapsed
+    )
+    timestamp_idx = int(self.range_slider.get())
+    new_idx = min(max(timestamp_idx + steps, 0), len(self.data) - 1)
+    if new_idx != timestamp_idx:
+        update_ranges(self, new_idx)
+        self.range_slider.set(new_idx)
+        self.range_playback_label.config(
+            text=f"{player.speed_text(self.range_playback_speed, abs(new_idx - timestamp_idx))}, "
+                 f"{self.playback_clock.fps:.0f} fps"
+        )
 
-    # Initialize the plot for the new window
-    update_plot(0)
+def save_image(self):
+    """Saves the current plot as an image file."""
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".png",
+        filetypes=[("PNG files", "*.png"),
+                   ("All files", "*.*")])
+    if file_path:
+        self.range_figure.savefig(file_path)
+        messagebox.showinfo("Info", f"Plot saved to {file_path}")
+
+def export_data(self):
+    """Exports every range to Excel, CSV or Parquet on a worker thread."""
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".xlsx",
+        filetypes=[
+            ("Excel files", "*.xlsx"),
+            ("CSV files", "*.csv"),
+            ("Parquet files", "*.parquet"),
+            ("All files", "*.*")
+        ]
+    )
+    if not file_path:
+        return
+    try:
+        export.export_format(file_path)
+    except ValueError as e:
+        messagebox.showerror("Error", f"Failed to export data: {e}")
+        return
+
+    # The worker keeps its own references, so later zeroing does not change the export
+    data = self.data
+    timestamps = self.timestamps
+    sections = [
+        (f"{rng['start']:.2f}-{rng['end']:.2f}m", rng["columns"], rng["distances"])
+        for rng in self.ranges
+    ]
+
+    def on_done(paths):
+        messagebox.showinfo("Info", "Data exported to " + ", ".join(paths))
+
+    def on_error(e):
+        messagebox.showerror("Error", f"Failed to export data: {e}")
+
+    tasks.BackgroundTask(
+        self, "Exporting data...",
+        lambda task: export.export_sections(
+            file_path, data, timestamps, sections, task.check_cancelled, task.report
+        ),
+        on_done=on_done, on_error=on_error,
+        on_cancel=lambda: messagebox.showinfo("Info", "Export cancelled; the file may be incomplete.")
+    ).start()
+
+def apply_yaxis_limits(self):
+    """Applies the Y-axis limits entered by the user to every range and updates the graph."""
+    try:
+        ymin = float(self.range_ymin_var.get()) if self.range_ymin_var.get() else None
+        ymax = float(self.range_ymax_var.get()) if self.range_ymax_var.get() else None
+
+        if ymin is not None and ymax is not None and ymin >= ymax:
+            raise ValueError("Y min must be less than Y max.")
+
+        for rng in self.ranges:
+            rng["ax"].set_ylim(ymin, ymax)
+        self.range_canvas.draw()  # Trigger a redraw of the graph
+    except ValueError as e:
+        messagebox.showerror("Error", f"Invalid Y-axis limits: {e}")
+
+def reset_yaxis_limits(self):
+    """Reset y-axis min/max entry fields and replot."""
+    self.range_ymin_var.set("")
+    self.range_ymax_var.set("")
+    layout_ranges(self)